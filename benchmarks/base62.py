@@ -0,0 +1,90 @@
+"""
+Microbenchmark of the base62 codec and InclinePxn encoding against the
+previous implementation.
+
+Usage:
+    python benchmarks/base62.py [--number N]
+"""
+import argparse
+import timeit
+from incline.base62 import (BASE_LIST, BASE_DICT, base_encode, base_decode,
+                            base_encode_just)
+from incline.InclinePrepare import (InclinePxn, INCLINE_TXN_CID_JUST,
+                                    INCLINE_TXN_CNT_JUST)
+
+CNT = 1792364835187837000
+CID = 190070690681122
+
+
+def legacy_base_decode(string: str,
+                       reverse_base: dict[str, int] = BASE_DICT) -> int:
+    string = str(string)
+    length = len(reverse_base)
+    ret = 0
+    for i, c in enumerate(string[::-1]):
+        ret += (length**i) * reverse_base[c]
+
+    return ret
+
+
+def legacy_base_encode(integer: int, base: str = BASE_LIST) -> str:
+    if integer <= 0:
+        return base[0]
+
+    length = len(base)
+    ret = ''
+    while integer > 0:
+        code = int(integer % length)
+        ret = base[code] + ret
+        integer -= code
+        # floor division to remain int type
+        integer //= length
+
+    return ret
+
+
+def legacy_pxn(cnt: int, cid: int) -> str:
+    cidstr = legacy_base_encode(cid).rjust(INCLINE_TXN_CID_JUST, '0')
+    cntstr = legacy_base_encode(cnt).rjust(INCLINE_TXN_CNT_JUST, '0')
+    return f"{cidstr}.{cntstr}"
+
+
+def legacy_loads_pxn(pxn: str) -> str:
+    (cid, _, cnt) = pxn.partition('.')
+    return legacy_pxn(legacy_base_decode(cnt), legacy_base_decode(cid))
+
+
+def bench(name: str, legacy: str, current: str, number: int) -> None:
+    scope = globals()
+    old = timeit.timeit(legacy, globals=scope, number=number)
+    new = timeit.timeit(current, globals=scope, number=number)
+    print(f"{name:<16} legacy {number / old:>12,.0f} ops/s  "
+          f"current {number / new:>12,.0f} ops/s  "
+          f"speedup {old / new:>5.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args()
+
+    encoded = base_encode(CNT)
+    assert legacy_base_encode(CNT) == encoded
+    assert legacy_base_decode(encoded) == base_decode(encoded)
+    assert legacy_pxn(CNT, CID) == InclinePxn(cnt=CNT, cid=CID).pxn
+
+    globals()['ENCODED'] = encoded
+    globals()['PXN'] = InclinePxn(cnt=CNT, cid=CID)
+
+    bench('encode', 'legacy_base_encode(CNT)', 'base_encode(CNT)', args.number)
+    bench('encode_just', 'legacy_base_encode(CNT).rjust(11, "0")',
+          'base_encode_just(CNT, 11)', args.number)
+    bench('decode', 'legacy_base_decode(ENCODED)', 'base_decode(ENCODED)',
+          args.number)
+    bench('pxn', 'legacy_pxn(CNT, CID)', 'PXN.pxn', args.number)
+    bench('pxn_loads', 'legacy_loads_pxn(PXN.pxn)',
+          'InclinePxn().loads(PXN.pxn).pxn', args.number)
+
+
+if __name__ == "__main__":
+    main()
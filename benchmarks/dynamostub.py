@@ -0,0 +1,513 @@
+"""
+In-process DynamoDB stand-in for running InclineDatastoreDynamo offline.
+
+Implements the subset of the boto3 resource and client API the datastore
+uses.  Items are passed through the boto3 TypeSerializer on write, so floats
+and other types DynamoDB rejects fail the same way, and numbers read back as
+Decimal.  Txn tables keep a stream of NEW_AND_OLD_IMAGES records in a single
+shard, read with the dynamodbstreams client.
+
+Usage:
+    with dynamo_stub():
+        ids = InclineDatastoreDynamo(name='bench')
+"""
+import contextlib
+import copy
+from decimal import Decimal
+import collections.abc
+import re
+from typing import Any
+import zlib
+from unittest import mock
+from boto3.dynamodb.conditions import ConditionBase
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.exceptions import ClientError
+import incline.InclineDatastoreDynamo
+
+# global stub tables, shared by every resource and client like a region
+DYNAMO_STUB_TABLES: dict[str, "DynamoStubTable"] = dict()
+
+SERIALIZER = TypeSerializer()
+DESERIALIZER = TypeDeserializer()
+
+# a query page stops once it holds this much, as DynamoDB's stop at 1 MB
+DYNAMO_STUB_PAGE_BYTES = 1024 * 1024
+
+
+def stub_error(code: str, message: str, operation: str) -> ClientError:
+    return ClientError({'Error': {
+        'Code': code,
+        'Message': message
+    }}, operation)
+
+
+def stub_path(item: dict[str, Any], name: str) -> Any:
+    """
+    Resolve a dotted attribute path, None when missing
+    """
+    val: Any = item
+    for part in name.split('.'):
+        if not isinstance(val, collections.abc.Mapping) or part not in val:
+            return None
+        val = val[part]
+    return val
+
+
+def stub_evaluate(cond: ConditionBase, item: dict[str, Any]) -> bool:
+    """
+    Evaluate a boto3 Key/Attr condition against a python typed item
+    """
+    expr = cond.get_expression()
+    op = expr['operator']
+    vals = expr['values']
+    if op == 'AND':
+        return all(stub_evaluate(v, item) for v in vals)
+    if op == 'OR':
+        return any(stub_evaluate(v, item) for v in vals)
+    if op == 'NOT':
+        return not stub_evaluate(vals[0], item)
+
+    name = vals[0].name
+    if op == 'attribute_exists':
+        return stub_path(item, name) is not None
+    if op == 'attribute_not_exists':
+        return stub_path(item, name) is None
+
+    value = stub_path(item, name)
+    if value is None:
+        return False
+    try:
+        if op == '=':
+            return bool(value == vals[1])
+        if op == '<>':
+            return bool(value != vals[1])
+        if op == '<':
+            return bool(value < vals[1])
+        if op == '<=':
+            return bool(value <= vals[1])
+        if op == '>':
+            return bool(value > vals[1])
+        if op == '>=':
+            return bool(value >= vals[1])
+        if op == 'BETWEEN':
+            return bool(vals[1] <= value <= vals[2])
+        if op == 'IN':
+            return value in vals[1]
+        if op == 'begins_with':
+            return isinstance(value, str) and value.startswith(vals[1])
+        if op == 'contains':
+            return vals[1] in value
+    except TypeError:
+        # DynamoDB compares mismatched types as false
+        return False
+    raise NotImplementedError(f"stub condition {op}")
+
+
+def stub_size(item: dict[str, Any]) -> int:
+    """
+    Approximate item size, attribute names and values as text
+    """
+    return sum(len(k) + len(repr(v)) for k, v in item.items())
+
+
+def stub_projection(item: dict[str, Any], projection: str | None,
+                    names: dict[str, str] | None) -> dict[str, Any]:
+    if not projection:
+        return item
+    names = names or {}
+    attrs = [names.get(a.strip(), a.strip()) for a in projection.split(',')]
+    return {a: item[a] for a in attrs if a in item}
+
+
+class DynamoStubTable(object):
+    """
+    Table with a hash key, an optional range key, and Global Secondary
+    Indexes named <table>-idx-<name> on attribute idx_<name>.  Txn tables
+    have a stream.
+    """
+
+    def __init__(self, name: str, hash_key: str, range_key: str | None):
+        self.name = name
+        self.table_name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        # partitions by hash key, so key lookups do not scan the table
+        self.parts: dict[Any, dict[Any, dict[str, Any]]] = dict()
+        self.page_bytes = DYNAMO_STUB_PAGE_BYTES
+        self.stream: list[dict[str, Any]] | None = None
+        self.latest_stream_arn: str | None = None
+        if name.endswith('-txn'):
+            self.stream = list()
+            self.latest_stream_arn = f"arn:stub:{name}/stream"
+
+    def key(self, item: dict[str, Any]) -> Any:
+        if self.range_key:
+            return (item[self.hash_key], item[self.range_key])
+        return item[self.hash_key]
+
+    def store(self, item: dict[str, Any]) -> dict[str, Any]:
+        """
+        Round trip through the serializer, as the wire would
+        """
+        wire = {k: SERIALIZER.serialize(v) for k, v in item.items()}
+        return {k: DESERIALIZER.deserialize(v) for k, v in wire.items()}
+
+    def record(self, old: dict[str, Any] | None,
+               new: dict[str, Any] | None) -> None:
+        """
+        Stream record of a write, as DynamoDB Streams serializes it
+        """
+        if self.stream is None:
+            return
+        event = 'MODIFY' if old and new else 'INSERT' if new else 'REMOVE'
+        dynamodb: dict[str, Any] = {
+            'SequenceNumber': f"{len(self.stream) + 1:021d}",
+            'StreamViewType': 'NEW_AND_OLD_IMAGES'
+        }
+        for image, item in (('OldImage', old), ('NewImage', new)):
+            if item:
+                dynamodb[image] = {
+                    k: SERIALIZER.serialize(v)
+                    for k, v in item.items()
+                }
+        self.stream.append({'eventName': event, 'dynamodb': dynamodb})
+
+    def response(self, items: list[dict[str, Any]],
+                 scanned: int) -> dict[str, Any]:
+        return {
+            'Items': items,
+            'Count': len(items),
+            'ScannedCount': scanned,
+            'ResponseMetadata': {
+                'RetryAttempts': 0,
+                'httpStatusCode': 200,
+                'RequestId': 'stub'
+            }
+        }
+
+    def query(self, **kwargs: Any) -> dict[str, Any]:
+        cond = kwargs['KeyConditionExpression']
+        index = kwargs.get('IndexName')
+        sort = self.range_key
+        if index:
+            prefix = f"{self.name}-idx-"
+            attr = f"idx_{index[len(prefix):]}"
+            candidates = [i for i in self.items() if attr in i]
+            sort = 'tsv'
+            # composite indexes have a sort key
+            range_attr = f"ids_{index[len(prefix):]}"
+            if any(range_attr in i for i in candidates):
+                candidates = [i for i in candidates if range_attr in i]
+                sort = range_attr
+        else:
+            # partition lookup, the hash key is always an equality
+            candidates = list(
+                self.parts.get(self.hash_value(cond), {}).values())
+
+        items = [i for i in candidates if stub_evaluate(cond, i)]
+        reverse = not kwargs.get('ScanIndexForward', True)
+
+        # index entries order by the sort key, then the table key
+        def position(i: dict[str, Any]) -> Any:
+            return (i[sort] if sort else None, self.key(i))
+
+        items.sort(key=position, reverse=reverse)
+        if 'ExclusiveStartKey' in kwargs:
+            start = position(kwargs['ExclusiveStartKey'])
+            items = [
+                i for i in items
+                if (position(i) < start if reverse else position(i) > start)
+            ]
+        limit = kwargs.get('Limit')
+        page: list[dict[str, Any]] = list()
+        size = 0
+        for i in items:
+            if limit and len(page) >= limit:
+                break
+            if page and size >= self.page_bytes:
+                break
+            page.append(i)
+            size += stub_size(i)
+        resp_last = None
+        if len(page) < len(items):
+            items = page
+            resp_last = self.item_key(items[-1])
+            if index:
+                resp_last[attr] = items[-1][attr]
+                resp_last[sort] = items[-1][sort]
+        filt = kwargs.get('FilterExpression')
+        scanned = len(items)
+        if filt is not None:
+            items = [i for i in items if stub_evaluate(filt, i)]
+        items = [
+            stub_projection(copy.deepcopy(i),
+                            kwargs.get('ProjectionExpression'),
+                            kwargs.get('ExpressionAttributeNames'))
+            for i in items
+        ]
+        resp = self.response(items, scanned)
+        if resp_last:
+            resp['LastEvaluatedKey'] = resp_last
+        return resp
+
+    def items(self) -> collections.abc.Iterator[dict[str, Any]]:
+        for part in self.parts.values():
+            yield from part.values()
+
+    def hash_value(self, cond: ConditionBase) -> Any:
+        expr = cond.get_expression()
+        if expr['operator'] == 'AND':
+            return self.hash_value(expr['values'][0])
+        return expr['values'][1]
+
+    def item_key(self, item: dict[str, Any]) -> dict[str, Any]:
+        key = {self.hash_key: item[self.hash_key]}
+        if self.range_key:
+            key[self.range_key] = item[self.range_key]
+        return key
+
+    def put_item(self, **kwargs: Any) -> dict[str, Any]:
+        item = self.store(kwargs['Item'])
+        key = self.key(item)
+        part = self.parts.setdefault(item[self.hash_key], dict())
+        old = part.get(key)
+        cond = kwargs.get('ConditionExpression')
+        if cond is not None and not stub_evaluate(cond, old or {}):
+            raise stub_error('ConditionalCheckFailedException',
+                             'The conditional request failed', 'PutItem')
+        part[key] = item
+        self.record(old, item)
+        resp: dict[str, Any] = {'ResponseMetadata': {'RetryAttempts': 0}}
+        if old and kwargs.get('ReturnValues') == 'ALL_OLD':
+            resp['Attributes'] = copy.deepcopy(old)
+        return resp
+
+    @contextlib.contextmanager
+    def batch_writer(self) -> collections.abc.Iterator["DynamoStubTable"]:
+        yield self
+
+    def get_item(self, **kwargs: Any) -> dict[str, Any]:
+        key = self.key(kwargs['Key'])
+        part = self.parts.get(kwargs['Key'][self.hash_key], {})
+        resp: dict[str, Any] = {'ResponseMetadata': {'RetryAttempts': 0}}
+        if key in part:
+            resp['Item'] = copy.deepcopy(part[key])
+        return resp
+
+    def update_item(self, **kwargs: Any) -> dict[str, Any]:
+        """
+        SET and REMOVE of top level attributes
+        """
+        key = self.key(kwargs['Key'])
+        part = self.parts.get(kwargs['Key'][self.hash_key], {})
+        old = part.get(key)
+        cond = kwargs.get('ConditionExpression')
+        if cond is not None and not stub_evaluate(cond, old or {}):
+            raise stub_error('ConditionalCheckFailedException',
+                             'The conditional request failed', 'UpdateItem')
+        item = copy.deepcopy(old) if old else dict(kwargs['Key'])
+        names = kwargs.get('ExpressionAttributeNames', {})
+        values = kwargs.get('ExpressionAttributeValues', {})
+        for action in re.findall(r'(SET|REMOVE) ((?:(?!SET |REMOVE ).)*)',
+                                 kwargs['UpdateExpression']):
+            for clause in action[1].split(','):
+                if action[0] == 'SET':
+                    name, value = [c.strip() for c in clause.split('=')]
+                    item[names.get(name, name)] = values[value]
+                else:
+                    item.pop(names.get(clause.strip(), clause.strip()), None)
+        item = self.store(item)
+        self.parts.setdefault(item[self.hash_key], dict())[key] = item
+        self.record(old, item)
+        return {'ResponseMetadata': {'RetryAttempts': 0}}
+
+    def delete_item(self, **kwargs: Any) -> dict[str, Any]:
+        key = self.key(kwargs['Key'])
+        part = self.parts.get(kwargs['Key'][self.hash_key], {})
+        old = part.pop(key, None)
+        if old:
+            self.record(old, None)
+        resp: dict[str, Any] = {'ResponseMetadata': {'RetryAttempts': 0}}
+        if old and kwargs.get('ReturnValues') == 'ALL_OLD':
+            resp['Attributes'] = old
+        return resp
+
+    def scan(self, page_size: int,
+             **kwargs: Any) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        Pages of page_size items evaluated, in table order, from the
+        ExclusiveStartKey when given
+        """
+        filt = kwargs.get('FilterExpression')
+        items = list(self.items())
+        if 'TotalSegments' in kwargs:
+            # parallel scan segments split by hash key
+            items = [
+                i for i in items
+                if zlib.crc32(repr(i[self.hash_key]).encode()) %
+                kwargs['TotalSegments'] == kwargs['Segment']
+            ]
+        if 'ExclusiveStartKey' in kwargs:
+            keys = [self.key(i) for i in items]
+            start = self.key(kwargs['ExclusiveStartKey'])
+            if start in keys:
+                items = items[keys.index(start) + 1:]
+        for first in range(0, max(len(items), 1), page_size):
+            evaluated = items[first:first + page_size]
+            page = evaluated
+            if filt is not None:
+                page = [i for i in page if stub_evaluate(filt, i)]
+            resp = self.response([
+                stub_projection(copy.deepcopy(i),
+                                kwargs.get('ProjectionExpression'),
+                                kwargs.get('ExpressionAttributeNames'))
+                for i in page
+            ], len(evaluated))
+            if first + page_size < len(items):
+                resp['LastEvaluatedKey'] = self.item_key(evaluated[-1])
+            yield resp
+
+
+class DynamoStubPaginator(object):
+
+    def __init__(self, serialize: bool, page_size: int = 100):
+        self.serialize = serialize
+        self.page_size = page_size
+
+    def paginate(self,
+                 **kwargs: Any) -> collections.abc.Iterator[dict[str, Any]]:
+        table = stub_table(kwargs['TableName'])
+        for page in table.scan(self.page_size, **kwargs):
+            if self.serialize:
+                page['Items'] = [{
+                    k: SERIALIZER.serialize(v)
+                    for k, v in i.items()
+                } for i in page['Items']]
+                if 'LastEvaluatedKey' in page:
+                    page['LastEvaluatedKey'] = {
+                        k: SERIALIZER.serialize(v)
+                        for k, v in page['LastEvaluatedKey'].items()
+                    }
+            yield page
+
+
+class DynamoStubClient(object):
+    """
+    serialize: low-level client returns AttributeValue maps, the resource
+    client returns python types
+    """
+
+    def __init__(self, serialize: bool = True):
+        self.serialize = serialize
+
+    def get_paginator(self, operation: str) -> DynamoStubPaginator:
+        if operation != 'scan':
+            raise NotImplementedError(f"stub paginator {operation}")
+        return DynamoStubPaginator(self.serialize)
+
+
+class DynamoStubStreams(object):
+    """
+    dynamodbstreams client over the stream of a table.  An iterator is the
+    table name and the index of its next record.
+    """
+
+    def table(self, arn: str) -> DynamoStubTable:
+        table = next((t for t in DYNAMO_STUB_TABLES.values()
+                      if t.latest_stream_arn == arn), None)
+        if not table or table.stream is None:
+            raise stub_error('ResourceNotFoundException',
+                             f"Stream not found: {arn}", 'DescribeStream')
+        return table
+
+    def describe_stream(self, **kwargs: Any) -> dict[str, Any]:
+        self.table(kwargs['StreamArn'])
+        return {
+            'StreamDescription': {
+                'StreamArn': kwargs['StreamArn'],
+                'StreamStatus': 'ENABLED',
+                'StreamViewType': 'NEW_AND_OLD_IMAGES',
+                'Shards': [{
+                    'ShardId': 'shard-0'
+                }]
+            }
+        }
+
+    def get_shard_iterator(self, **kwargs: Any) -> dict[str, Any]:
+        table = self.table(kwargs['StreamArn'])
+        start = 0
+        if kwargs['ShardIteratorType'] == 'AFTER_SEQUENCE_NUMBER':
+            start = int(kwargs['SequenceNumber'])
+        return {'ShardIterator': f"{table.latest_stream_arn}|{start}"}
+
+    def get_records(self, **kwargs: Any) -> dict[str, Any]:
+        arn, start = kwargs['ShardIterator'].rsplit('|', 1)
+        table = self.table(arn)
+        assert table.stream is not None
+        end = int(start) + kwargs.get('Limit', 1000)
+        records = copy.deepcopy(table.stream[int(start):end])
+        return {
+            'Records': records,
+            'NextShardIterator': f"{arn}|{int(start) + len(records)}"
+        }
+
+
+class DynamoStubResource(object):
+
+    def __init__(self) -> None:
+        self.meta = mock.NonCallableMock()
+        self.meta.client = DynamoStubClient(serialize=False)
+
+    def Table(self, name: str) -> DynamoStubTable:
+        return stub_table(name)
+
+    def create_table(self, **kwargs: Any) -> DynamoStubTable:
+        name = kwargs['TableName']
+        if name in DYNAMO_STUB_TABLES:
+            raise stub_error('ResourceInUseException',
+                             f"Table already exists: {name}", 'CreateTable')
+        hash_key = range_key = None
+        for k in kwargs['KeySchema']:
+            if k['KeyType'] == 'HASH':
+                hash_key = k['AttributeName']
+            else:
+                range_key = k['AttributeName']
+        assert hash_key
+        DYNAMO_STUB_TABLES[name] = DynamoStubTable(name, hash_key, range_key)
+        return DYNAMO_STUB_TABLES[name]
+
+
+def stub_table(name: str) -> DynamoStubTable:
+    """
+    Tables are created on first use with the incline key schema
+    """
+    if name not in DYNAMO_STUB_TABLES and name.endswith('-chunk'):
+        DYNAMO_STUB_TABLES[name] = DynamoStubTable(name, 'chk', None)
+    if name not in DYNAMO_STUB_TABLES and name.endswith('-index'):
+        DYNAMO_STUB_TABLES[name] = DynamoStubTable(name, 'idx', 'ikey')
+    if name not in DYNAMO_STUB_TABLES:
+        range_key = 'pxn' if name.endswith('-log') else 'tsv'
+        DYNAMO_STUB_TABLES[name] = DynamoStubTable(name, 'kid', range_key)
+    return DYNAMO_STUB_TABLES[name]
+
+
+class DynamoStubBoto3(object):
+    """
+    Replaces the boto3 module inside incline.InclineDatastoreDynamo
+    """
+
+    def resource(self, service: str, **kwargs: Any) -> DynamoStubResource:
+        return DynamoStubResource()
+
+    def client(self, service: str,
+               **kwargs: Any) -> DynamoStubClient | DynamoStubStreams:
+        if service == 'dynamodbstreams':
+            return DynamoStubStreams()
+        return DynamoStubClient(serialize=True)
+
+
+@contextlib.contextmanager
+def dynamo_stub() -> collections.abc.Iterator[dict[str, DynamoStubTable]]:
+    with mock.patch.object(incline.InclineDatastoreDynamo, 'boto3',
+                           DynamoStubBoto3()):
+        yield DYNAMO_STUB_TABLES
@@ -0,0 +1,353 @@
+"""
+Offline benchmark suite for InclineClient and the datastores.
+
+Runs against InclineDatastoreMemory and against InclineDatastoreDynamo backed
+by the in-process DynamoDB stand-in, so no AWS profile is needed.  Reports
+ops/sec, p50/p99 latency and allocations per operation.  Results are saved as
+JSON and can be compared against a previous run to catch regressions.
+
+Usage:
+    python benchmarks/suite.py [--backend memory|dynamo] [--number N]
+                               [--filter NAME] [--output FILE]
+                               [--compare FILE] [--threshold PCT]
+"""
+import argparse
+import collections.abc
+import contextlib
+import datetime
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable
+from dynamostub import dynamo_stub
+import incline
+from incline.InclineClient import InclineClient, INCLINE_COMMIT_BEHIND
+from incline.InclineDatastore import InclineDatastore
+from incline.InclineIndex import InclineIndex
+from incline.InclineMeta import InclineMeta, incline_writeset_kid
+from incline.error import InclineNotFound
+from incline.registry import incline_registration
+from incline.router import (InclineRouter, InclineRouterOne, InclineRouterTwo,
+                            InclineRouterRead1, InclineRouterRead2)
+
+BENCH_REGION = 'us-west-2'
+BENCH_NAME = 'bench'
+BENCH_NUMBER = 1000
+BENCH_ALLOC_NUMBER = 100
+BENCH_BATCH = 10
+BENCH_HISTORY = 20
+BENCH_THRESHOLD = 10.0
+BENCH_BACKENDS = ['memory', 'dynamo']
+BENCH_ROUTERS: dict[str, type[InclineRouter]] = {
+    'one': InclineRouterOne,
+    'two': InclineRouterTwo,
+    'read1': InclineRouterRead1,
+    'read2': InclineRouterRead2
+}
+
+
+@dataclass
+class BenchResult:
+    """
+    ops:   operations per second
+    p50:   median latency, microseconds
+    p99:   99th percentile latency, microseconds
+    alloc: peak bytes allocated per operation
+    """
+    name: str
+    number: int = field(default=0)
+    ops: float = field(default=0.0)
+    p50: float = field(default=0.0)
+    p99: float = field(default=0.0)
+    alloc: float = field(default=0.0)
+    skipped: str = field(default="")
+
+
+class BenchCase(object):
+    """
+    A named operation.  setup() runs once, op(i) is timed per iteration.
+    """
+
+    def __init__(self, name: str, setup: Callable[[], Callable[[int], Any]]):
+        self.name = name
+        self.setup = setup
+
+
+def percentile(samples: list[int], pct: float) -> float:
+    if not samples:
+        return 0.0
+    idx = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[idx] / 1000
+
+
+def run_case(case: BenchCase, number: int, alloc_number: int) -> BenchResult:
+    try:
+        op = case.setup()
+    except NotImplementedError as e:
+        return BenchResult(name=case.name, skipped=str(e))
+
+    # warm up caches and connections
+    for i in range(min(10, number)):
+        op(i)
+
+    samples: list[int] = []
+    total_start = time.perf_counter_ns()
+    for i in range(number):
+        start = time.perf_counter_ns()
+        op(i)
+        samples.append(time.perf_counter_ns() - start)
+    total = time.perf_counter_ns() - total_start
+    samples.sort()
+
+    # allocations measured separately, tracing slows the timed loop
+    peaks = 0
+    tracemalloc.start()
+    for i in range(alloc_number):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        op(number + i)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks += peak - current
+    tracemalloc.stop()
+
+    return BenchResult(name=case.name,
+                       number=number,
+                       ops=number / (total / 1e9),
+                       p50=percentile(samples, 50),
+                       p99=percentile(samples, 99),
+                       alloc=peaks / max(alloc_number, 1))
+
+
+def bench_datastore(backend: str, name: str) -> InclineDatastore:
+    return incline_registration(backend).factory(name, BENCH_REGION, None)
+
+
+def bench_client(backend: str, name: str,
+                 router: type[InclineRouter]) -> InclineClient:
+    """
+    Client with every router location on the benchmark backend
+    """
+    ramp = InclineClient(name=name, region=BENCH_REGION)
+    ramp.rtr = router(name=name, region=BENCH_REGION, dbtype=backend)
+    return ramp
+
+
+def payload(i: int) -> dict[str, Any]:
+    return {'value': i, 'name': f"bench-{i}", 'tags': ['a', 'b', 'c']}
+
+
+def cases(backend: str) -> list[BenchCase]:
+    prefix = f"{BENCH_NAME}-{backend}"
+    out: list[BenchCase] = []
+
+    def ds_put() -> Callable[[int], Any]:
+        ds = bench_datastore(backend, f"{prefix}-ds")
+        pxn = ds.pxn
+
+        def op(i: int) -> Any:
+            p = pxn.pxn()
+            ds.prepare(f"put-{i}", p, InclineMeta(), payload(i))
+            return ds.commit(f"put-{i}", p)
+
+        return op
+
+    def ds_get() -> Callable[[int], Any]:
+        ds = bench_datastore(backend, f"{prefix}-ds")
+        p = ds.pxn.pxn()
+        ds.prepare('get', p, InclineMeta(), payload(0))
+        ds.commit('get', p)
+        return lambda i: ds.get('get')
+
+    out.append(BenchCase(f"{backend}.datastore.put", ds_put))
+    out.append(BenchCase(f"{backend}.datastore.get", ds_get))
+
+    for rname, router in BENCH_ROUTERS.items():
+
+        def put(router: type[InclineRouter] = router,
+                rname: str = rname) -> Callable[[int], Any]:
+            ramp = bench_client(backend, f"{prefix}-{rname}", router)
+            return lambda i: ramp.put(f"put-{i}", payload(i))
+
+        def get(router: type[InclineRouter] = router,
+                rname: str = rname) -> Callable[[int], Any]:
+            ramp = bench_client(backend, f"{prefix}-{rname}", router)
+            ramp.put('get', payload(0))
+            return lambda i: ramp.get('get')
+
+        out.append(BenchCase(f"{backend}.client.{rname}.put", put))
+        out.append(BenchCase(f"{backend}.client.{rname}.get", get))
+
+    def put_behind() -> Callable[[int], Any]:
+        ramp = bench_client(backend, f"{prefix}-behind", InclineRouterTwo)
+        ramp.commit_policy = INCLINE_COMMIT_BEHIND
+        return lambda i: ramp.put(f"put-{i}", payload(i))
+
+    out.append(BenchCase(f"{backend}.client.two.put.behind", put_behind))
+
+    def puts(batch: int) -> Callable[[], Callable[[int], Any]]:
+
+        def setup() -> Callable[[int], Any]:
+            ramp = bench_client(backend, f"{prefix}-puts", InclineRouterOne)
+            return lambda i: ramp.puts([{
+                'kid': f"puts-{i}-{k}",
+                'dat': payload(k)
+            } for k in range(batch)])
+
+        return setup
+
+    out.append(
+        BenchCase(f"{backend}.client.puts{BENCH_BATCH}", puts(BENCH_BATCH)))
+    out.append(
+        BenchCase(f"{backend}.client.puts{BENCH_BATCH * 10}",
+                  puts(BENCH_BATCH * 10)))
+
+    def gets() -> Callable[[int], Any]:
+        ramp = bench_client(backend, f"{prefix}-gets", InclineRouterOne)
+        keys = [f"gets-{k}" for k in range(BENCH_BATCH)]
+        ramp.puts([{'kid': k, 'dat': payload(0)} for k in keys])
+        return lambda i: ramp.get(keys)
+
+    def gets_repair() -> Callable[[int], Any]:
+        """
+        A newer batch is prepared everywhere but committed for one key only,
+        so every get repairs the rest from the log in RAMP round 2
+        """
+        ramp = bench_client(backend, f"{prefix}-repair", InclineRouterOne)
+        keys = [f"repair-{k}" for k in range(BENCH_BATCH)]
+        ramp.puts([{'kid': k, 'dat': payload(0)} for k in keys])
+
+        location = ramp.rtr.write[0]
+        con = ramp.ds_open(location)
+        pxn = ramp.prepare.pxn()
+        dat: list[dict[str, Any]] = [{
+            'kid': k,
+            'dat': payload(1),
+            'datastores': [location]
+        } for k in keys]
+        if len(dat) > ramp.writeset_min:
+            con.prepare(incline_writeset_kid(pxn), pxn,
+                        ramp.genwriteset(pxn, dat), {'keys': len(dat)})
+        for d in dat:
+            met = ramp.genmet(d['datastores'], location, d['kid'], pxn, dat)
+            con.prepare(d['kid'], pxn, met, d['dat'])
+        con.commit(keys[0], pxn)
+        return lambda i: ramp.get(keys)
+
+    out.append(BenchCase(f"{backend}.client.get{BENCH_BATCH}", gets))
+    out.append(
+        BenchCase(f"{backend}.client.get{BENCH_BATCH}.repair", gets_repair))
+
+    def history() -> Callable[[int], Any]:
+        ramp = bench_client(backend, f"{prefix}-history", InclineRouterOne)
+        for i in range(BENCH_HISTORY):
+            ramp.put('history', payload(i))
+        return lambda i: ramp.history('history', limit=BENCH_HISTORY)
+
+    out.append(BenchCase(f"{backend}.client.history", history))
+
+    def index() -> Callable[[int], Any]:
+        ramp = bench_client(backend, f"{prefix}-index", InclineRouterOne)
+        ramp.set_index(InclineIndex(name='name', path='name'))
+        ramp.put('index', payload(0))
+        try:
+            ramp.index('name', payload(0)['name'])
+        except InclineNotFound:
+            raise NotImplementedError(f"{backend} has no index support")
+        return lambda i: ramp.index('name', payload(0)['name'])
+
+    out.append(BenchCase(f"{backend}.client.index", index))
+    return out
+
+
+def compare(results: list[BenchResult], baseline: dict[str, Any],
+            threshold: float) -> list[str]:
+    """
+    Print changes against a previous run, return regressed case names
+    """
+    base = {r['name']: r for r in baseline.get('results', [])}
+    regressions = []
+    print(f"\n{'case':<36} {'ops/s':>12} {'base':>12} {'change':>8}")
+    for r in results:
+        b = base.get(r.name)
+        if r.skipped or not b or b.get('skipped') or not b.get('ops'):
+            continue
+        change = (r.ops - b['ops']) / b['ops'] * 100
+        flag = ''
+        if change < -threshold:
+            flag = ' REGRESSION'
+            regressions.append(r.name)
+        print(f"{r.name:<36} {r.ops:>12,.0f} {b['ops']:>12,.0f} "
+              f"{change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backend',
+                        action='append',
+                        choices=BENCH_BACKENDS,
+                        help='backend to run, default all')
+    parser.add_argument('--number', type=int, default=BENCH_NUMBER)
+    parser.add_argument('--alloc-number', type=int, default=BENCH_ALLOC_NUMBER)
+    parser.add_argument('--filter', help='only cases containing this string')
+    parser.add_argument('--output', help='save results as JSON')
+    parser.add_argument('--compare', help='JSON results of a previous run')
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=BENCH_THRESHOLD,
+                        help='ops/sec drop in percent flagged as regression')
+    args = parser.parse_args()
+
+    # read-atomic repair cases warn on every get
+    logging.getLogger('incline').setLevel(logging.ERROR)
+
+    results: list[BenchResult] = []
+    print(f"{'case':<36} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} "
+          f"{'alloc KiB':>10}")
+    with dynamo_stub():
+        for backend in args.backend or BENCH_BACKENDS:
+            for case in cases(backend):
+                if args.filter and args.filter not in case.name:
+                    continue
+                r = run_case(case, args.number, args.alloc_number)
+                results.append(r)
+                if r.skipped:
+                    print(f"{r.name:<36} skipped: {r.skipped}")
+                    continue
+                print(f"{r.name:<36} {r.ops:>12,.0f} {r.p50:>10.1f} "
+                      f"{r.p99:>10.1f} {r.alloc / 1024:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(
+                {
+                    'meta': {
+                        'incline':
+                        incline.__version__,
+                        'python':
+                        platform.python_version(),
+                        'date':
+                        datetime.datetime.now(
+                            datetime.timezone.utc).isoformat(),
+                        'number':
+                        args.number
+                    },
+                    'results': [asdict(r) for r in results]
+                },
+                f,
+                indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
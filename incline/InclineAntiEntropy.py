@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import threading
+from incline.InclineDatastore import InclineDatastore
+from incline.InclinePrepare import InclinePxn
+from incline.InclineRefresh import InclineRefresh
+from incline.InclineTrace import InclineTrace
+from incline.merkle import InclineMerkle, INCLINE_MERKLE_DEPTH
+from incline.throttle import InclineThrottle
+
+INCLINE_ANTIENTROPY_BATCH = 100
+INCLINE_ANTIENTROPY_RATE = 0.0
+INCLINE_ANTIENTROPY_INTERVAL = 3600.0
+
+
+@dataclass
+class InclineAntiEntropyStats:
+    """
+    scanned:    txn versions read to build the trees
+    compared:   tree nodes compared
+    divergent:  keys whose latest version differs between datastores
+    repaired:   commits to datastores that were behind
+    errors:     commits that failed
+    """
+    scanned: int = field(default=0)
+    compared: int = field(default=0)
+    divergent: int = field(default=0)
+    repaired: int = field(default=0)
+    errors: int = field(default=0)
+
+
+class InclineAntiEntropy(object):
+    """
+    Replica anti-entropy.  Builds a hash tree over the latest (kid, tsv, pxn)
+    of every key in each datastore from a txn scan, which reads no data.
+    Trees are compared top down to find the differing buckets, and only the
+    keys that differ are refreshed, from the datastore holding the newest
+    version by pxn to the others.
+    """
+
+    def __init__(self,
+                 datastores: list[InclineDatastore],
+                 depth: int = INCLINE_MERKLE_DEPTH,
+                 batch: int = INCLINE_ANTIENTROPY_BATCH,
+                 rate: float = INCLINE_ANTIENTROPY_RATE,
+                 trace: InclineTrace | None = None):
+        """
+        depth:  tree depth, 2^depth leaf buckets
+        batch:  keys per refresh
+        rate:   keys repaired per second, zero is unlimited
+        """
+        self.datastores = datastores
+        self.depth = depth
+        self.batch = batch
+        self.throttle = InclineThrottle(rate=rate, burst=max(rate, batch))
+        self.log = logging.getLogger('incline.antientropy')
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread | None = None
+
+        if not trace:
+            trace = InclineTrace(name='incline.antientropy')
+        self.trace = trace
+        meter = trace.meter
+        assert meter
+        self.metric_divergent = meter.create_counter(
+            'incline.antientropy.divergent',
+            description='keys differing between datastores')
+        self.metric_repaired = meter.create_counter(
+            'incline.antientropy.repaired',
+            description='commits to datastores that were behind')
+
+    def tree(self, con: InclineDatastore) -> tuple[InclineMerkle, int]:
+        """
+        Hash tree of a datastore, and the txn versions scanned
+        """
+        with self.trace.span("incline.antientropy.tree") as span:
+            span.set_attribute("incline.location", con.loc())
+            tree = InclineMerkle(depth=self.depth)
+            scanned = 0
+            for txn in con.ds_iter_txn():
+                scanned += 1
+                tree.add(txn['kid'], con.pxn.decimal(txn['tsv']),
+                         str(txn.get('pxn')))
+            span.set_attribute("incline.antientropy.scanned", scanned)
+            return tree.build(), scanned
+
+    def run(self) -> InclineAntiEntropyStats:
+        """
+        One pass comparing every datastore
+        """
+        stats = InclineAntiEntropyStats()
+        if len(self.datastores) < 2:
+            return stats
+
+        with self.trace.span("incline.antientropy.run") as span:
+            with ThreadPoolExecutor(
+                    max_workers=len(self.datastores),
+                    thread_name_prefix='incline-antientropy') as executor:
+                built = list(executor.map(self.tree, self.datastores))
+            trees = [t for t, _ in built]
+            stats.scanned = sum(s for _, s in built)
+
+            # any key differing between two datastores differs from the first
+            divergent: set[str] = set()
+            for tree in trees[1:]:
+                kids, compared = trees[0].diff_keys(tree)
+                stats.compared += compared
+                divergent.update(kids)
+            stats.divergent = len(divergent)
+            if divergent:
+                self.metric_divergent.add(len(divergent))
+
+            # group by the datastore holding the newest version
+            sources: dict[int, list[str]] = dict()
+            for kid in sorted(divergent):
+                newest = max(range(len(trees)),
+                             key=lambda i: self.latest(trees[i], kid))
+                sources.setdefault(newest, list()).append(kid)
+            for i, kids in sources.items():
+                self.repair(self.datastores[i], kids, stats)
+
+            span.set_attribute("incline.antientropy.divergent",
+                               stats.divergent)
+            span.set_attribute("incline.antientropy.repaired", stats.repaired)
+            self.log.info('antientropy scanned %d divergent %d repaired %d',
+                          stats.scanned, stats.divergent, stats.repaired)
+            return stats
+
+    def latest(self, tree: InclineMerkle, kid: str) -> InclinePxn:
+        """
+        pxn of the latest version of a key, which orders versions across
+        datastores where each stamps its own tsv
+        """
+        latest = tree.latest(kid)
+        if not latest:
+            return InclinePxn(cnt=0, cid=0)
+        return InclinePxn().loads(latest[1])
+
+    def repair(self, source: InclineDatastore, kids: list[str],
+               stats: InclineAntiEntropyStats) -> None:
+        refresh = InclineRefresh(source,
+                                 self.datastores,
+                                 batch=self.batch,
+                                 trace=self.trace)
+        for i in range(0, len(kids), self.batch):
+            batch = kids[i:i + self.batch]
+            self.throttle.acquire(len(batch))
+            result = refresh.refresh_batch(batch)
+            stats.repaired += result.refreshed
+            stats.errors += result.errors
+            if result.refreshed:
+                self.metric_repaired.add(result.refreshed,
+                                         {'incline.location': source.loc()})
+
+    def start(self, interval: float = INCLINE_ANTIENTROPY_INTERVAL) -> None:
+        """
+        Run a pass every interval seconds on a daemon thread
+        """
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.serve,
+                                       args=(interval, ),
+                                       name='incline-antientropy',
+                                       daemon=True)
+        self.thread.start()
+
+    def serve(self, interval: float) -> None:
+        while not self.stop_event.is_set():
+            try:
+                self.run()
+            except Exception as e:
+                self.log.warning('antientropy pass failed: %s', e)
+            self.stop_event.wait(interval)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
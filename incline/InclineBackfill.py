@@ -0,0 +1,228 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import collections.abc
+import logging
+import threading
+from typing import Any
+from incline.checkpoint import InclineCheckpoint
+from incline.InclineDatastore import InclineDatastore
+from incline.InclineIndex import InclineIndex
+from incline.InclineTrace import InclineTrace
+from incline.throttle import InclineThrottle
+
+INCLINE_BACKFILL_BATCH = 100
+INCLINE_BACKFILL_SEGMENTS = 4
+INCLINE_BACKFILL_RATE = 0.0
+
+
+@dataclass
+class InclineBackfillStats:
+    """
+    scanned:    keys read
+    updated:    latest versions given new index attributes
+    current:    latest versions already indexed
+    deleted:    keys deleted, tombstones are not indexed
+    errors:     updates that failed
+    """
+    scanned: int = field(default=0)
+    updated: int = field(default=0)
+    current: int = field(default=0)
+    deleted: int = field(default=0)
+    errors: int = field(default=0)
+
+    def add(self, other: "InclineBackfillStats") -> None:
+        self.scanned += other.scanned
+        self.updated += other.updated
+        self.current += other.current
+        self.deleted += other.deleted
+        self.errors += other.errors
+
+
+class InclineBackfill(object):
+    """
+    Index backfill, adding the attributes of indexes to the latest version of
+    every key already in a datastore.  Attributes are updated in place, no
+    version is written.
+
+    The txn table is scanned in parallel segments, a worker each.  Keys are
+    read in batches, index values are computed from dat, and only versions
+    whose index attributes differ are updated, with their multi-value index
+    entries.  The key rate is limited, and the scan position of each segment
+    is checkpointed after every batch so a restart resumes after it.
+
+    The indexes are set on the datastore, so writes during the backfill
+    maintain them.
+    """
+
+    def __init__(self,
+                 datastore: InclineDatastore,
+                 indexes: list[InclineIndex] | None = None,
+                 batch: int = INCLINE_BACKFILL_BATCH,
+                 segments: int = INCLINE_BACKFILL_SEGMENTS,
+                 rate: float = INCLINE_BACKFILL_RATE,
+                 checkpoint: InclineCheckpoint | None = None,
+                 trace: InclineTrace | None = None):
+        """
+        indexes:    indexes to backfill, defaults to those of the datastore
+        batch:      keys per read
+        segments:   parallel scan segments, and workers
+        rate:       keys per second, zero is unlimited
+        checkpoint: where progress is saved, and resumed from
+        """
+        self.datastore = datastore
+        if indexes is None:
+            indexes = list(datastore.indexes.values())
+        for index in indexes:
+            datastore.set_index(index)
+        self.indexes = indexes
+        self.names = sorted(i.name for i in indexes)
+        self.attrs = [
+            f"{prefix}_{name}" for name in self.names
+            for prefix in ('idx', 'ids', 'idm')
+        ]
+        self.batch = batch
+        self.segments = max(segments, 1)
+        self.throttle = InclineThrottle(rate=rate, burst=max(rate, batch))
+        self.checkpoint = checkpoint
+        self.positions: dict[int, Any] = dict()
+        self.lock = threading.Lock()
+        self.log = logging.getLogger('incline.backfill')
+        if not trace:
+            trace = InclineTrace(name='incline.backfill')
+        self.trace = trace
+        meter = trace.meter
+        assert meter
+        self.metric_scanned = meter.create_counter('incline.backfill.scanned',
+                                                   description='keys read')
+        self.metric_updated = meter.create_counter(
+            'incline.backfill.updated',
+            description='versions given index attributes')
+
+    def kids(self, segment: int) -> collections.abc.Iterator[tuple[str, Any]]:
+        """
+        (key, scan position) of the distinct keys of a scan segment, after its
+        saved position.  Scans return every version grouped by key, and a
+        position covers only keys already read.
+        """
+        position = self.positions.get(segment)
+        last = None
+        for txn in self.datastore.ds_iter_txn(segment=segment,
+                                              segments=self.segments,
+                                              start=position):
+            position = txn.get('pos', position)
+            if txn['kid'] != last:
+                last = txn['kid']
+                yield txn['kid'], position
+
+    def run(self) -> InclineBackfillStats:
+        stats = InclineBackfillStats()
+        loc = self.datastore.loc()
+        state = self.checkpoint.load() if self.checkpoint else None
+        resume = (state or {}).get(loc)
+        self.positions = dict()
+        if resume and resume.get('segments') == self.segments and resume.get(
+                'indexes') == self.names:
+            self.positions = {
+                int(k): v
+                for k, v in resume.get('positions', {}).items()
+            }
+            self.log.info('backfill %s resume %d segments', loc,
+                          len(self.positions))
+
+        with self.trace.span("incline.backfill.run") as span:
+            span.set_attribute("incline.location", loc)
+            span.set_attribute("incline.backfill.indexes", self.names)
+            with ThreadPoolExecutor(
+                    max_workers=self.segments,
+                    thread_name_prefix='incline-backfill') as executor:
+                for result in executor.map(self.run_segment,
+                                           range(self.segments)):
+                    stats.add(result)
+
+            span.set_attribute("incline.backfill.scanned", stats.scanned)
+            span.set_attribute("incline.backfill.updated", stats.updated)
+            self.log.info('backfill %s [%s] scanned %d updated %d errors %d',
+                          loc, ','.join(self.names), stats.scanned,
+                          stats.updated, stats.errors)
+            return stats
+
+    def run_segment(self, segment: int) -> InclineBackfillStats:
+        stats = InclineBackfillStats()
+        batch: list[str] = list()
+        position = None
+        for kid, position in self.kids(segment):
+            batch.append(kid)
+            if len(batch) >= self.batch:
+                self.throttle.acquire(len(batch))
+                stats.add(self.backfill_batch(batch))
+                self.save(segment, position)
+                batch = list()
+        if batch:
+            self.throttle.acquire(len(batch))
+            stats.add(self.backfill_batch(batch))
+            self.save(segment, position)
+        return stats
+
+    def save(self, segment: int, position: Any) -> None:
+        with self.lock:
+            self.positions[segment] = position
+            if not self.checkpoint:
+                return
+            state = self.checkpoint.load() or dict()
+            state[self.datastore.loc()] = {
+                'segments': self.segments,
+                'indexes': self.names,
+                'positions': {
+                    str(k): v
+                    for k, v in self.positions.items()
+                }
+            }
+            self.checkpoint.save(state)
+
+    def backfill_batch(self, kids: list[str]) -> InclineBackfillStats:
+        stats = InclineBackfillStats(scanned=len(kids))
+        attrs = {'incline.location': self.datastore.loc()}
+        self.metric_scanned.add(len(kids), attrs)
+
+        for kid, txns in self.datastore.ds_get_txns(kids).items():
+            txn = self.datastore.first(txns)
+            if not txn:
+                continue
+            if txn.get('tmb'):
+                stats.deleted += 1
+                continue
+            try:
+                if not self.backfill_txn(txn):
+                    stats.current += 1
+                    continue
+            except Exception as e:
+                self.log.warning('backfill %s on %s failed: %s', kid,
+                                 self.datastore.loc(), e)
+                stats.errors += 1
+                continue
+            stats.updated += 1
+            self.metric_updated.add(1, attrs)
+        return stats
+
+    def backfill_txn(self, txn: dict[str, Any]) -> bool:
+        """
+        Update the index attributes of a txn where they differ, False when
+        already current
+        """
+        record = self.datastore.data_to_records([txn])[0]
+        values = self.datastore.index_attrs({'dat': record.dat}, self.indexes)
+        current = {k: txn[k] for k in self.attrs if k in txn}
+        if current == values:
+            return False
+        remove = [k for k in current if k not in values]
+        self.datastore.ds_update_txn_index(txn['kid'], txn['tsv'], values,
+                                           remove)
+
+        # multi-value index entries of the updated version
+        updated = {k: v for k, v in txn.items() if k not in remove}
+        updated.update(values)
+        puts, deletes = self.datastore.index_changes(updated, txn)
+        self.datastore.ds_update_idx(
+            [p for p in puts if p['idx'] in self.names],
+            [d for d in deletes if d['idx'] in self.names])
+        return True
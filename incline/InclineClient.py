@@ -1,21 +1,70 @@
+import collections.abc
+from concurrent.futures import (ThreadPoolExecutor, Future, wait,
+                                FIRST_COMPLETED)
 from decimal import Decimal
-import json
+import heapq
 import itertools
+import json
 import logging
+import math
 import sys
-from typing import Any
+import time
+from typing import Any, Callable
 from incline.base62 import base_encode
-from incline.InclineDatastore import incline_resolve
+from incline.InclineAntiEntropy import (InclineAntiEntropy,
+                                        INCLINE_ANTIENTROPY_RATE)
+from incline.InclineBackfill import (InclineBackfill, InclineBackfillStats,
+                                     INCLINE_BACKFILL_RATE)
+from incline.checkpoint import InclineCheckpoint
+from incline.codec import InclineCodec
+from incline.InclineCommitter import (InclineCommitter, INCLINE_COMMIT_QUEUE,
+                                      INCLINE_COMMIT_WORKERS)
+from incline.InclineDatastore import (InclineDatastore,
+                                      INCLINE_CHUNK_THRESHOLD,
+                                      INCLINE_CHUNK_SIZE,
+                                      INCLINE_DELTA_SNAPSHOT)
+# built-in datastores register their factories on import
 from incline.InclineDatastoreDynamo import InclineDatastoreDynamo
-from incline.InclineIndex import InclineIndex
-from incline.InclineMeta import InclineMeta, InclineMetaWrite
+from incline.InclineDatastoreMemory import InclineDatastoreMemory
+from incline.InclineDivergence import InclineDivergence
+from incline.InclineFeed import InclineFeed, INCLINE_FEED_BATCH
+from incline.InclineFilter import (InclineFilter, incline_filter_compile,
+                                   incline_filter_equals)
+from incline.InclineIndex import (InclineIndex, InclineIndexCondition,
+                                  INCLINE_INDEX_PAGE, incline_index_token,
+                                  incline_index_state)
+from incline.InclineLatency import InclineLatency
+from incline.InclineLocation import InclineLocation, incline_location
+from incline.InclineMeta import (InclineMeta, InclineMetaWrite,
+                                 incline_writeset_kid, INCLINE_META_WRITESET)
 from incline.InclinePrepare import InclinePrepare, InclinePxn
+from incline.page import page
+from incline.InclineRefresh import (InclineRefresh, InclineRefreshStats,
+                                    INCLINE_REFRESH_RATE)
+from incline.InclineRecovery import (InclineRecovery, INCLINE_RECOVERY_TIMEOUT,
+                                     INCLINE_RECOVERY_RATE)
 from incline.InclineRecord import InclineRecord
 from incline.InclineResponse import InclineResponse
 from incline.InclineTrace import InclineTrace
-from incline.router import InclineRouterOne
+from incline.registry import (incline_registration,
+                              INCLINE_CAPABILITY_BATCH_GET,
+                              INCLINE_CAPABILITY_INDEXES,
+                              INCLINE_CAPABILITY_CHANGES)
+from incline.router import InclineRouter, InclineRouterOne
 from incline.error import InclineNotFound, InclineInterface
 
+INCLINE_READ_HEDGE = 'hedge'
+INCLINE_READ_VERIFY = 'verify'
+INCLINE_READ_POLICIES = [INCLINE_READ_HEDGE, INCLINE_READ_VERIFY]
+INCLINE_COMMIT_SYNC = 'sync'
+INCLINE_COMMIT_BEHIND = 'behind'
+INCLINE_COMMIT_POLICIES = [INCLINE_COMMIT_SYNC, INCLINE_COMMIT_BEHIND]
+INCLINE_CLIENT_WORKERS = 8
+INCLINE_WRITESET_MIN = 8
+INCLINE_WRITESET_CACHE = 1024
+INCLINE_SNAPSHOT_BATCH = 100
+INCLINE_SEARCH_BATCH = 100
+
 
 class InclineClient(object):
 
@@ -25,25 +74,63 @@ class InclineClient(object):
                  cid: str | None = None,
                  uid: str | None = None,
                  rid: str | None = None,
-                 trace: InclineTrace | None = None):
+                 trace: InclineTrace | None = None,
+                 read_policy: str = INCLINE_READ_HEDGE,
+                 commit_policy: str = INCLINE_COMMIT_SYNC,
+                 on_divergence: Callable[[InclineDivergence], None]
+                 | None = None):
         """
         cid: client Id
         uid: user Id
         rid: request Id
+        read_policy: hedge reads the fastest replica, verify reads all
+        commit_policy: sync commits before returning, behind commits on a
+            background worker once prepared
+        on_divergence: called with replicas found diverged on read, must not
+            block.  A queue's put_nowait hands them to a repair worker.
         """
+        if read_policy not in INCLINE_READ_POLICIES:
+            raise InclineInterface(f"unknown read policy {read_policy}")
+        if commit_policy not in INCLINE_COMMIT_POLICIES:
+            raise InclineInterface(f"unknown commit policy {commit_policy}")
         self.name = name
         self.region = region
         self.prepare = InclinePrepare(cid=cid)
         self.__uid = uid
         self.__rid = rid
-        self.rtr = InclineRouterOne(name=self.name, region=self.region)
-        self.cons: list[InclineDatastoreDynamo] = list()
+        self.rtr: InclineRouter = InclineRouterOne(name=self.name,
+                                                   region=self.region)
+        self.cons: dict[InclineLocation, InclineDatastore] = dict()
         self.indexes: dict[str, InclineIndex] = {}
+        # indexes holding every key, which search may answer from
+        self.indexes_complete: set[str] = set()
+        self.read_policy = read_policy
+        self.latency: dict[str, InclineLatency] = {}
+        self.workers = INCLINE_CLIENT_WORKERS
+        self.__executor: ThreadPoolExecutor | None = None
+        self.commit_policy = commit_policy
+        self.commit_workers = INCLINE_COMMIT_WORKERS
+        self.commit_queue = INCLINE_COMMIT_QUEUE
+        self.__committer: InclineCommitter | None = None
+        self.writeset_min = INCLINE_WRITESET_MIN
+        self.writesets: collections.OrderedDict[
+            str, InclineMeta] = collections.OrderedDict()
+
+        self.on_divergence = on_divergence
+        self.codec: InclineCodec | None = None
+        self.chunk_threshold = INCLINE_CHUNK_THRESHOLD
+        self.chunk_size = INCLINE_CHUNK_SIZE
+        self.delta = 0
 
         # Tracing
         self.trace = trace
         if not self.trace:
             self.trace = InclineTrace(name=name)
+        meter = self.trace.meter
+        assert meter
+        self.metric_divergence = meter.create_counter(
+            'incline.client.divergence',
+            description='replicas returning different content on read')
 
         # Logging
         self.log = logging.getLogger('incline.client.' + self.name)
@@ -87,43 +174,68 @@ class InclineClient(object):
             self.__uid = '0'
         return self.__uid
 
-    def get(self, keys: list[str] | str) -> InclineResponse:
+    def get(self,
+            keys: list[str] | str,
+            fields: list[str] | None = None,
+            as_of: Decimal | None = None) -> InclineResponse:
+        """
+        fields reads only those fields of each record, with the version
+        identity.  Metadata is always read, round 2 needs it.
+
+        as_of reads every key as of a tsv, the latest version at or before
+        it.  Use snapshot to stream large key sets.
+        """
         vals = dict()
         if not keys:
             raise InclineInterface('client get with no keys')
         if not isinstance(keys, list):
             keys = [keys]
+        if fields:
+            fields = list(dict.fromkeys(fields + ['met']))
 
         self.log.info('get [%s]', ','.join(keys))
 
         pxn = InclinePxn(cid=0, cnt=0)
 
         # Round 1 - GET highest commit for each key
-        for k in keys:
-            val = self.getkey(k)
-            vals[val.kid] = val
+        if as_of:
+            round1 = self.getkeys_asof(keys, as_of, fields=fields)
+            if len(round1) != len(keys):
+                raise InclineNotFound('key not found in any datastore')
+        else:
+            round1 = self.getkeys(keys, fields=fields)
+        for k, val in round1.items():
+            vals[k] = val
+
+        # Round 2 - Resolve inconsistencies
+        self.readatomic(vals, fields)
+
+        resp = InclineResponse(pxn=pxn)
+        for k, v in vals.items():
+            resp.data[k] = v
 
             # preserve highest pxn for response
-            if val.pxn > pxn:
-                pxn = val.pxn
+            if v.pxn > resp.pxn:
+                resp.pxn = v.pxn
+        return resp
 
-        # Round 2 - Resolve inconsistencies
+    def readatomic(self, vals: dict[str, InclineRecord],
+                   fields: list[str] | None) -> None:
+        """
+        RAMP round 2, replace records older than a write another record in
+        the set references with that write, from the log
+        """
+        writesets: set[str] = set()
         for v in vals.values():
-            for m in v.met.meta:
+            for m in self.metawrites(v.met, writesets):
                 # 2.1 - Verify each val metadata older than other vals in set
                 if m.kid in vals and (vals[m.kid].pxn < m.pxn):
                     self.log.warning(f"get readatomic {m.kid} {m.loc} {m.pxn}")
                     # 2.2 - GET from LOG any missing newer keys
-                    vals[m.kid] = self.getlog(m.kid, m.loc, m.pxn)
-
-                    # preserve highest pxn for response
-                    if val.pxn > pxn:
-                        pxn = val.pxn
-
-        resp = InclineResponse(pxn=pxn)
-        for k, v in vals.items():
-            resp.data[k] = v
-        return resp
+                    vals[m.kid] = self.getlog(m.kid,
+                                              m.loc,
+                                              m.pxn,
+                                              fields=fields)
 
     def put(self, kid: str, dat: dict[str, Any]) -> InclineResponse:
         self.log.info('put %s', kid)
@@ -138,8 +250,88 @@ class InclineClient(object):
         resp = self.putatomic(dat)
         return resp
 
-    def search(self) -> None:
-        pass
+    def search(
+        self,
+        where: InclineFilter,
+        batch: int = INCLINE_SEARCH_BATCH
+    ) -> collections.abc.Iterator[InclineRecord]:
+        """
+        Stream the latest records whose dat matches a filter, a batch at a
+        time.  An equality on the path of an index is answered by the index,
+        other filters scan the search datastores in parallel with the filter
+        pushed down.  Matches are made RAMP consistent and checked again, so
+        versions since superseded, changed or deleted are left out.
+        """
+        predicate = incline_filter_compile(where)
+        found: set[str] = set()
+        for hits in self.search_hits(where, batch):
+            for k, v in self.hit_records(hits, None).items():
+                if k in found or not predicate(v.dat):
+                    continue
+                found.add(k)
+                yield v
+        self.log.info('search %s found %d', where.op, len(found))
+
+    def search_hits(
+            self, where: InclineFilter,
+            batch: int) -> collections.abc.Iterator[dict[str, set[str]]]:
+        """
+        Batches of versions that may match a filter, {kid: {pxn}}
+        """
+        equals = incline_filter_equals(where)
+        for index in self.indexes.values():
+            if index.multi or index.value or index.path not in equals:
+                continue
+            if index.name not in self.indexes_complete:
+                continue
+            indexed = self.rtr.lookup('index', index.name)
+            if not indexed or not all(
+                    self.ds_capable(ds, INCLINE_CAPABILITY_INDEXES)
+                    for ds in indexed):
+                continue
+            self.log.info('search index %s', index.name)
+            hits: dict[str, set[str]] = dict()
+            for entry in self.index_iter(index.name,
+                                         equals[index.path],
+                                         fields=['pxn'],
+                                         limit=batch):
+                hits.setdefault(entry['kid'], set()).add(entry['pxn'])
+                if len(hits) >= batch:
+                    yield hits
+                    hits = dict()
+            if hits:
+                yield hits
+            return
+
+        datastores = self.rtr.lookup('search', '')
+        self.log.info('search scan [%s]', ','.join(datastores))
+        # open in the caller thread, the connection list is not locked
+        scans = {
+            ds: self.ds_open(ds).ds_search_txn(where)
+            for ds in datastores
+        }
+        executor = self.executor()
+        while scans:
+            futures = {
+                ds: executor.submit(self.search_read, scan, batch)
+                for ds, scan in scans.items()
+            }
+            hits = dict()
+            for ds, fut in futures.items():
+                read = fut.result()
+                if len(read) < batch:
+                    del scans[ds]
+                for txn in read:
+                    hits.setdefault(txn['kid'], set()).add(txn['pxn'])
+            if hits:
+                yield hits
+
+    def search_read(self, scan: collections.abc.Iterator[dict[str, Any]],
+                    batch: int) -> list[dict[str, Any]]:
+        """
+        Read the next batch of a datastore search
+        """
+        return list(itertools.islice(scan, batch))
 
     def create(self, kid: str, dat: dict[str, Any]) -> InclineResponse:
         self.log.info('create %s', kid)
@@ -166,19 +358,21 @@ class InclineClient(object):
     def history(self,
                 key: str,
                 tsv: Decimal | None = None,
-                limit: int = 0) -> InclineResponse:
+                limit: int = 0,
+                fields: list[str] | None = None) -> InclineResponse:
         """
         History returns a page of history starting at tsv or most recent
 
         tsv     - timestamp less than or equal to
         limit   - zero is unlimited, otherwise the number of items to return
+        fields  - only these fields of each version
         """
         datastores = self.rtr.lookup('read', key)
         self.log.info('history %s [%s]', key, ','.join(datastores))
         vals: list[InclineRecord] = list()
         for ds in datastores:
             con = self.ds_open(ds)
-            val = con.get(key, tsv=tsv, limit=limit)
+            val = con.get(key, tsv=tsv, limit=limit, fields=fields)
             for v in val:
                 vals.append(v)
         if not vals:
@@ -195,24 +389,226 @@ class InclineClient(object):
 
         return resp
 
-    def getkey(self, key: str) -> InclineRecord:
+    def getkey(self,
+               key: str,
+               policy: str | None = None,
+               fields: list[str] | None = None) -> InclineRecord:
+        """
+        Read the latest committed version of a key.
+
+        policy verify reads every replica and compares.  policy hedge reads
+        the fastest replica, and only asks the next replica when the first has
+        not answered within its p95 latency.  RAMP round 2 still repairs any
+        missing writes from the log.
+        """
+        if not policy:
+            policy = self.read_policy
         datastores = self.rtr.lookup('read', key)
-        self.log.info('getkey %s [%s]', key, ','.join(datastores))
-        vals: list[InclineRecord] = list()
-        for ds in datastores:
+        self.log.info('getkey %s %s [%s]', key, policy, ','.join(datastores))
+        if policy == INCLINE_READ_VERIFY or len(datastores) == 1:
+            vals: list[InclineRecord] = list()
+            for ds in datastores:
+                val = self.ds_read(ds, key, fields=fields)
+                for v in val:
+                    vals.append(v)
+            if not vals:
+                raise InclineNotFound('key not found in any datastore')
+            return self.verify(vals)
+        elif policy == INCLINE_READ_HEDGE:
+            return self.getkey_hedge(key, datastores, fields=fields)
+        raise InclineInterface(f"unknown read policy {policy}")
+
+    def getkeys(self,
+                keys: list[str],
+                fields: list[str] | None = None) -> dict[str, InclineRecord]:
+        """
+        Round 1 reads, in key order.  Keys routed to a single datastore with
+        the batch_get capability are read in one request per datastore, the
+        rest key by key.
+        """
+        vals: dict[str, InclineRecord] = dict()
+        batches: dict[str, list[str]] = dict()
+        for k in keys:
+            datastores = self.rtr.lookup('read', k)
+            if len(datastores) == 1 and self.ds_capable(
+                    datastores[0], INCLINE_CAPABILITY_BATCH_GET):
+                batches.setdefault(datastores[0], []).append(k)
+                continue
+            vals[k] = self.getkey(k, fields=fields)
+
+        for ds, kids in batches.items():
+            self.log.info('getkeys [%s] %s', ','.join(kids), ds)
             con = self.ds_open(ds)
-            val = con.get(key)
-            for v in val:
-                vals.append(v)
-        if not vals:
-            raise InclineNotFound('key not found in any datastore')
-        return self.verify(vals)
+            start = time.monotonic()
+            recs = con.get_batch(kids, fields=fields)
+            self.ds_latency(ds).add(time.monotonic() - start)
+            for k in kids:
+                if not recs.get(k):
+                    raise InclineNotFound('key not found in any datastore')
+                vals[k] = self.verify(recs[k])
+
+        return {k: vals[k] for k in keys}
+
+    def getkeys_asof(
+            self,
+            keys: list[str],
+            as_of: Decimal | None,
+            fields: list[str] | None = None) -> dict[str, InclineRecord]:
+        """
+        Round 1 reads as of a tsv, or the latest with None, in key order,
+        leaving out keys not found then.  Keys are read in batches per
+        datastore, in parallel, from the fastest replica and then the next for
+        keys not found, or from every replica with the verify policy.
+        """
+        datastores = {k: self.rtr.lookup('read', k) for k in keys}
+        verify = self.read_policy == INCLINE_READ_VERIFY
+        if not verify:
+            datastores = {
+                k: sorted(d, key=lambda ds: self.ds_latency(ds).rank())
+                for k, d in datastores.items()
+            }
+        found: dict[str, list[InclineRecord]] = dict()
+        replica = 0
+        while True:
+            batches: dict[str, list[str]] = dict()
+            for k, d in datastores.items():
+                if verify:
+                    targets = d if replica == 0 else []
+                elif k in found or replica >= len(d):
+                    targets = []
+                else:
+                    targets = [d[replica]]
+                for ds in targets:
+                    batches.setdefault(ds, []).append(k)
+            if not batches:
+                break
+            for k, recs in self.getbatches(batches, as_of, fields).items():
+                if recs:
+                    found.setdefault(k, []).extend(recs)
+            replica += 1
+        return {k: self.verify(found[k]) for k in keys if k in found}
+
+    def getbatches(self, batches: dict[str, list[str]], as_of: Decimal | None,
+                   fields: list[str] | None) -> dict[str, list[InclineRecord]]:
+        """
+        Read keys from datastores as of a tsv, a batch per request in parallel
+        """
+        executor = self.executor()
+        futures: list[Future[dict[str, list[InclineRecord]]]] = list()
+        for ds, kids in batches.items():
+            self.log.info('getbatches %d as of %s %s', len(kids), as_of, ds)
+            # open in the caller thread, the connection list is not locked
+            con = self.ds_open(ds)
+            for batch in page(kids, INCLINE_SNAPSHOT_BATCH):
+                futures.append(
+                    executor.submit(con.get_batch, batch, fields, as_of))
+        recs: dict[str, list[InclineRecord]] = dict()
+        for fut in futures:
+            for k, v in fut.result().items():
+                recs.setdefault(k, []).extend(v)
+        return recs
+
+    def snapshot(
+        self,
+        keys: list[str],
+        as_of: Decimal,
+        fields: list[str] | None = None,
+        batch: int = INCLINE_SNAPSHOT_BATCH
+    ) -> collections.abc.Iterator[InclineRecord]:
+        """
+        Stream records of many keys as of a tsv, a batch at a time, leaving
+        out keys not found then.
+
+        A first pass reads only metadata, to find the versions RAMP round 2
+        needs from the log for keys anywhere in the set.  The second pass
+        reads the records, repairing those keys from the log.
+        """
+        # Round 1 metadata - versions read and the writes they reference
+        read: dict[str, InclinePxn] = dict()
+        writes: dict[str, InclineMetaWrite] = dict()
+        writesets: set[str] = set()
+        for kids in page(keys, batch):
+            for k, v in self.getkeys_asof(kids, as_of, fields=['met']).items():
+                read[k] = v.pxn
+                for m in self.metawrites(v.met, writesets):
+                    if m.kid not in writes or writes[m.kid].pxn < m.pxn:
+                        writes[m.kid] = m
+        repair = {
+            k: m
+            for k, m in writes.items() if k in read and read[k] < m.pxn
+        }
+        self.log.info('snapshot %d as of %s repair %d', len(read), as_of,
+                      len(repair))
+
+        if fields:
+            fields = list(dict.fromkeys(fields + ['met']))
+        for kids in page([k for k in keys if k in read], batch):
+            vals = self.getkeys_asof(kids, as_of, fields=fields)
+            for k, v in vals.items():
+                write = repair.get(k)
+                if write and v.pxn < write.pxn:
+                    self.log.warning(
+                        f"snapshot readatomic {k} {write.loc} {write.pxn}")
+                    v = self.getlog(k, write.loc, write.pxn, fields=fields)
+                yield v
+
+    def getkey_hedge(self,
+                     key: str,
+                     datastores: list[str],
+                     fields: list[str] | None = None) -> InclineRecord:
+        """
+        Hedged read.  Replicas are tried fastest first by EWMA latency.  The
+        first replica to return a record wins, a replica returning nothing or
+        failing moves on to the next immediately.
+        """
+        order = sorted(datastores, key=lambda ds: self.ds_latency(ds).rank())
+        executor = self.executor()
+        pending: dict[Future[list[InclineRecord]], str] = dict()
+        errors: list[BaseException] = list()
+
+        while order or pending:
+            if order:
+                ds = order.pop(0)
+                # open in the caller thread, the connection list is not locked
+                self.ds_open(ds)
+                pending[executor.submit(self.ds_read, ds, key, fields)] = ds
+                # no samples yet, wait for the first replica
+                timeout: float | None = self.ds_latency(ds).p95
+                if timeout == math.inf:
+                    timeout = None
+            else:
+                timeout = None
+
+            done, _ = wait(pending,
+                           timeout=timeout,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                self.log.info('getkey %s hedge after %s', key, ds)
+                continue
 
-    def getlog(self, key: str, loc: str, pxn: InclinePxn) -> InclineRecord:
+            for fut in done:
+                del pending[fut]
+                err = fut.exception()
+                if err:
+                    errors.append(err)
+                    continue
+                vals = fut.result()
+                if vals:
+                    return self.verify(vals)
+
+        if errors:
+            raise errors[0]
+        raise InclineNotFound('key not found in any datastore')
+
+    def getlog(self,
+               key: str,
+               loc: str,
+               pxn: InclinePxn,
+               fields: list[str] | None = None) -> InclineRecord:
         self.log.info('getlog %s %s %s', key, loc, format(pxn))
         vals: list[InclineRecord] = list()
         con = self.ds_open(loc)
-        val = con.get(key, pxn=pxn)
+        val = con.get(key, pxn=pxn, fields=fields)
         for v in val:
             vals.append(v)
         if not vals:
@@ -221,15 +617,29 @@ class InclineClient(object):
 
     def putatomic(self,
                   dat: list[dict[str, Any]],
-                  mode: str | None = None) -> InclineResponse:
+                  mode: str | None = None,
+                  commit: str | None = None) -> InclineResponse:
         """
         InclineResponse includes a list of all InclineRecord commits to all
         datastores
 
+        commit behind returns once every prepare is in the log, with the
+        prepared records, and commits on a background worker.  Readers repair
+        from the log until the commit lands.  create always commits in line,
+        the caller needs to know whether the key existed.
+
         TODO consider an 'index' param to add per-write index
           Ex: add idx_tid when team_id is part of the key, not a data path
         """
         # TODO: check number ranges and data types (ex: dynamo decimal)
+        if not commit:
+            commit = self.commit_policy
+        if commit not in INCLINE_COMMIT_POLICIES:
+            raise InclineInterface(f"unknown commit policy {commit}")
+        for d in dat:
+            if str(d['kid']).startswith(INCLINE_META_WRITESET):
+                raise InclineInterface(f"key {d['kid']} uses reserved prefix "
+                                       f"{INCLINE_META_WRITESET}")
         datastores = list()
         pxn = self.prepare.pxn()
 
@@ -242,25 +652,51 @@ class InclineClient(object):
         # unique list of datastores
         datastores = list(set(datastores))
 
+        # large batches share one write-set, prepared before any record
+        writeset = None
+        if len(dat) > self.writeset_min:
+            writeset = self.genwriteset(pxn, dat)
+
+        prepares = []
         for ds in datastores:
             con = self.ds_open(ds)
+            if writeset:
+                con.prepare(incline_writeset_kid(pxn), pxn, writeset,
+                            {'keys': len(dat)})
             for d in dat:
                 if ds in d['datastores']:
                     met = self.genmet(d['datastores'], ds, d['kid'], pxn, dat)
-                    con.prepare(d['kid'], pxn, met, d['dat'])
+                    prepares += con.prepare(d['kid'], pxn, met, d['dat'])
 
+        if commit == INCLINE_COMMIT_BEHIND and mode != 'create':
+            self.log.info('putatomic %s commit behind', format(pxn))
+
+            def behind() -> None:
+                commits = self.commitatomic(datastores, dat, pxn, mode)
+                self.log.info('commit behind %s %d', format(pxn), len(commits))
+
+            self.committer().submit(behind)
+            records = prepares
+        else:
+            records = self.commitatomic(datastores, dat, pxn, mode)
+
+        resp = InclineResponse(pxn=pxn)
+        for r in records:
+            resp.data[r.kid] = r
+        return resp
+
+    def commitatomic(self, datastores: list[str], dat: list[dict[str, Any]],
+                     pxn: InclinePxn, mode: str | None) -> list[InclineRecord]:
+        """
+        Commit phase of putatomic, every prepare already in the log
+        """
         commits = []
         for ds in datastores:
             con = self.ds_open(ds)
             for d in dat:
                 if ds in d['datastores']:
-                    commit = con.commit(d['kid'], pxn, mode=mode)
-                    commits += commit
-
-        resp = InclineResponse(pxn=pxn)
-        for c in commits:
-            resp.data[c.kid] = c
-        return resp
+                    commits += con.commit(d['kid'], pxn, mode=mode)
+        return commits
 
     def refresh(self, key: str) -> InclineResponse:
         """
@@ -268,7 +704,7 @@ class InclineClient(object):
         datastores
         """
         # TODO: check number ranges and data types (ex: dynamo decimal)
-        txn = self.getkey(key)
+        txn = self.getkey(key, policy=INCLINE_READ_VERIFY)
 
         self.log.info('refresh %s %s', txn.kid, format(txn.pxn))
         datastores = self.rtr.lookup('write', txn.kid)
@@ -297,20 +733,289 @@ class InclineClient(object):
             resp.data[c.kid] = c
         return resp
 
-    def index(self, idx: str, val: Any) -> list[dict[str, Any]]:
-        datastores = self.rtr.lookup('index', idx)
-        self.log.info('index %s %s [%s]', idx, val, ','.join(datastores))
-        vals: list[dict[str, Any]] = []
+    def refresh_bulk(
+            self,
+            source: str | None = None,
+            targets: list[str] | None = None,
+            checkpoint: InclineCheckpoint | None = None,
+            rate: float = INCLINE_REFRESH_RATE) -> InclineRefreshStats:
+        """
+        Copy the latest version of every key in source to targets, for
+        adding a replica.  Defaults to the first read datastore and every
+        write datastore of the router.
+        """
+        if not source:
+            source = self.rtr.read[0]
+        if targets is None:
+            targets = self.rtr.write
+        self.log.info('refresh_bulk %s [%s]', source, ','.join(targets))
+        bulk = InclineRefresh(self.ds_open(source),
+                              [self.ds_open(ds) for ds in targets],
+                              rate=rate,
+                              checkpoint=checkpoint,
+                              trace=self.trace)
+        return bulk.run()
+
+    def backfill(self,
+                 indexes: list[str] | None = None,
+                 datastores: list[str] | None = None,
+                 checkpoint: InclineCheckpoint | None = None,
+                 rate: float = INCLINE_BACKFILL_RATE) -> InclineBackfillStats:
+        """
+        Add index attributes to keys written before the indexes were set.
+        Defaults to every index of the client and every write datastore of the
+        router.
+        """
+        if indexes is None:
+            indexes = list(self.indexes)
+        for name in indexes:
+            if name not in self.indexes:
+                raise InclineInterface(f"backfill unknown index {name}")
+        if datastores is None:
+            datastores = self.rtr.write
+        self.log.info('backfill [%s] [%s]', ','.join(indexes),
+                      ','.join(datastores))
+        stats = InclineBackfillStats()
         for ds in datastores:
-            con = self.ds_open(ds)
-            items = con.ds_get_idx(idx, val)
-            for i in items:
-                vals.append(i)
+            bulk = InclineBackfill(self.ds_open(ds),
+                                   [self.indexes[name] for name in indexes],
+                                   rate=rate,
+                                   checkpoint=checkpoint,
+                                   trace=self.trace)
+            stats.add(bulk.run())
+        if not stats.errors and set(self.rtr.write) <= set(datastores):
+            self.indexes_complete.update(indexes)
+        return stats
+
+    def feed(self,
+             datastore: str | None = None,
+             fields: list[str] | None = None,
+             batch: int = INCLINE_FEED_BATCH,
+             checkpoint: InclineCheckpoint | None = None) -> InclineFeed:
+        """
+        Change feed of the txns a datastore commits, grouped into
+        transactions.  Defaults to the first write datastore of the router.
+        """
+        if datastore is None:
+            datastore = self.rtr.write[0]
+        if not self.ds_capable(datastore, INCLINE_CAPABILITY_CHANGES):
+            raise InclineInterface(f"{datastore} has no change feed")
+        self.log.info('feed %s', datastore)
+        return InclineFeed(self.ds_open(datastore),
+                           fields=fields,
+                           batch=batch,
+                           checkpoint=checkpoint,
+                           trace=self.trace)
+
+    def recovery(self,
+                 timeout: float = INCLINE_RECOVERY_TIMEOUT,
+                 rate: float = INCLINE_RECOVERY_RATE) -> InclineRecovery:
+        """
+        Recovery worker for orphaned prepares in every write datastore
+        """
+        return InclineRecovery([self.ds_open(ds) for ds in self.rtr.write],
+                               timeout=timeout,
+                               rate=rate,
+                               trace=self.trace)
+
+    def anti_entropy(
+            self,
+            datastores: list[str] | None = None,
+            rate: float = INCLINE_ANTIENTROPY_RATE) -> InclineAntiEntropy:
+        """
+        Anti-entropy worker repairing divergent keys between replicas.
+        Defaults to every write datastore of the router.
+        """
+        if datastores is None:
+            datastores = self.rtr.write
+        return InclineAntiEntropy([self.ds_open(ds) for ds in datastores],
+                                  rate=rate,
+                                  trace=self.trace)
+
+    def index(
+            self,
+            idx: str,
+            val: Any,
+            fields: list[str] | None = None,
+            cond: InclineIndexCondition | None = None) -> list[dict[str, Any]]:
+        """
+        cond is a condition on the sort key of a composite index, or on the
+        values of a multi-value index in place of val
+        """
+        vals = list(self.index_iter(idx, val, fields=fields, cond=cond))
         if not vals:
             raise InclineNotFound('idx val not found in any datastore index')
-
         return vals
 
+    def index_records(
+            self,
+            idx: str,
+            val: Any,
+            fields: list[str] | None = None,
+            cond: InclineIndexCondition | None = None) -> InclineResponse:
+        """
+        Latest records of the keys an index query finds, read in batches and
+        made RAMP consistent.  Hits on versions since superseded are dropped,
+        as are keys since deleted.
+        """
+        hits: dict[str, set[str]] = dict()
+        for entry in self.index_iter(idx, val, fields=['pxn'], cond=cond):
+            hits.setdefault(entry['kid'], set()).add(entry['pxn'])
+        self.log.info('index_records %s %s %d keys', idx, val, len(hits))
+
+        resp = InclineResponse(pxn=InclinePxn(cid=0, cnt=0))
+        for k, v in self.hit_records(hits, fields).items():
+            resp.data[k] = v
+            if v.pxn > resp.pxn:
+                resp.pxn = v.pxn
+        if not resp.data:
+            raise InclineNotFound('idx val not found in any datastore index')
+        return resp
+
+    def hit_records(self, hits: dict[str, set[str]],
+                    fields: list[str] | None) -> dict[str, InclineRecord]:
+        """
+        Latest records of keys hit by a query, {kid: {pxn}}, made RAMP
+        consistent.  Keys whose latest version is not a hit are left out.
+        """
+        if fields:
+            fields = list(dict.fromkeys(fields + ['met']))
+        vals = self.getkeys_asof(list(hits), None, fields=fields)
+        self.readatomic(vals, fields)
+
+        records: dict[str, InclineRecord] = dict()
+        for k, v in vals.items():
+            if v.pxn.pxn not in hits[k]:
+                self.log.info('hit %s stale %s', k, v.pxn)
+                continue
+            records[k] = v
+        return records
+
+    def index_iter(
+        self,
+        idx: str,
+        val: Any,
+        fields: list[str] | None = None,
+        cond: InclineIndexCondition | None = None,
+        reverse: bool = False,
+        limit: int = INCLINE_INDEX_PAGE
+    ) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        Stream index entries in index order, a page at a time
+        """
+        token = None
+        while True:
+            entries, token = self.index_page(idx,
+                                             val,
+                                             fields=fields,
+                                             cond=cond,
+                                             limit=limit,
+                                             reverse=reverse,
+                                             token=token)
+            yield from entries
+            if token is None:
+                return
+
+    def index_page(
+            self,
+            idx: str,
+            val: Any,
+            fields: list[str] | None = None,
+            cond: InclineIndexCondition | None = None,
+            limit: int = INCLINE_INDEX_PAGE,
+            reverse: bool = False,
+            token: str | None = None
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """
+        A page of up to limit index entries, merged across the read
+        datastores in index order, and a token to resume after it, None after
+        the last page.  Copies of a write read from more than one datastore
+        are returned once, the token remembers those of the last page.
+        """
+        if limit < 1:
+            raise InclineInterface(f"index limit must be positive not {limit}")
+        state = incline_index_state(token) if token else dict()
+        positions: dict[str, Any] = state.get('pos', dict())
+        # writes already returned, their copies in other datastores are skipped
+        seen = set(tuple(v) for v in state.get('seen', []))
+        datastores = list()
+        for ds in self.rtr.lookup('index', idx):
+            if not self.ds_capable(ds, INCLINE_CAPABILITY_INDEXES):
+                self.log.info('index %s skip %s', idx, ds)
+                continue
+            if ds in positions and positions[ds] is None:
+                continue
+            datastores.append(ds)
+        self.log.info('index %s %s [%s]', idx, val, ','.join(datastores))
+
+        executor = self.executor()
+        futures: dict[str, Future[tuple[list[dict[str, Any]],
+                                        dict[str, Any] | None]]] = dict()
+        for ds in datastores:
+            # open in the caller thread, the connection list is not locked
+            con = self.ds_open(ds)
+            futures[ds] = executor.submit(self.index_read, con, idx, val,
+                                          fields, cond, limit, reverse,
+                                          positions.get(ds))
+        reads = {ds: fut.result() for ds, fut in futures.items()}
+
+        def order(read: tuple[str, dict[str, Any]]) -> Any:
+            return self.ds_open(read[0]).idx_order(idx, read[1])
+
+        merged = heapq.merge(*[[(ds, e) for e in entries]
+                               for ds, (entries, _) in reads.items()],
+                             key=order,
+                             reverse=reverse)
+        entries: list[dict[str, Any]] = list()
+        versions: list[tuple[str, str | None]] = list()
+        consumed = {ds: 0 for ds in reads}
+        full = False
+        for ds, entry in merged:
+            version = (entry['kid'], entry.get('pxn'))
+            if version not in seen:
+                if full:
+                    break
+                seen.add(version)
+                versions.append(version)
+                entries.append({k: v for k, v in entry.items() if k != 'idk'})
+            positions[ds] = entry['idk']
+            consumed[ds] += 1
+            # a datastore with unread entries bounds what is in order
+            full = full or len(entries) >= limit or (consumed[ds] == len(
+                reads[ds][0]) and reads[ds][1] is not None)
+
+        for ds, (read, more) in reads.items():
+            if consumed[ds] == len(read) and more is None:
+                positions[ds] = None
+        if all(positions.get(ds, True) is None for ds in datastores):
+            return entries, None
+        return entries, incline_index_token({
+            'pos': positions,
+            'seen': [list(v) for v in versions]
+        })
+
+    def index_read(
+        self, con: InclineDatastore, idx: str, val: Any,
+        fields: list[str] | None, cond: InclineIndexCondition | None,
+        limit: int, reverse: bool, start: dict[str, Any] | None
+    ) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+        """
+        Read up to limit index entries from a datastore, and the key to
+        continue from
+        """
+        entries: list[dict[str, Any]] = list()
+        while True:
+            read, start = con.ds_query_idx(idx,
+                                           val,
+                                           fields=fields,
+                                           cond=cond,
+                                           limit=limit - len(entries),
+                                           reverse=reverse,
+                                           start=start)
+            entries.extend(read)
+            if start is None or len(entries) >= limit:
+                return entries, start
+
     def genmet(self,
                datastores: list[str],
                datastore: str,
@@ -319,16 +1024,22 @@ class InclineClient(object):
                dat: list[dict[str, Any]] = []) -> InclineMeta:
         """
         Generate metadata
+
+        Batches larger than writeset_min reference the shared write-set
+        instead of listing every other write, keeping metadata O(1) per key.
         """
         met = InclineMeta()
-        for ds in datastores:
-            con = self.ds_open(ds)
+        if len(dat) > self.writeset_min:
+            # empty location is canonicalized to the local datastore
+            met.add_write(InclineMetaWrite(incline_writeset_kid(pxn), '', pxn))
+            return met
 
+        for ds in datastores:
             # Do not add self
             if ds == datastore:
                 continue
 
-            met.add_write(InclineMetaWrite(kid, con.loc(), pxn))
+            met.add_write(InclineMetaWrite(kid, incline_location(ds).loc, pxn))
 
         # no data provided, delete/tombstone
         if not dat:
@@ -341,41 +1052,144 @@ class InclineClient(object):
                 continue
 
             for ds in d['datastores']:
-                con = self.ds_open(ds)
-                met.add_write(InclineMetaWrite(d['kid'], con.loc(), pxn))
+                met.add_write(
+                    InclineMetaWrite(d['kid'],
+                                     incline_location(ds).loc, pxn))
 
         return met
 
+    def genwriteset(self, pxn: InclinePxn,
+                    dat: list[dict[str, Any]]) -> InclineMeta:
+        """
+        Generate the shared write-set, every key in every datastore
+        """
+        met = InclineMeta()
+        for d in dat:
+            for ds in d['datastores']:
+                met.add_write(
+                    InclineMetaWrite(d['kid'],
+                                     incline_location(ds).loc, pxn))
+        return met
+
+    def getwriteset(self, write: InclineMetaWrite) -> InclineMeta:
+        """
+        Read a shared write-set from the log, cached by pxn
+        """
+        pxn = write.pxn.pxn
+        met = self.writesets.get(pxn)
+        if met is not None:
+            self.writesets.move_to_end(pxn)
+            return met
+
+        met = self.getlog(write.kid, write.loc, write.pxn, fields=['met']).met
+        self.writesets[pxn] = met
+        if len(self.writesets) > INCLINE_WRITESET_CACHE:
+            self.writesets.popitem(last=False)
+        return met
+
+    def metawrites(self, met: InclineMeta,
+                   seen: set[str]) -> list[InclineMetaWrite]:
+        """
+        Expand write-set references.  Each write-set is expanded once per
+        read, records sharing it add nothing new.
+        """
+        writes: list[InclineMetaWrite] = list()
+        for m in met.meta:
+            if not m.writeset:
+                writes.append(m)
+                continue
+            if m.pxn.pxn in seen:
+                continue
+            seen.add(m.pxn.pxn)
+            writes.extend(self.getwriteset(m).meta)
+        return writes
+
     def verify(self, vals: list[InclineRecord]) -> InclineRecord:
         """
-        Compare values returned from multiple sources, log errors, and return
-        the newest value.
+        Compare values returned from multiple sources against the newest,
+        report divergence, and return the newest value.  Values with the same
+        pxn are the same version, others are compared by the content hash
+        stored with the record.
         """
         if len(vals) == 1:
             return vals[0]
-        for v1, v2 in itertools.combinations(vals, 2):
-            val = v1
-            if v1.tsv < v2.tsv:
-                val = v2
-            if v1.dat != v2.dat:
-                print('client validation error')
-                print('A: {0}'.format(v1))
-                print('B: {0}'.format(v2))
-        return val
-
-    def set_index(self, index: InclineIndex) -> None:
+        newest = max(vals, key=lambda v: v.tsv)
+        for val in vals:
+            if val is newest or val.pxn == newest.pxn:
+                continue
+            if val.digest == newest.digest:
+                continue
+            self.diverged(InclineDivergence(newest.kid, newest, val))
+        return newest
+
+    def diverged(self, divergence: InclineDivergence) -> None:
+        self.log.info('verify %s diverged newest %s other %s', divergence.kid,
+                      format(divergence.newest), format(divergence.other))
+        self.metric_divergence.add(1)
+        if not self.on_divergence:
+            return
+        try:
+            self.on_divergence(divergence)
+        except Exception as e:
+            self.log.warning('verify %s divergence callback failed: %s',
+                             divergence.kid, e)
+
+    def set_index(self, index: InclineIndex, complete: bool = False) -> None:
         """
         Promote a nested dat.x.y.z path to the top level to enable Global
         Secondary Indexes.  Prefix with idx_
+
+        complete marks the index as holding every key, as when set before any
+        write, so search answers from it.  Otherwise it is complete once a
+        backfill of every write datastore finishes.
         """
         if not index.name:
             raise InclineInterface("invalid index with no name")
         self.indexes[index.name] = index
+        if complete:
+            self.indexes_complete.add(index.name)
+        else:
+            self.indexes_complete.discard(index.name)
 
-        for c in self.cons:
+        for c in self.cons.values():
             if index.name not in c.indexes:
                 c.set_index(index)
 
+    def set_codec(self, codec: InclineCodec | None) -> None:
+        """
+        Compress large dat on write with a codec, or stop with None.  Reads
+        decode any codec regardless.
+        """
+        self.codec = codec
+        for c in self.cons.values():
+            c.codec = codec
+
+    def set_chunking(self,
+                     threshold: int = INCLINE_CHUNK_THRESHOLD,
+                     size: int = INCLINE_CHUNK_SIZE) -> None:
+        """
+        Store encoded dat of threshold bytes or more in chunks of size bytes
+        """
+        if threshold <= 0 or size <= 0:
+            raise InclineInterface('chunk threshold and size must be positive')
+        self.chunk_threshold = threshold
+        self.chunk_size = size
+        for c in self.cons.values():
+            c.chunk_threshold = threshold
+            c.chunk_size = size
+
+    def set_delta(self, snapshot: int = INCLINE_DELTA_SNAPSHOT) -> None:
+        """
+        Commit versions as patches against the previous version, with a full
+        snapshot every snapshot versions, or stop with zero.  Reads rebuild
+        either.
+        """
+        if snapshot < 0:
+            raise InclineInterface('delta snapshot must not be negative')
+        self.delta = snapshot
+        for c in self.cons.values():
+            c.delta = snapshot
+
     def del_index(self, index: InclineIndex) -> None:
         """
         Remove an index name from the indexes
@@ -384,42 +1198,110 @@ class InclineClient(object):
             raise InclineInterface("invalid index with no name")
         if index.name in self.indexes:
             del self.indexes[index.name]
+        self.indexes_complete.discard(index.name)
 
-        for c in self.cons:
+        for c in self.cons.values():
             if index.name in c.indexes:
                 c.del_index(index)
 
-    def ds_find(self, location: str) -> InclineDatastoreDynamo | None:
-        for c in self.cons:
-            if self.ds_equal(c, location):
-                return c
-        return None
-
-    def ds_equal(self, con: InclineDatastoreDynamo, location: str) -> bool:
-        loc = incline_resolve(location)
-        return bool(con.dbtype == loc['dbtype'] and \
-                con.region == loc['region'] and \
-                con.name == loc['name'])
+    def ds_read(self,
+                location: str,
+                key: str,
+                fields: list[str] | None = None) -> list[InclineRecord]:
+        """
+        Read a key from one location, recording latency for the read policy
+        """
+        con = self.ds_open(location)
+        start = time.monotonic()
+        try:
+            return con.get(key, fields=fields)
+        finally:
+            self.ds_latency(location).add(time.monotonic() - start)
+
+    def ds_capable(self, location: str, capability: str) -> bool:
+        """
+        Whether the datastore type registered for a location supports a
+        capability, to choose the fastest path it offers
+        """
+        return incline_registration(
+            incline_location(location).dbtype).capable(capability)
+
+    def ds_latency(self, location: str) -> InclineLatency:
+        latency = self.latency.get(location)
+        if not latency:
+            latency = self.latency.setdefault(location, InclineLatency())
+        return latency
+
+    def executor(self) -> ThreadPoolExecutor:
+        if not self.__executor:
+            self.__executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix=f"incline-{self.name}")
+        return self.__executor
+
+    def committer(self) -> InclineCommitter:
+        if not self.__committer:
+            self.__committer = InclineCommitter(name=self.name,
+                                                workers=self.commit_workers,
+                                                size=self.commit_queue)
+        return self.__committer
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait for write-behind commits.  Returns False on timeout, raises the
+        first commit failure since the last flush.
+        """
+        if not self.__committer:
+            return True
+        return self.__committer.flush(timeout=timeout)
 
-    def ds_open(self, location: str) -> InclineDatastoreDynamo:
-        con = self.ds_find(location)
+    def close(self, timeout: float | None = None) -> bool:
+        """
+        Release worker threads.  Write-behind commits are flushed, outstanding
+        hedged reads are not waited for.
+        """
+        flushed = True
+        if self.__committer:
+            committer, self.__committer = self.__committer, None
+            flushed = committer.close(timeout=timeout)
+        if self.__executor:
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+        return flushed
+
+    def ds_find(self, location: str) -> InclineDatastore | None:
+        return self.cons.get(incline_location(location))
+
+    def ds_equal(self, con: InclineDatastore, location: str) -> bool:
+        loc = incline_location(location)
+        return bool(con.dbtype == loc.dbtype and \
+                con.region == loc.region and \
+                con.name == loc.name)
+
+    def ds_open(self, location: str) -> InclineDatastore:
+        """
+        Connections are registered by parsed location, lookup is a single
+        cached parse and a dict lookup.  New connections are opened by the
+        factory registered for the location dbtype.
+        """
+        loc = incline_location(location)
+        con = self.cons.get(loc)
         if con:
             return con
 
         self.log.info('dsopen %s', location)
-        loc = incline_resolve(location)
-        if loc['dbtype'] == 'dynamo':
-            con = InclineDatastoreDynamo(name=loc['name'],
-                                         region=loc['region'],
-                                         trace=self.trace)
-            con.rid(rid=self.__rid)
-            con.uid(uid=self.__uid)
-            con.pxn.cid(self.prepare.cid())
-        else:
-            raise InclineInterface('unknown datastore in location string')
+        reg = incline_registration(loc.dbtype)
+        con = reg.factory(loc.name, loc.region, self.trace)
+        con.rid(rid=self.__rid)
+        con.uid(uid=self.__uid)
+        con.pxn.cid(self.prepare.cid())
 
         for name, index in self.indexes.items():
             con.set_index(index)
+        con.codec = self.codec
+        con.chunk_threshold = self.chunk_threshold
+        con.chunk_size = self.chunk_size
+        con.delta = self.delta
 
-        self.cons.append(con)
+        self.cons[loc] = con
         return con
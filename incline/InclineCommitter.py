@@ -0,0 +1,99 @@
+import logging
+import queue
+import threading
+from typing import Callable
+from incline.error import InclineError
+
+INCLINE_COMMIT_QUEUE = 1024
+INCLINE_COMMIT_WORKERS = 4
+
+InclineCommitJob = Callable[[], None]
+
+
+class InclineCommitter(object):
+    """
+    Background commit phase for write-behind puts.
+
+    Jobs run on a pool of worker threads fed by a bounded queue.  A full queue
+    blocks submit, so callers slow to the rate commits complete.  A job that
+    fails leaves its prepare in the log, where readers repair from it and
+    refresh can commit it later.  The first failure is raised by flush.
+    """
+
+    def __init__(self,
+                 name: str = 'incline',
+                 workers: int = INCLINE_COMMIT_WORKERS,
+                 size: int = INCLINE_COMMIT_QUEUE):
+        self.name = name
+        self.workers = workers
+        self.size = size
+        self.log = logging.getLogger('incline.committer.' + self.name)
+        self.queue: queue.Queue[InclineCommitJob
+                                | None] = queue.Queue(maxsize=size)
+        self.errors: list[BaseException] = list()
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.pending = 0
+        self.closed = False
+        self.threads = [
+            threading.Thread(target=self.run,
+                             name=f"incline-commit-{self.name}-{i}",
+                             daemon=True) for i in range(workers)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, job: InclineCommitJob) -> None:
+        """
+        Queue a commit job, blocking while the queue is full
+        """
+        with self.lock:
+            if self.closed:
+                raise InclineError('commit queue closed')
+            self.pending += 1
+        self.queue.put(job)
+
+    def run(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            try:
+                job()
+            except Exception as e:
+                self.log.warning('commit behind failed: %s', e)
+                with self.lock:
+                    self.errors.append(e)
+            finally:
+                with self.lock:
+                    self.pending -= 1
+                    if not self.pending:
+                        self.idle.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait for queued commits.  Returns False on timeout, raises the first
+        commit failure since the last flush.
+        """
+        with self.lock:
+            if not self.idle.wait_for(lambda: not self.pending,
+                                      timeout=timeout):
+                return False
+            errors, self.errors = self.errors, list()
+        if errors:
+            raise errors[0]
+        return True
+
+    def close(self, timeout: float | None = None) -> bool:
+        """
+        Flush and stop the workers
+        """
+        with self.lock:
+            if self.closed:
+                return True
+            self.closed = True
+        try:
+            return self.flush(timeout=timeout)
+        finally:
+            for t in self.threads:
+                self.queue.put(None)
@@ -1,32 +1,57 @@
 from incline.error import (InclineError, InclineExists, InclineDataError,
                            InclineNotFound, InclineInterface)
 from incline.base62 import base_encode
+from incline.codec import (InclineCodec, incline_decode, incline_decode_bytes,
+                           incline_encode, incline_summary, INCLINE_CODEC_JSON,
+                           INCLINE_CODEC_LEVEL, INCLINE_DIGEST_SIZE)
+from incline.delta import incline_delta, incline_patch
 from incline.flatten import flatten
-from incline.InclineIndex import InclineIndex
+from incline.InclineFilter import InclineFilter
+from incline.InclineIndex import (InclineIndex, InclineIndexCondition,
+                                  incline_index_key, incline_index_sortable,
+                                  INCLINE_INDEX_KEY_SEPARATOR)
+from incline.InclineLocation import incline_location
 from incline.InclineMeta import InclineMeta, InclineMetaWrite
 from incline.InclinePrepare import InclinePrepare, InclinePxn
 from incline.InclineRecord import InclineRecord
 from incline.InclineTrace import InclineTrace
+import collections.abc
+from concurrent.futures import ThreadPoolExecutor
 import copy
 from decimal import Decimal
-from functools import reduce
+from functools import partial, reduce
+import hashlib
 import logging
 import operator
 import sys
+import threading
+import zlib
 from typing import Any
 from opentelemetry.trace.span import Span
 
 INCLINE_DATASTORE_INDEX_SEPARATOR = '.'
+# fields of a txn without its data, enough to compare versions and content
+INCLINE_TXN_SUMMARY = ['kid', 'tsv', 'pxn', 'tmb', 'ver', 'dig', 'siz']
+# fields every projection reads, to identify and filter a version
+INCLINE_FIELDS_REQUIRED = ['kid', 'tsv', 'pxn', 'tmb', 'ver', 'dig']
+# dat stored at or above the threshold, serialized or compressed, is split into
+# chunks.  DynamoDB items are limited to 400 KB.
+INCLINE_CHUNK_THRESHOLD = 350 * 1024
+INCLINE_CHUNK_SIZE = 256 * 1024
+INCLINE_CHUNK_WORKERS = 8
+# chunk digests known to be stored, to skip rewriting unchanged chunks
+INCLINE_CHUNK_CACHE = 4096
+# versions between full snapshots in delta mode
+INCLINE_DELTA_SNAPSHOT = 16
+# documents rebuilt from deltas, cached as the bases of later versions
+INCLINE_DELTA_CACHE = 1024
 
 
 def incline_resolve(location: str, delimiter: str = '|') -> dict[str, str]:
     """
     <type>|<region>|<name>
     """
-    parts = location.split(delimiter)
-    if len(parts) != 3:
-        raise InclineInterface('location string incorrect format')
-    return {'dbtype': parts[0], 'region': parts[1], 'name': parts[2]}
+    return incline_location(location, delimiter).to_dict()
 
 
 class InclineDatastore(object):
@@ -47,6 +72,18 @@ class InclineDatastore(object):
         self.dbtype = dbtype
         self.delimiter = '|'
         self.indexes: dict[str, InclineIndex] = {}
+        self.codec: InclineCodec | None = None
+        self.chunk_threshold = INCLINE_CHUNK_THRESHOLD
+        self.chunk_size = INCLINE_CHUNK_SIZE
+        self.chunks_known: collections.OrderedDict[
+            str, None] = collections.OrderedDict()
+        self.chunks_lock = threading.Lock()
+        # txns as patches with a full snapshot every delta versions, zero
+        # stores every version whole
+        self.delta = 0
+        self.deltas: collections.OrderedDict[tuple[str, Decimal],
+                                             Any] = collections.OrderedDict()
+        self.deltas_lock = threading.Lock()
         self.version = 1
         self.pxn = InclinePrepare()
         self.__uid = ""
@@ -81,9 +118,11 @@ class InclineDatastore(object):
             kid: str,
             tsv: Decimal | None = None,
             pxn: InclinePxn | None = None,
-            limit: int = 1) -> list[InclineRecord]:
+            limit: int = 1,
+            fields: list[str] | None = None) -> list[InclineRecord]:
         """
         limit only applies to committed transactions
+        fields reads only those fields, with the version identity
         """
         request_args = locals()
         with self.trace.span("incline.get") as span:
@@ -91,18 +130,57 @@ class InclineDatastore(object):
             result: list[dict[str, Any]]
             if tsv:
                 self.log.info('get %s tsv %s', kid, tsv)
-                return self.data_to_records(self.ds_get_txn(kid,
-                                                            tsv=tsv,
-                                                            limit=limit))
+                return self.data_to_records(
+                    self.ds_get_txn(kid, tsv=tsv, limit=limit, fields=fields))
             elif pxn:
                 self.log.info('get %s pxn %s', kid, format(pxn))
-                return self.data_to_records(self.ds_get_log(kid, pxn=pxn))
+                return self.data_to_records(
+                    self.ds_get_log(kid, pxn=pxn, fields=fields))
 
             self.log.info('get %s', kid)
             return self.data_to_records(
-                self.filter_deleted(self.ds_get_txn(kid, limit=limit),
+                self.filter_deleted(self.ds_get_txn(kid,
+                                                    limit=limit,
+                                                    fields=fields),
                                     tsv=tsv))
 
+    def get_batch(
+            self,
+            kids: list[str],
+            fields: list[str] | None = None,
+            as_of: Decimal | None = None) -> dict[str, list[InclineRecord]]:
+        """
+        Latest committed record of many keys.  Datastores with the batch_get
+        capability read them in one request.
+
+        as_of reads the latest record at or before a tsv, and filters
+        tombstones as of then
+        """
+        request_args = locals()
+        with self.trace.span("incline.get_batch") as span:
+            self.map_request_span(request_args, span)
+            self.log.info('get_batch [%s]', ','.join(kids))
+            txns = self.ds_get_txns(kids, fields=fields, as_of=as_of)
+            tsv = as_of or self.pxn.now()
+            return {
+                kid: self.data_to_records(self.filter_deleted(txn, tsv=tsv))
+                for kid, txn in txns.items()
+            }
+
+    def replicate(self, record: InclineRecord) -> list[InclineRecord]:
+        """
+        Commit a record read from another datastore, keeping its tsv and pxn.
+        Tombstones replicate as tombstones.
+        """
+        request_args = locals()
+        with self.trace.span("incline.replicate") as span:
+            self.map_request_span(request_args, span)
+            self.log.info('replicate %s tsv %s', record.kid, record.tsv)
+            return self.data_to_records(
+                self.ds_commit(record.kid,
+                               self.encode(record.to_dict()),
+                               mode="refresh"))
+
     def filter_deleted(self,
                        txns: list[dict[str, Any]] | dict[str, Any],
                        tsv: Decimal | None = None) -> list[dict[str, Any]]:
@@ -113,6 +191,7 @@ class InclineDatastore(object):
             if not isinstance(txns, list):
                 txns = [txns]
 
+            # now once per batch, not per record
             if not tsv:
                 tsv = self.pxn.now()
 
@@ -126,6 +205,7 @@ class InclineDatastore(object):
 
     def prepare_val(self, kid: str, pxn: InclinePxn, met: InclineMeta,
                     dat: dict[str, Any]) -> dict[str, Any]:
+        dig, siz = incline_summary(dat)
         val = {
             'kid': kid,
             'pxn': pxn.pxn,
@@ -135,6 +215,8 @@ class InclineDatastore(object):
             'rid': self.rid(),
             'ver': self.version,
             'met': self.canon_metadata(met).to_dict(),
+            'dig': dig,
+            'siz': siz,
             'dat': dat
         }
         val = self.add_indexes(val)
@@ -146,7 +228,7 @@ class InclineDatastore(object):
         with self.trace.span("incline.prepare") as span:
             self.map_request_span(request_args, span)
             self.log.info('prepare %s pxn %s', kid, format(pxn))
-            val = self.prepare_val(kid, pxn, met, dat)
+            val = self.encode(self.prepare_val(kid, pxn, met, dat))
             return self.data_to_records(self.ds_prepare(kid, val))
 
     def commit(self,
@@ -175,7 +257,7 @@ class InclineDatastore(object):
 
             # convert record to log format
             # TODO record->log
-            log = record.to_dict()
+            log = self.encode(record.to_dict())
 
             self.log.info('refresh %s pxn %s org %s', kid, format(pxn),
                           log['tsv'])
@@ -183,6 +265,129 @@ class InclineDatastore(object):
                                                        log,
                                                        mode="refresh"))
 
+    def encode(self, val: dict[str, Any]) -> dict[str, Any]:
+        """
+        Encode dat with the codec, when one is set, and chunk dat too large
+        for an item
+        """
+        if self.codec:
+            val = self.codec.encode(val)
+        return self.chunk(val)
+
+    def chunk(self, val: dict[str, Any]) -> dict[str, Any]:
+        """
+        Store oversized dat in content addressed chunks of its JSON, and
+        reference the chunk digests from the item in 'chk'.  Chunks are cut at
+        fixed offsets and compressed one by one, so chunks before a change
+        are the same as the last version's, and are not written again.
+        """
+        if val.get('chk') or not val.get('dat'):
+            return val
+        if val.get('cdc'):
+            size = len(bytes(getattr(val['dat'], 'value', val['dat'])))
+        else:
+            size = int(val.get('siz') or 0)
+        if size < self.chunk_threshold:
+            return val
+        if val.get('cdc'):
+            data = incline_decode_bytes(val['cdc'], val['dat'])
+        else:
+            try:
+                data = incline_encode(val['dat'])
+            except (TypeError, ValueError):
+                return val
+        chunked = dict(val)
+        chunked['chk'] = self.chunks_put(data)
+        chunked['cdc'] = INCLINE_CODEC_JSON
+        chunked['dat'] = None
+        return chunked
+
+    def chunk_digest(self, data: bytes) -> str:
+        return hashlib.blake2b(data,
+                               digest_size=INCLINE_DIGEST_SIZE).hexdigest()
+
+    def chunk_known(self, digest: str) -> bool:
+        with self.chunks_lock:
+            if digest not in self.chunks_known:
+                return False
+            self.chunks_known.move_to_end(digest)
+            return True
+
+    def chunk_remember(self, digest: str) -> None:
+        with self.chunks_lock:
+            self.chunks_known[digest] = None
+            self.chunks_known.move_to_end(digest)
+            while len(self.chunks_known) > INCLINE_CHUNK_CACHE:
+                self.chunks_known.popitem(last=False)
+
+    def chunks_put(self, data: bytes) -> list[str]:
+        """
+        Split data into chunks, compressing and writing in parallel only the
+        chunks not known to be stored already.  Returns the chunk digests in
+        order.
+        """
+        with self.trace.span("incline.chunks_put") as span:
+            parts = [
+                data[i:i + self.chunk_size]
+                for i in range(0, len(data), self.chunk_size)
+            ]
+            digests = [self.chunk_digest(p) for p in parts]
+            new = {
+                d: p
+                for d, p in zip(digests, parts) if not self.chunk_known(d)
+            }
+            span.set_attribute("incline.chunks", len(digests))
+            span.set_attribute("incline.chunks.new", len(new))
+            self.log.info('chunks put %d new %d', len(digests), len(new))
+            if new:
+                with ThreadPoolExecutor(
+                        max_workers=min(len(new), INCLINE_CHUNK_WORKERS),
+                        thread_name_prefix='incline-chunk') as executor:
+                    list(
+                        executor.map(self.ds_put_chunk, new.keys(),
+                                     (zlib.compress(p, INCLINE_CODEC_LEVEL)
+                                      for p in new.values())))
+                for d in new:
+                    self.chunk_remember(d)
+            return digests
+
+    def chunks_join(self, digests: list[str]) -> bytes:
+        """
+        Read chunks in parallel and join them, checking each digest
+        """
+        with self.trace.span("incline.chunks_join") as span:
+            span.set_attribute("incline.chunks", len(digests))
+            if not digests:
+                return b''
+            with ThreadPoolExecutor(
+                    max_workers=min(len(digests), INCLINE_CHUNK_WORKERS),
+                    thread_name_prefix='incline-chunk') as executor:
+                parts = list(executor.map(self.ds_get_chunk, digests))
+            data = list()
+            for d, p in zip(digests, parts):
+                if p is None:
+                    raise InclineDataError(f"missing chunk {d}")
+                try:
+                    chunk = zlib.decompress(p)
+                except zlib.error as e:
+                    raise InclineDataError(f"corrupt chunk {d}: {e}")
+                if self.chunk_digest(chunk) != d:
+                    raise InclineDataError(f"corrupt chunk {d}")
+                self.chunk_remember(d)
+                data.append(chunk)
+            return b''.join(data)
+
+    def stored_dat(self, val: dict[str, Any]) -> Any:
+        """
+        dat of a log or txn item, read from chunks and decoded
+        """
+        dat = val['dat']
+        if val.get('chk'):
+            dat = self.chunks_join(val['chk'])
+        if val.get('cdc'):
+            dat = incline_decode(val['cdc'], dat)
+        return dat
+
     def setup(self) -> None:
         with self.trace.span("incline.setup") as span:
             return self.ds_setup()
@@ -207,23 +412,108 @@ class InclineDatastore(object):
 
     def add_indexes(self, val: dict[str, Any]) -> dict[str, Any]:
         """
-        Add index values to idx_* keys
+        Add index values to idx_* keys, composite sort keys to ids_* keys,
+        and the sortable values of a multi-value index to idm_* keys
+        """
+        val.update(self.index_attrs(val, list(self.indexes.values())))
+        return val
+
+    def index_attrs(self, val: dict[str, Any],
+                    indexes: list[InclineIndex]) -> dict[str, Any]:
+        """
+        Index attributes of a value for some indexes
 
         NOTE value could be String|Number|Binary and cause ValidationException
         if incorrect.  For now, avoid the None case as a quick fix.
         """
-        for name, index in self.indexes.items():
+        attrs: dict[str, Any] = dict()
+        dat: Any = None
+        for index in indexes:
             if not index.name:
                 raise InclineInterface("invalid index with no name")
             index_name = f"idx_{index.name}"
 
             if index.value:
-                val[index_name] = self.numbers_to_remote(index.value)
+                attrs[index_name] = self.numbers_to_remote(index.value)
+            if index.path or index.sort:
+                if dat is None:
+                    dat = self.stored_dat(val)
+            if index.path and index.multi:
+                values = self.get_index(index.path, dat)
+                if not isinstance(values, list):
+                    values = [values]
+                entries = sorted({
+                    incline_index_sortable(v)
+                    for v in values
+                    if isinstance(v, (str, int, float, Decimal))
+                })
+                if entries:
+                    attrs[f"idm_{index.name}"] = entries
+                continue
             if index.path:
-                value = self.get_index(index.path, val['dat'])
+                value = self.get_index(index.path, dat)
                 if value is not None:
-                    val[index_name] = self.numbers_to_remote(value)
-        return val
+                    attrs[index_name] = self.numbers_to_remote(value)
+            if index.sort:
+                parts = [self.get_index(p, dat) for p in index.sort]
+                if all(p is not None for p in parts):
+                    attrs[f"ids_{index.name}"] = incline_index_key(*parts)
+        return attrs
+
+    def index_changes(
+        self, txn: dict[str, Any], org: dict[str, Any] | None
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """
+        Multi-value index entries to put and delete for a commit.  Entries
+        point at the latest version of a key, values the version it replaces
+        had and this one does not are removed.  Commits older than the latest
+        change nothing.
+        """
+        puts: list[dict[str, Any]] = list()
+        deletes: list[dict[str, Any]] = list()
+        if org and self.pxn.decimal(org['tsv']) > self.pxn.decimal(txn['tsv']):
+            return puts, deletes
+        for name, index in self.indexes.items():
+            if not index.multi:
+                continue
+            attr = f"idm_{name}"
+            new = set() if txn['tmb'] else set(txn.get(attr) or [])
+            old = set((org or {}).get(attr) or [])
+            for v in sorted(old - new):
+                deletes.append({
+                    'idx':
+                    name,
+                    'ikey':
+                    f"{v}{INCLINE_INDEX_KEY_SEPARATOR}{txn['kid']}"
+                })
+            for v in sorted(new):
+                puts.append({
+                    'idx': name,
+                    'ikey': f"{v}{INCLINE_INDEX_KEY_SEPARATOR}{txn['kid']}",
+                    'val': v,
+                    'kid': txn['kid'],
+                    'tsv': txn['tsv'],
+                    'pxn': txn['pxn']
+                })
+        return puts, deletes
+
+    def idx_sort(self, idx: str) -> str:
+        """
+        Attribute an index is ordered by: the entry key of a multi-value
+        index, the composite sort key, or the version
+        """
+        index = self.indexes.get(idx)
+        if index and index.multi:
+            return 'ikey'
+        if index and index.sort:
+            return f"ids_{idx}"
+        return 'tsv'
+
+    def idx_order(self, idx: str, entry: dict[str, Any]) -> Any:
+        """
+        Value an index is ordered by, from the key of an entry
+        """
+        return entry['idk'][self.idx_sort(idx)]
 
     def get_index(self, path: str, val: dict[str, Any]) -> Any:
         paths = path.split(INCLINE_DATASTORE_INDEX_SEPARATOR)
@@ -235,6 +525,7 @@ class InclineDatastore(object):
 
     def genlog(self, kid: str, pxn: InclinePxn, met: InclineMeta,
                dat: dict[str, Any]) -> dict[str, Any]:
+        dig, siz = incline_summary(dat)
         log = {
             'kid': kid,
             'pxn': pxn.pxn,
@@ -244,17 +535,23 @@ class InclineDatastore(object):
             'rid': self.rid(),
             'ver': self.version,
             'met': self.canon_metadata(met).to_dict(),
+            'dig': dig,
+            'siz': siz,
             'dat': dat
         }
         log = self.add_indexes(log)
         return log
 
-    def gentxn(
-        self, log: dict[str, Any],
-        tsv: Decimal | int = Decimal(0)) -> dict[str, Any]:
+    def gentxn(self,
+               log: dict[str, Any],
+               tsv: Decimal | int = Decimal(0),
+               org: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        org is the latest txn at commit, the base of a delta
+        """
         # Set tombstone when empty data
         tmb = Decimal(0)
-        if log['dat'] is None or log['dat'] == {}:
+        if not log.get('chk') and (log['dat'] is None or log['dat'] == {}):
             tmb = self.pxn.decimal(log['tsv'])
 
         txn = {
@@ -270,9 +567,121 @@ class InclineDatastore(object):
             'met': log['met'],
             'dat': log['dat']
         }
+        if log.get('chk'):
+            txn['chk'] = log['chk']
+        if log.get('cdc') and (txn['dat'] or txn.get('chk')):
+            txn['cdc'] = log['cdc']
+        # records logged before content summaries have none
+        if log.get('dig'):
+            txn['dig'] = log['dig']
+            txn['siz'] = int(log.get('siz', 0))
         txn = self.add_indexes(txn)
+        if org:
+            txn = self.delta_encode(txn, org)
         return txn
 
+    def delta_encode(self, txn: dict[str, Any],
+                     org: dict[str, Any]) -> dict[str, Any]:
+        """
+        Store a txn as a patch in 'dlt' against its origin version, when delta
+        mode is on.  Every delta versions, and when the patch is not much
+        smaller than the data, the txn is stored whole as a snapshot.
+        """
+        if not self.delta or txn['tmb'] or org.get('tmb'):
+            return txn
+        base_tsv = self.pxn.decimal(org['tsv'])
+        # refresh keeps an older origin, and bases always precede the txn
+        if base_tsv != self.pxn.decimal(txn['org']):
+            return txn
+        if base_tsv >= self.pxn.decimal(txn['tsv']):
+            return txn
+        dep = int(org.get('dep') or 0) + 1
+        if dep >= self.delta:
+            return txn
+
+        base = self.delta_rebuild(org)
+        dat = self.stored_dat(txn)
+        if not isinstance(base, dict) or not isinstance(dat, dict):
+            return txn
+        patch = incline_delta(base, dat)
+        _, size = incline_summary(patch)
+        if size * 2 > int(txn.get('siz') or incline_summary(dat)[1]):
+            return txn
+
+        self.delta_remember(txn['kid'], self.pxn.decimal(txn['tsv']),
+                            copy.deepcopy(dat))
+        delta = {
+            k: v
+            for k, v in txn.items() if k not in ('dat', 'cdc', 'chk')
+        }
+        delta['dat'] = None
+        delta['dlt'] = patch
+        delta['dep'] = dep
+        return delta
+
+    def delta_rebuild(
+            self,
+            txn: dict[str, Any],
+            rows: dict[tuple[str, Decimal], dict[str, Any]] | None = None
+    ) -> Any:
+        """
+        dat of a txn, applying patches to the nearest snapshot or cached
+        version.  rows are txns already read, to look bases up in before
+        reading them.
+        """
+        with self.trace.span("incline.delta_rebuild") as span:
+            kid = txn['kid']
+            if rows is None:
+                rows = dict()
+            chain = list()
+            cur = txn
+            while True:
+                tsv = self.pxn.decimal(cur['tsv'])
+                dat = self.delta_cached(kid, tsv)
+                if dat is not None:
+                    break
+                if cur.get('dlt') is None:
+                    dat = self.stored_dat(cur)
+                    self.delta_remember(kid, tsv, dat)
+                    break
+                chain.append(cur)
+                org = self.pxn.decimal(cur['org'])
+                if (kid, org) not in rows:
+                    # the chain back to the snapshot, read newest first
+                    rows = dict(rows)
+                    depth = max(int(cur.get('dep') or 0), 1)
+                    for t in self.ds_get_txn_asof(kid, org, limit=depth):
+                        rows[(kid, self.pxn.decimal(t['tsv']))] = t
+                base = rows.get((kid, org))
+                if not base:
+                    raise InclineDataError(
+                        f"delta base {kid} tsv {org} missing")
+                cur = base
+
+            span.set_attribute("incline.delta.patches", len(chain))
+            for t in reversed(chain):
+                if not isinstance(dat, dict):
+                    raise InclineDataError(f"delta base {kid} not a document")
+                dat = incline_patch(dat, t['dlt'])
+                self.delta_remember(kid, self.pxn.decimal(t['tsv']), dat)
+            return copy.deepcopy(dat)
+
+    def delta_cached(self, kid: str, tsv: Decimal) -> Any:
+        with self.deltas_lock:
+            dat = self.deltas.get((kid, tsv))
+            if dat is not None:
+                self.deltas.move_to_end((kid, tsv))
+            return dat
+
+    def delta_remember(self, kid: str, tsv: Decimal, dat: Any) -> None:
+        if dat is None:
+            return
+        with self.deltas_lock:
+            self.deltas[(kid, tsv)] = dat
+            self.deltas.move_to_end((kid, tsv))
+            while len(self.deltas) > INCLINE_DELTA_CACHE:
+                self.deltas.popitem(last=False)
+
     """
     Return a qualified location string
     """
@@ -367,8 +776,16 @@ class InclineDatastore(object):
         if not isinstance(val, list):
             val = [val]
         records: list[InclineRecord] = []
+        rows: dict[tuple[str, Decimal], dict[str, Any]] = dict()
+        if any(r.get('dlt') is not None for r in val):
+            rows = {(r['kid'], self.pxn.decimal(r['tsv'])): r for r in val}
         for r in val:
-            records.append(InclineRecord(r['kid'], record=r))
+            record = InclineRecord(r['kid'], record=r)
+            if r.get('chk'):
+                record.load = partial(self.chunks_join, r['chk'])
+            elif r.get('dlt') is not None:
+                record.load = partial(self.delta_rebuild, r, rows)
+            records.append(record)
         return records
 
     def only(self, val: list[Any]) -> Any:
@@ -420,11 +837,14 @@ class InclineDatastore(object):
         return results
 
     def map_log_response_v1(self, resp: dict[str, Any]) -> dict[str, Any]:
-        keys = ['kid', 'pxn', 'tsv', 'cid', 'uid', 'rid', 'ver', 'met', 'dat']
+        keys = [
+            'kid', 'pxn', 'tsv', 'cid', 'uid', 'rid', 'ver', 'met', 'dig',
+            'siz', 'cdc', 'chk', 'dat'
+        ]
         r = dict()
         for k in keys:
             if k in resp:
-                if k == 'ver':
+                if k in ('ver', 'siz'):
                     r[k] = int(resp[k])
                 else:
                     r[k] = resp[k]
@@ -433,12 +853,12 @@ class InclineDatastore(object):
     def map_txn_response_v1(self, resp: dict[str, Any]) -> dict[str, Any]:
         keys = [
             'kid', 'tsv', 'pxn', 'tmb', 'cid', 'uid', 'rid', 'org', 'ver',
-            'met', 'dat'
+            'met', 'dig', 'siz', 'cdc', 'chk', 'dlt', 'dep', 'dat'
         ]
         r: dict[str, Any] = dict()
         for k in keys:
             if k in resp:
-                if k == 'ver':
+                if k in ('ver', 'siz', 'dep'):
                     r[k] = int(resp[k])
                 elif k == 'tsv':
                     r[k] = self.pxn.decimal(resp[k])
@@ -446,8 +866,32 @@ class InclineDatastore(object):
                     r[k] = self.pxn.decimal(resp[k])
                 else:
                     r[k] = resp[k]
+        # index attributes, multi-value index values to remove entries on the
+        # next commit
+        for k, v in resp.items():
+            if k.startswith('idm_'):
+                r[k] = list(v)
+            elif k.startswith(('idx_', 'ids_')):
+                r[k] = v
         return r
 
+    def projection(self, fields: list[str]) -> list[str]:
+        """
+        Fields to read, always with the version identity, to map, filter and
+        compare them
+        """
+        projection = INCLINE_FIELDS_REQUIRED + fields
+        if 'dat' in fields:
+            projection += ['cdc', 'chk', 'dlt', 'org']
+        return list(dict.fromkeys(projection))
+
+    def project(self, val: dict[str, Any],
+                fields: list[str] | None) -> dict[str, Any]:
+        if not fields:
+            return val
+        projection = self.projection(fields)
+        return {k: v for k, v in val.items() if k in projection}
+
     def map_request_span(self, value: Any, span: Span) -> None:
         """
         map a dict of arguments into span attributes
@@ -563,15 +1007,43 @@ class InclineDatastore(object):
 
     def ds_get_log(self,
                    kid: str,
-                   pxn: InclinePxn | None = None) -> list[dict[str, Any]]:
+                   pxn: InclinePxn | None = None,
+                   fields: list[str] | None = None) -> list[dict[str, Any]]:
         return []
 
     def ds_get_txn(self,
                    kid: str,
                    tsv: Decimal | None = None,
-                   limit: int = 1) -> list[dict[str, Any]]:
+                   limit: int = 1,
+                   fields: list[str] | None = None) -> list[dict[str, Any]]:
+        """
+        fields: only these fields, INCLINE_TXN_SUMMARY reads no data
+        """
         return []
 
+    def ds_get_txn_asof(self,
+                        kid: str,
+                        tsv: Decimal,
+                        fields: list[str] | None = None,
+                        limit: int = 1) -> list[dict[str, Any]]:
+        """
+        Latest txn at or before tsv.  limit reads that many versions back,
+        newest first.
+        """
+        return []
+
+    def ds_get_txns(
+            self,
+            kids: list[str],
+            fields: list[str] | None = None,
+            as_of: Decimal | None = None) -> dict[str, list[dict[str, Any]]]:
+        if as_of:
+            return {
+                kid: self.ds_get_txn_asof(kid, as_of, fields=fields)
+                for kid in kids
+            }
+        return {kid: self.ds_get_txn(kid, fields=fields) for kid in kids}
+
     def ds_prepare(self, kid: str, val: dict[str,
                                              Any]) -> list[dict[str, Any]]:
         return []
@@ -588,20 +1060,169 @@ class InclineDatastore(object):
                     limit: int | None = None) -> list[dict[str, Any]]:
         return []
 
+    def ds_iter_log(
+        self,
+        kid: str | None = None,
+        tsv: Decimal | None = None
+    ) -> collections.abc.Iterator[dict[str, Any]]:
+        yield from self.ds_scan_log(kid=kid, tsv=tsv)
+
     def ds_scan_txn(self,
                     kid: str | None = None,
                     tsv: Decimal | int | str | None = None,
                     limit: int | None = None) -> list[dict[str, Any]]:
         return []
 
+    def ds_iter_txn(
+            self,
+            kid: str | None = None,
+            tsv: Decimal | int | str | None = None,
+            segment: int = 0,
+            segments: int = 1,
+            start: Any = None) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        segment of segments scans part of the table, for parallel scans.
+
+        A txn a scan can resume after carries the scan position in 'pos', and
+        start is the exclusive position a scan resumes after.  Here the
+        position is the kid, on the last version of each key.
+        """
+        txns = [
+            txn for txn in self.ds_scan_txn(kid=kid, tsv=tsv)
+            if self.txn_segment(txn['kid'], segments) == segment
+        ]
+        kids = [txn['kid'] for txn in txns]
+        if start is not None and start in kids:
+            # versions of a key are grouped, skip through the last of start
+            txns = txns[len(kids) - kids[::-1].index(start):]
+        for i, txn in enumerate(txns):
+            if i + 1 == len(txns) or txns[i + 1]['kid'] != txn['kid']:
+                txn['pos'] = txn['kid']
+            yield txn
+
+    def ds_search_txn(
+            self,
+            where: InclineFilter,
+            segment: int = 0,
+            segments: int = 1) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        yield {'kid': kid, 'pxn': pxn, 'tsv': tsv} of versions whose dat may
+        match a filter, pushed down to where the datastore evaluates it.
+        Versions superseded, and those stored encoded, may be yielded too,
+        callers check the filter on the records they read.  Without a
+        pushdown every version is yielded.
+        """
+        yield from self.ds_iter_txn(segment=segment, segments=segments)
+
+    def search_encoded(self, txn: dict[str, Any]) -> bool:
+        """
+        dat is stored encoded, as a codec, chunks or a delta, and cannot be
+        filtered where stored
+        """
+        return bool(
+            txn.get('cdc') or txn.get('chk') or txn.get('dlt') is not None)
+
+    def ds_iter_changes(
+        self,
+        position: Any = None
+    ) -> collections.abc.Iterator[tuple[Any, dict[str, Any]]]:
+        """
+        yield (position, txn) of the txns committed after a position, in
+        commit order per key, until caught up.  A position resumes after its
+        txn, None starts at the oldest change kept.
+        """
+        yield from ()
+
+    def txn_segment(self, kid: str, segments: int) -> int:
+        """
+        Scan segment of a key, keeping every version of a key together
+        """
+        if segments <= 1:
+            return 0
+        return zlib.crc32(kid.encode()) % segments
+
     def ds_delete_log(self, kid: str, pxn: InclinePxn) -> None:
         pass
 
     def ds_delete_txn(self, kid: str, tsv: Decimal) -> None:
         pass
 
-    def ds_get_idx(self, idx: str, val: Any) -> list[dict[str, Any]]:
-        return []
+    def ds_get_idx(
+            self,
+            idx: str,
+            val: Any,
+            fields: list[str] | None = None,
+            cond: InclineIndexCondition | None = None) -> list[dict[str, Any]]:
+        """
+        val:    indexed value, the partition of a composite index
+        cond:   condition on the composite sort key, or on the values of a
+                multi-value index in place of val
+        """
+        return [{
+            k: v
+            for k, v in entry.items() if k != 'idk'
+        } for entry in self.ds_iter_idx(idx, val, fields=fields, cond=cond)]
+
+    def ds_iter_idx(
+        self,
+        idx: str,
+        val: Any,
+        fields: list[str] | None = None,
+        cond: InclineIndexCondition | None = None,
+        reverse: bool = False,
+        start: dict[str, Any] | None = None
+    ) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        yield index entries in index order one query page at a time
+        """
+        while True:
+            entries, start = self.ds_query_idx(idx,
+                                               val,
+                                               fields=fields,
+                                               cond=cond,
+                                               reverse=reverse,
+                                               start=start)
+            yield from entries
+            if not start:
+                return
+
+    def ds_query_idx(
+        self,
+        idx: str,
+        val: Any,
+        fields: list[str] | None = None,
+        cond: InclineIndexCondition | None = None,
+        limit: int | None = None,
+        reverse: bool = False,
+        start: dict[str, Any] | None = None
+    ) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+        """
+        One page of up to limit index entries after the start key, and the
+        key to continue from, None after the last page.  Each entry has its
+        own key in idk, to resume after it.
+        """
+        return [], None
+
+    def ds_update_idx(self, puts: list[dict[str, Any]],
+                      deletes: list[dict[str, Any]]) -> None:
+        """
+        Write multi-value index entries
+        """
+        pass
+
+    def ds_update_txn_index(self, kid: str, tsv: Decimal,
+                            attrs: dict[str, Any], remove: list[str]) -> None:
+        """
+        Set and remove index attributes of a txn in place, writing no new
+        version.  A txn no longer stored is not written.
+        """
+        pass
+
+    def ds_put_chunk(self, digest: str, data: bytes) -> None:
+        pass
+
+    def ds_get_chunk(self, digest: str) -> bytes | None:
+        return None
 
     def ds_setup(self) -> None:
         pass
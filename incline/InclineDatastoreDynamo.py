@@ -1,18 +1,32 @@
 from incline.InclineDatastore import InclineDatastore
+from incline.InclineFilter import (InclineFilter, incline_filter_validate,
+                                   INCLINE_FILTER_AND, INCLINE_FILTER_OR,
+                                   INCLINE_FILTER_NOT, INCLINE_FILTER_EXISTS,
+                                   INCLINE_FILTER_BETWEEN,
+                                   INCLINE_FILTER_BEGINS_WITH,
+                                   INCLINE_FILTER_IN)
+from incline.InclineIndex import InclineIndexCondition, incline_index_range
 from incline.InclinePrepare import InclinePxn
 from incline.InclineTrace import InclineTrace
+from incline.registry import (incline_register, INCLINE_CAPABILITY_INDEXES,
+                              INCLINE_CAPABILITY_CHANGES)
 from incline.error import (InclineError, InclineExists, InclineDataError,
                            InclineNotFound, InclineInterface)
 import boto3
+import collections.abc
 import copy
 from decimal import Decimal
+from functools import reduce
+import operator
 from typing import Any
 import botocore.config
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.conditions import Key, Attr, ConditionBase
 from boto3.dynamodb.types import TypeDeserializer
 from opentelemetry.trace.span import Span
 
+# stream records per GetRecords, the most DynamoDB returns
+INCLINE_DYNAMO_STREAM_LIMIT = 1000
 """
 LOG FORMAT
 {
@@ -41,6 +55,30 @@ TXN FORMAT
     met: list of versions
     dat: object
 }
+
+TXN STREAM, NEW_AND_OLD_IMAGES of the txn table, read as the change feed
+
+TXN GLOBAL SECONDARY INDEXES <name>-txn-idx-<idx>
+{
+    idx_<idx>: hash key, indexed value
+    ids_<idx>: range key of a composite index, tsv otherwise
+}
+
+INDEX FORMAT, multi-value index entries
+{
+    idx: index name
+    ikey: sortable value and key ID
+    val: sortable value
+    kid: key ID
+    tsv: timestamp of the latest version
+    pxn: prepare ID of the latest version
+}
+
+CHUNK FORMAT
+{
+    chk: chunk digest
+    dat: binary
+}
 """
 
 
@@ -56,6 +94,8 @@ class InclineDatastoreDynamo(InclineDatastore):
     def ds_init(self) -> None:
         self.logname = self.name + '-log'
         self.txnname = self.name + '-txn'
+        self.chunkname = self.name + '-chunk'
+        self.indexname = self.name + '-index'
         with self.trace.span("aws.dynamodb.resource") as span:
             self.dynamores = boto3.resource('dynamodb',
                                             region_name=self.region)
@@ -65,6 +105,13 @@ class InclineDatastoreDynamo(InclineDatastore):
         with self.trace.span("aws.dynamodb.table") as span:
             span.set_attribute("dynamo.table", self.txnname)
             self.txntbl = self.dynamores.Table(self.txnname)
+        with self.trace.span("aws.dynamodb.table") as span:
+            span.set_attribute("dynamo.table", self.chunkname)
+            self.chunktbl = self.dynamores.Table(self.chunkname)
+        with self.trace.span("aws.dynamodb.table") as span:
+            span.set_attribute("dynamo.table", self.indexname)
+            self.indextbl = self.dynamores.Table(self.indexname)
+        self.dynamostreams: Any = None
         with self.trace.span("aws.dynamodb.client") as span:
             self.dynamoclient = boto3.client(
                 'dynamodb',
@@ -73,7 +120,8 @@ class InclineDatastoreDynamo(InclineDatastore):
 
     def ds_get_log(self,
                    kid: str,
-                   pxn: InclinePxn | None = None) -> list[dict[str, Any]]:
+                   pxn: InclinePxn | None = None,
+                   fields: list[str] | None = None) -> list[dict[str, Any]]:
         request_args = locals()
         if not isinstance(kid, str):
             raise InclineInterface(f"key must be string not {type(kid)}")
@@ -91,6 +139,8 @@ class InclineDatastoreDynamo(InclineDatastore):
                 kwargs['KeyConditionExpression'] = Key('kid').eq(
                         kid)   # type: ignore
                 kwargs['ScanIndexForward'] = False    # type:ignore
+            if fields:
+                kwargs.update(self.projection_expression(fields))
 
             with self.trace.span("aws.dynamodb.query") as span_query:
                 try:
@@ -108,13 +158,16 @@ class InclineDatastoreDynamo(InclineDatastore):
     def ds_get_txn(self,
                    kid: str,
                    tsv: int | str | Decimal | None = None,
-                   limit: int = 1) -> list[dict[str, Any]]:
+                   limit: int = 1,
+                   fields: list[str] | None = None) -> list[dict[str, Any]]:
         """
         get from committed transaction table
 
         reverse query to scan from new to old with ScanIndexForward
 
         can change behaviour from exact to "active at the time" using lte(tsv)
+
+        fields projects the items, INCLINE_TXN_SUMMARY reads no data
         """
         request_args = locals()
         with self.trace.span("incline.datastore.ds_get_txn") as span:
@@ -138,6 +191,8 @@ class InclineDatastoreDynamo(InclineDatastore):
                 kwargs['ScanIndexForward'] = False    # type: ignore
                 if limit:
                     kwargs['Limit'] = limit    # type: ignore
+            if fields:
+                kwargs.update(self.projection_expression(fields))
 
             with self.trace.span("aws.dynamodb.query") as span_query:
                 try:
@@ -152,6 +207,50 @@ class InclineDatastoreDynamo(InclineDatastore):
             self.map_response_span(local_resp, span)
             return local_resp
 
+    def ds_get_txn_asof(self,
+                        kid: str,
+                        tsv: Decimal,
+                        fields: list[str] | None = None,
+                        limit: int = 1) -> list[dict[str, Any]]:
+        """
+        reverse query from tsv, the first item is the version active then.
+        Pages are followed until limit items are read, a page stops at 1 MB.
+        """
+        request_args = locals()
+        with self.trace.span("incline.datastore.ds_get_txn_asof") as span:
+            self.map_request_span(request_args, span)
+
+            if not isinstance(kid, str):
+                raise InclineInterface(f"key must be string not {type(kid)}")
+
+            self.log.info('gettxn %s asof %s limit %d', kid, tsv, limit)
+            kwargs: dict[str, Any] = {
+                'KeyConditionExpression':
+                Key('kid').eq(kid) & Key('tsv').lte(tsv),
+                'ScanIndexForward': False,
+                'Limit': limit
+            }
+            if fields:
+                kwargs.update(self.projection_expression(fields))
+
+            items: list[dict[str, Any]] = list()
+            while True:
+                with self.trace.span("aws.dynamodb.query") as span_query:
+                    try:
+                        resp = self.txntbl.query(**kwargs)
+                    except ClientError as e:
+                        raise InclineDataError(e.response['Error']['Message'])
+                    self.map_aws_response_span(resp, span_query)
+                items.extend(resp.get('Items', []))
+                if len(items) >= limit or not resp.get('LastEvaluatedKey'):
+                    break
+                kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+                kwargs['Limit'] = limit - len(items)
+
+            local_resp = self.map_txn_response_dynamo({'Items': items})
+            self.map_response_span(local_resp, span)
+            return local_resp
+
     def ds_prepare(self, kid: str, val: dict[str,
                                              Any]) -> list[dict[str, Any]]:
         request_args = locals()
@@ -233,8 +332,9 @@ class InclineDatastoreDynamo(InclineDatastore):
 
             if mode == 'delete':
                 remote_log['dat'] = None
+                remote_log.pop('chk', None)
 
-            val = self.gentxn(remote_log, tsv=orgtsv)
+            val = self.gentxn(remote_log, tsv=orgtsv, org=org)
             self.map_txn_span(val, span, prefix="txn")
             with self.trace.span("aws.dynamodb.put_item") as span_put:
                 try:
@@ -248,135 +348,340 @@ class InclineDatastoreDynamo(InclineDatastore):
                     else:
                         raise (e)
                 self.map_aws_response_span(resp, span_put)
-                # TODO: ALL_OLD
-                return [val]
+            puts, deletes = self.index_changes(val, org)
+            self.ds_update_idx(puts, deletes)
+            # TODO: ALL_OLD
+            return [val]
 
     def ds_scan_log(self,
                     kid: str | None = None,
                     tsv: Decimal | None = None,
                     limit: int | None = None) -> list[dict[str, Any]]:
         """
-        return list of [{'kid': kid, 'tsv': tsv}]
+        return list of [{'kid': kid, 'pxn': pxn, 'tsv': tsv}]
         """
         request_args = locals()
-        logs = list()
 
         if kid and not isinstance(kid, str):
             raise InclineInterface(f"key must be string not {type(kid)}")
 
         with self.trace.span("incline.datastore.ds_scan_log") as span:
             self.map_request_span(request_args, span)
+            return list(self.ds_iter_log(kid=kid, tsv=tsv))
 
-            kwargs = {}
-            if kid and tsv:
-                self.log.info(f"scanlog {kid} tsv {tsv}")
-                kwargs['FilterExpression'] = \
-                        Key('kid').eq(kid) & Key('tsv').lte(tsv)
-            elif kid and not tsv:
-                self.log.info(f"scanlog {kid}")
-                kwargs['FilterExpression'] = Key('kid').eq(
-                        kid)    # type: ignore
-            elif not kid and tsv:
-                self.log.info(f"scanlog tsv {tsv}")
-                kwargs['FilterExpression'] = \
-                        Key('kid').eq(kid) & Key('tsv').lte(tsv)
-            else:
-                self.log.info(f"scanlog (all)")
+    def ds_iter_log(
+        self,
+        kid: str | None = None,
+        tsv: Decimal | None = None
+    ) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        yield {'kid': kid, 'pxn': pxn, 'tsv': tsv} one scan page at a time,
+        so callers can stream a large log table
+        """
+        if kid and not isinstance(kid, str):
+            raise InclineInterface(f"key must be string not {type(kid)}")
 
+        kwargs = {}
+        if kid and tsv:
+            self.log.info(f"scanlog {kid} tsv {tsv}")
+            kwargs['FilterExpression'] = \
+                    Key('kid').eq(kid) & Key('tsv').lte(tsv)
+        elif kid and not tsv:
+            self.log.info(f"scanlog {kid}")
+            kwargs['FilterExpression'] = Key('kid').eq(kid)    # type: ignore
+        elif not kid and tsv:
+            self.log.info(f"scanlog tsv {tsv}")
+            kwargs['FilterExpression'] = \
+                    Key('kid').eq(kid) & Key('tsv').lte(tsv)
+        else:
+            self.log.info(f"scanlog (all)")
+
+        paginator = self.dynamoclient.get_paginator('scan')
+        pages = iter(
+            paginator.paginate(TableName=self.logname,
+                               Select='SPECIFIC_ATTRIBUTES',
+                               ProjectionExpression='kid, pxn, tsv, ver',
+                               ConsistentRead=False,
+                               **kwargs))
+        while True:
+            # span per page, not held open while the caller consumes
             with self.trace.span("aws.dynamodb.scan") as span_scan:
-                paginator = self.dynamoclient.get_paginator('scan')
-                resp = paginator.paginate(TableName=self.logname,
-                                          Select='SPECIFIC_ATTRIBUTES',
-                                          ProjectionExpression='kid, pxn, ver',
-                                          ConsistentRead=False,
-                                          **kwargs)
                 try:
-                    for page in resp:
-                        self.map_aws_response_span(page, span_scan)
-
-                        # empty page, likely FilterExpression filtered all
-                        if page.get('Count') == 0 or not len(page['Items']):
-                            continue
-
-                        items = self.map_scan_log_response(page)
-                        for item in items:
-                            logs.append({
-                                'kid': item['kid'],
-                                'pxn': item['pxn']
-                            })
+                    page = next(pages, None)
                 except ClientError as e:
                     raise InclineDataError(e.response['Error']['Message'])
+                if page is None:
+                    return
+                self.map_aws_response_span(page, span_scan)
+
+                # empty page, likely FilterExpression filtered all
+                if page.get('Count') == 0 or not len(page['Items']):
+                    continue
 
-                # XXX validate resp?  Count.  Items.
-                return logs
+                items = self.map_scan_log_response(page)
+
+            for item in items:
+                yield {
+                    'kid': item['kid'],
+                    'pxn': item['pxn'],
+                    'tsv': item.get('tsv')
+                }
 
     def ds_scan_txn(self,
                     kid: str | None = None,
                     tsv: Decimal | int | str | None = None,
                     limit: int | None = None) -> list[dict[str, Any]]:
         """
-        return list of [{'kid': kid, 'tsv': tsv}]
+        return list of [{'kid': kid, 'pxn': pxn, 'tsv': tsv}]
         """
         request_args = locals()
-        txns = list()
 
         if kid and not isinstance(kid, str):
             raise InclineInterface(f"key must be string not {type(kid)}")
 
         with self.trace.span("incline.datastore.ds_scan_txn") as span:
             self.map_request_span(request_args, span)
+            return list(self.ds_iter_txn(kid=kid, tsv=tsv))
+
+    def ds_iter_txn(
+            self,
+            kid: str | None = None,
+            tsv: Decimal | int | str | None = None,
+            segment: int = 0,
+            segments: int = 1,
+            start: Any = None) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        yield {'kid': kid, 'pxn': pxn, 'tsv': tsv} one scan page at a time,
+        so callers can stream a large txn table.  segment of segments is a
+        parallel scan segment.  The last txn of a page carries its
+        LastEvaluatedKey as the scan position in 'pos', and start resumes
+        after one as the ExclusiveStartKey.
+        """
+        if kid and not isinstance(kid, str):
+            raise InclineInterface(f"key must be string not {type(kid)}")
 
-            kwargs = {}
-            if kid and tsv:
-                self.log.info(f"scantxn {kid} tsv {tsv}")
-                kwargs['FilterExpression'] = \
-                        Key('kid').eq(kid) & Key('tsv').lte(tsv)
-            elif kid and not tsv:
-                self.log.info(f"scantxn {kid}")
-                kwargs['FilterExpression'] = Key('kid').eq(
-                        kid)    # type: ignore
-            elif not kid and tsv:
-                self.log.info(f"scantxn tsv {tsv}")
-                kwargs['FilterExpression'] = \
-                        Key('kid').eq(kid) & Key('tsv').lte(tsv)
-            else:
-                self.log.info(f"scantxn (all)")
-
+        kwargs: dict[str, Any] = {}
+        if segments > 1:
+            kwargs['Segment'] = segment
+            kwargs['TotalSegments'] = segments
+        if start is not None:
+            # checkpoints may hold the tsv as a string
+            kwargs['ExclusiveStartKey'] = {
+                'kid': start['kid'],
+                'tsv': self.pxn.decimal(start['tsv'])
+            }
+        if kid and tsv:
+            self.log.info(f"scantxn {kid} tsv {tsv}")
+            kwargs['FilterExpression'] = \
+                    Key('kid').eq(kid) & Key('tsv').lte(tsv)
+        elif kid and not tsv:
+            self.log.info(f"scantxn {kid}")
+            kwargs['FilterExpression'] = Key('kid').eq(kid)    # type: ignore
+        elif not kid and tsv:
+            self.log.info(f"scantxn tsv {tsv}")
+            kwargs['FilterExpression'] = \
+                    Key('kid').eq(kid) & Key('tsv').lte(tsv)
+        else:
+            self.log.info(f"scantxn (all)")
+        yield from self.scan_txn(**kwargs)
+
+    def ds_search_txn(
+            self,
+            where: InclineFilter,
+            segment: int = 0,
+            segments: int = 1) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        Filter pushed down as a scan FilterExpression on dat.  Versions with
+        encoded dat cannot be filtered by DynamoDB and are all returned,
+        tombstones never are.
+        """
+        incline_filter_validate(where)
+        kwargs: dict[str, Any] = {}
+        if segments > 1:
+            kwargs['Segment'] = segment
+            kwargs['TotalSegments'] = segments
+        self.log.info('searchtxn %s', where.op)
+        kwargs['FilterExpression'] = Attr('tmb').eq(0) & (
+            self.filter_condition(where) | Attr('cdc').exists()
+            | Attr('chk').exists() | Attr('dlt').exists())
+        yield from self.scan_txn(**kwargs)
+
+    def filter_condition(self, where: InclineFilter) -> ConditionBase:
+        """
+        Condition on dat of a filter.  Comparisons require the path exists, as
+        compiled filters do, so not and ne agree on missing paths.
+        """
+        if where.op == INCLINE_FILTER_AND:
+            return reduce(operator.and_,
+                          [self.filter_condition(f) for f in where.filters])
+        if where.op == INCLINE_FILTER_OR:
+            return reduce(operator.or_,
+                          [self.filter_condition(f) for f in where.filters])
+        if where.op == INCLINE_FILTER_NOT:
+            return ~self.filter_condition(where.filters[0])
+
+        attr = Attr(f"dat.{where.path}")
+        if where.op == INCLINE_FILTER_EXISTS:
+            return attr.exists()
+        value = self.numbers_to_remote(copy.deepcopy(where.value))
+        if where.op == INCLINE_FILTER_BETWEEN:
+            upper = self.numbers_to_remote(copy.deepcopy(where.upper))
+            cond = attr.between(value, upper)
+        elif where.op == INCLINE_FILTER_BEGINS_WITH:
+            cond = attr.begins_with(value)
+        elif where.op == INCLINE_FILTER_IN:
+            cond = attr.is_in(list(value))
+        else:
+            cond = getattr(attr, where.op)(value)
+        return attr.exists() & cond
+
+    def scan_txn(self,
+                 **kwargs: Any) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        yield {'kid': kid, 'pxn': pxn, 'tsv': tsv} of a txn table scan
+        """
+        paginator = self.dynamores.meta.client.get_paginator('scan')
+        # paginator = self.dynamoclient.get_paginator('scan')
+        #
+        # https://github.com/boto/boto3/issues/2300
+        # Invalid type for parameter FilterExpression,
+        #   value: <boto3.dynamodb.conditions.Equals ...
+        #   t-ype: <class 'boto3.dynamodb.conditions.Equals'>
+        #   valid types: <class 'str'>
+        pages = iter(
+            paginator.paginate(TableName=self.txnname,
+                               Select='SPECIFIC_ATTRIBUTES',
+                               ProjectionExpression='kid, tsv, pxn, ver',
+                               ConsistentRead=False,
+                               **kwargs))
+        while True:
+            # span per page, not held open while the caller consumes
             with self.trace.span("aws.dynamodb.scan") as span_scan:
-                paginator = self.dynamores.meta.client.get_paginator('scan')
-                # paginator = self.dynamoclient.get_paginator('scan')
-                #
-                # https://github.com/boto/boto3/issues/2300
-                # Invalid type for parameter FilterExpression,
-                #   value: <boto3.dynamodb.conditions.Equals ...
-                #   t-ype: <class 'boto3.dynamodb.conditions.Equals'>
-                #   valid types: <class 'str'>
-                resp = paginator.paginate(TableName=self.txnname,
-                                          Select='SPECIFIC_ATTRIBUTES',
-                                          ProjectionExpression='kid, tsv, ver',
-                                          ConsistentRead=False,
-                                          **kwargs)
                 try:
-                    for page in resp:
-                        self.map_aws_response_span(resp, span)
-
-                        # empty page, likely FilterExpression filtered all
-                        if page.get('Count') == 0 or not len(page['Items']):
-                            continue
-
-                        items = self.map_scan_txn_response(page)
-                        for item in items:
-                            txns.append({
-                                'kid': item['kid'],
-                                'tsv': item['tsv']
-                            })
-                        if 'Items' not in page:
-                            raise InclineError(f"bad api response {page}")
+                    page = next(pages, None)
                 except ClientError as e:
                     raise InclineDataError(e.response['Error']['Message'])
+                if page is None:
+                    return
+                self.map_aws_response_span(page, span_scan)
 
-                # XXX validate resp?  Count.  Items.
-                return txns
+                if 'Items' not in page:
+                    raise InclineError(f"bad api response {page}")
+
+                # empty page, likely FilterExpression filtered all
+                if page.get('Count') == 0 or not len(page['Items']):
+                    continue
+
+                items = self.map_scan_txn_response(page)
+
+            for i, item in enumerate(items):
+                txn = {
+                    'kid': item['kid'],
+                    'pxn': item.get('pxn'),
+                    'tsv': item['tsv']
+                }
+                if i + 1 == len(items) and page.get('LastEvaluatedKey'):
+                    txn['pos'] = page['LastEvaluatedKey']
+                yield txn
+
+    def ds_iter_changes(
+        self,
+        position: Any = None
+    ) -> collections.abc.Iterator[tuple[Any, dict[str, Any]]]:
+        """
+        Read the txn table stream.  A position is the last sequence number
+        read of each shard, None once a closed shard is read to its end.
+        Shards are read after their parent, keeping the commits of a key in
+        order across shard splits.
+        """
+        arn = self.txntbl.latest_stream_arn
+        if not arn:
+            raise InclineDataError(f"{self.txnname} has no stream")
+        positions: dict[str, str | None] = dict(position or {})
+        shards = self.stream_shards(arn)
+        ids = {s['ShardId'] for s in shards}
+        self.log.info('changes %s shards %d', self.txnname, len(shards))
+        for shard in shards:
+            sid = shard['ShardId']
+            parent = shard.get('ParentShardId') or ''
+            if sid in positions and positions[sid] is None:
+                continue
+            if parent in ids and positions.get(parent, '') is not None:
+                continue
+            kwargs: dict[str, Any] = {
+                'StreamArn': arn,
+                'ShardId': sid,
+                'ShardIteratorType': 'TRIM_HORIZON'
+            }
+            if positions.get(sid):
+                kwargs['ShardIteratorType'] = 'AFTER_SEQUENCE_NUMBER'
+                kwargs['SequenceNumber'] = positions[sid]
+            try:
+                iterator = self.streams().get_shard_iterator(
+                    **kwargs).get('ShardIterator')
+            except ClientError as e:
+                raise InclineDataError(e.response['Error']['Message'])
+            while iterator:
+                with self.trace.span("aws.dynamodb.get_records") as span:
+                    try:
+                        resp = self.streams().get_records(
+                            ShardIterator=iterator,
+                            Limit=INCLINE_DYNAMO_STREAM_LIMIT)
+                    except ClientError as e:
+                        raise InclineDataError(e.response['Error']['Message'])
+                    span.set_attribute("incline.records", len(resp['Records']))
+                for record in resp['Records']:
+                    positions[sid] = record['dynamodb']['SequenceNumber']
+                    txn = self.map_stream_record(record)
+                    if txn:
+                        yield dict(positions), txn
+                iterator = resp.get('NextShardIterator')
+                # an open shard always has a next iterator, stop caught up
+                if not resp['Records']:
+                    break
+            if not iterator:
+                positions[sid] = None
+
+    def streams(self) -> Any:
+        if not self.dynamostreams:
+            self.dynamostreams = boto3.client('dynamodbstreams',
+                                              region_name=self.region)
+        return self.dynamostreams
+
+    def stream_shards(self, arn: str) -> list[dict[str, Any]]:
+        shards: list[dict[str, Any]] = list()
+        kwargs: dict[str, Any] = {'StreamArn': arn}
+        while True:
+            with self.trace.span("aws.dynamodb.describe_stream"):
+                try:
+                    desc = self.streams().describe_stream(
+                        **kwargs)['StreamDescription']
+                except ClientError as e:
+                    raise InclineDataError(e.response['Error']['Message'])
+            shards.extend(desc.get('Shards', []))
+            if not desc.get('LastEvaluatedShardId'):
+                return shards
+            kwargs['ExclusiveStartShardId'] = desc['LastEvaluatedShardId']
+
+    def map_stream_record(self, record: dict[str,
+                                             Any]) -> dict[str, Any] | None:
+        """
+        Committed txn of a stream record.  Removes are cleanup, and updates
+        keeping the pxn, as index backfill makes, are not commits.
+        """
+        if record.get('eventName') not in ('INSERT', 'MODIFY'):
+            return None
+        deserializer = TypeDeserializer()
+        image = record['dynamodb'].get('NewImage')
+        if not image:
+            return None
+        new = {k: deserializer.deserialize(v) for k, v in image.items()}
+        old = record['dynamodb'].get('OldImage') or {}
+        if 'pxn' in old and deserializer.deserialize(
+                old['pxn']) == new.get('pxn'):
+            return None
+        txns = self.map_txn_response(new)
+        return txns[0] if txns else None
 
     def ds_delete_log(self, kid: str, pxn: InclinePxn) -> None:
         request_args = locals()
@@ -427,36 +732,189 @@ class InclineDatastoreDynamo(InclineDatastore):
                         or resp['Attributes'].get('tsv') != tsv):
                     raise InclineNotFound(f"cannot delete {kid} tsv {tsv}")
 
-    def ds_get_idx(self,
-                   idx: str,
-                   val: Any) -> list[dict[str, Any]]:
+    def ds_query_idx(
+        self,
+        idx: str,
+        val: Any,
+        fields: list[str] | None = None,
+        cond: InclineIndexCondition | None = None,
+        limit: int | None = None,
+        reverse: bool = False,
+        start: dict[str, Any] | None = None
+    ) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
         """
-        get from index
+        query an index, a global secondary index returns only the fields
+        projected into it.  A composite index has the sort key ids_<idx>,
+        others the version tsv.
+
+        multi-value indexes query the index table, entries have only the
+        version identity
         """
         request_args = locals()
-        with self.trace.span("incline.datastore.ds_get_idx") as span:
+        with self.trace.span("incline.datastore.ds_query_idx") as span:
             self.map_request_span(request_args, span)
 
             if not isinstance(idx, str):
                 raise InclineInterface(f"idx must be string not {type(idx)}")
 
-            kwargs: dict[str, Any] = {}
+            kwargs: dict[str, Any] = {'ScanIndexForward': not reverse}
+            if limit:
+                kwargs['Limit'] = limit
+            if start:
+                kwargs['ExclusiveStartKey'] = start
             self.log.info('getidx %s val %s', idx, val)
-            kwargs['KeyConditionExpression'] = Key(f"idx_{idx}").eq(val)
-            kwargs['IndexName'] = f"{self.txnname}-idx-{idx}"
+            index = self.indexes.get(idx)
+            if index and index.multi:
+                table = self.indextbl
+                keys = ['idx', 'ikey']
+                if not cond:
+                    cond = InclineIndexCondition(op='eq', value=val)
+                kwargs['KeyConditionExpression'] = Key('idx').eq(
+                    idx) & self.key_condition('ikey', cond)
+            else:
+                table = self.txntbl
+                keys = list(
+                    dict.fromkeys(
+                        [f"idx_{idx}",
+                         self.idx_sort(idx), 'kid', 'tsv']))
+                kwargs['KeyConditionExpression'] = Key(f"idx_{idx}").eq(val)
+                if cond:
+                    kwargs['KeyConditionExpression'] &= self.key_condition(
+                        f"ids_{idx}", cond)
+                kwargs['IndexName'] = f"{self.txnname}-idx-{idx}"
+                if fields:
+                    kwargs.update(self.projection_expression(fields + keys))
 
             with self.trace.span("aws.dynamodb.query") as span_query:
                 try:
-                    resp = self.txntbl.query(**kwargs)
+                    resp = table.query(**kwargs)
                 except ClientError as e:
                     raise InclineDataError(e.response['Error']['Message'])
                 self.map_aws_response_span(resp, span_query)
 
-            # XXX validate resp?  Count.  Items.
-
-            local_resp = self.map_idx_response_dynamo(idx, resp)
+            local_resp = self.map_idx_response_dynamo(idx, resp, keys)
             self.map_response_span(local_resp, span)
-            return local_resp
+            return local_resp, resp.get('LastEvaluatedKey')
+
+    def key_condition(self, attr: str,
+                      cond: InclineIndexCondition) -> ConditionBase:
+        op, vals = incline_index_range(cond)
+        key = Key(attr)
+        if op == '<':
+            return key.lt(vals[0])
+        if op == '>=':
+            return key.gte(vals[0])
+        if op == 'between':
+            return key.between(vals[0], vals[1])
+        return key.begins_with(vals[0])
+
+    def ds_update_idx(self, puts: list[dict[str, Any]],
+                      deletes: list[dict[str, Any]]) -> None:
+        if not puts and not deletes:
+            return
+        with self.trace.span("incline.datastore.ds_update_idx") as span:
+            span.set_attribute("incline.index.puts", len(puts))
+            span.set_attribute("incline.index.deletes", len(deletes))
+            with self.trace.span("aws.dynamodb.batch_write_item"):
+                try:
+                    with self.indextbl.batch_writer() as batch:
+                        for d in deletes:
+                            batch.delete_item(Key={
+                                'idx': d['idx'],
+                                'ikey': d['ikey']
+                            })
+                        for p in puts:
+                            batch.put_item(Item=p)
+                except ClientError as e:
+                    raise InclineDataError(e.response['Error']['Message'])
+
+    def ds_update_txn_index(self, kid: str, tsv: Decimal,
+                            attrs: dict[str, Any], remove: list[str]) -> None:
+        request_args = locals()
+        with self.trace.span("incline.datastore.ds_update_txn_index") as span:
+            self.map_request_span(request_args, span)
+            names: dict[str, str] = dict()
+            values: dict[str, Any] = dict()
+            actions = list()
+            if attrs:
+                for i, (k, v) in enumerate(attrs.items()):
+                    names[f"#s{i}"] = k
+                    values[f":s{i}"] = v
+                actions.append('SET ' + ', '.join(f"#s{i} = :s{i}"
+                                                  for i in range(len(attrs))))
+            if remove:
+                for i, k in enumerate(remove):
+                    names[f"#r{i}"] = k
+                actions.append('REMOVE ' +
+                               ', '.join(f"#r{i}" for i in range(len(remove))))
+            if not actions:
+                return
+            kwargs: dict[str, Any] = {
+                'Key': {
+                    'kid': kid,
+                    'tsv': tsv
+                },
+                'UpdateExpression': ' '.join(actions),
+                'ExpressionAttributeNames': names,
+                'ConditionExpression': Attr('kid').exists()
+            }
+            if values:
+                kwargs['ExpressionAttributeValues'] = values
+            with self.trace.span("aws.dynamodb.update_item") as span_update:
+                try:
+                    resp = self.txntbl.update_item(**kwargs)
+                except ClientError as e:
+                    if e.response['Error'][
+                            'Code'] == 'ConditionalCheckFailedException':
+                        return
+                    raise InclineDataError(e.response['Error']['Message'])
+                self.map_aws_response_span(resp, span_update)
+
+    def ds_put_chunk(self, digest: str, data: bytes) -> None:
+        """
+        Chunks are immutable, an existing chunk is not written again
+        """
+        with self.trace.span("incline.datastore.ds_put_chunk") as span:
+            span.set_attribute("incline.chunk", digest)
+            with self.trace.span("aws.dynamodb.put_item") as span_put:
+                try:
+                    resp = self.chunktbl.put_item(
+                        Item={
+                            'chk': digest,
+                            'dat': data
+                        },
+                        ConditionExpression=Attr('chk').not_exists())
+                except ClientError as e:
+                    if e.response['Error'][
+                            'Code'] == 'ConditionalCheckFailedException':
+                        return
+                    raise InclineDataError(e.response['Error']['Message'])
+                self.map_aws_response_span(resp, span_put)
+
+    def ds_get_chunk(self, digest: str) -> bytes | None:
+        with self.trace.span("incline.datastore.ds_get_chunk") as span:
+            span.set_attribute("incline.chunk", digest)
+            with self.trace.span("aws.dynamodb.get_item") as span_get:
+                try:
+                    resp = self.chunktbl.get_item(Key={'chk': digest},
+                                                  ConsistentRead=True)
+                except ClientError as e:
+                    raise InclineDataError(e.response['Error']['Message'])
+                self.map_aws_response_span(resp, span_get)
+            if 'Item' not in resp:
+                return None
+            data = resp['Item']['dat']
+            return bytes(getattr(data, 'value', data))
+
+    def projection_expression(self, fields: list[str]) -> dict[str, Any]:
+        """
+        ProjectionExpression with placeholder names, avoiding reserved words
+        """
+        names = {f"#p{i}": f for i, f in enumerate(self.projection(fields))}
+        return {
+            'ProjectionExpression': ', '.join(names),
+            'ExpressionAttributeNames': names
+        }
 
     def map_log_response_dynamo(self, resp: dict[str,
                                                  Any]) -> list[dict[str, Any]]:
@@ -473,9 +931,8 @@ class InclineDatastoreDynamo(InclineDatastore):
             raise InclineDataError('map txn invalid items')
         return self.map_txn_response(resp['Items'])
 
-    def map_idx_response_dynamo(self,
-                                idx: str,
-                                resp: dict[str, Any]) -> list[dict[str, Any]]:
+    def map_idx_response_dynamo(self, idx: str, resp: dict[str, Any],
+                                keys: list[str]) -> list[dict[str, Any]]:
         if 'Items' not in resp:
             raise InclineDataError('map idx invalid items')
         items = resp['Items']
@@ -490,11 +947,13 @@ class InclineDatastoreDynamo(InclineDatastore):
             #  'kid': 'C08XeIPmJXgOzKnskv3D93S'}
             data = {}
             for k, v in item.items():
-                if k.startswith('idx_'):
+                if k.startswith(
+                    ('idx_', 'ids_', 'idm_')) or k in ('idx', 'ikey', 'val'):
                     # drop the searched value, it is known
                     continue
                 else:
                     data[k] = v
+            data['idk'] = {k: item[k] for k in keys if k in item}
             r.append(data)
 
         return r
@@ -561,6 +1020,8 @@ class InclineDatastoreDynamo(InclineDatastore):
     def ds_setup(self) -> None:
         self.ds_setup_log()
         self.ds_setup_txn()
+        self.ds_setup_chunk()
+        self.ds_setup_index()
 
     def ds_setup_log(self, rcu: int = 1, wcu: int = 1) -> None:
         tablename = self.name + '-log'
@@ -673,6 +1134,64 @@ class InclineDatastoreDynamo(InclineDatastore):
             ProvisionedThroughput={
                 'ReadCapacityUnits': rcu,
                 'WriteCapacityUnits': wcu
+            },
+            StreamSpecification={
+                'StreamEnabled': True,
+                'StreamViewType': 'NEW_AND_OLD_IMAGES'
             })
         # TODO: waiter = client.get_waiter('table_exists')
         # TODO: waiter.wait(TableName=..., WaiterConfig={'Delay':  1})
+
+    def ds_setup_chunk(self, rcu: int = 1, wcu: int = 1) -> None:
+        tablename = self.name + '-chunk'
+        response = self.dynamores.create_table(AttributeDefinitions=[
+            {
+                'AttributeName': 'chk',
+                'AttributeType': 'S'
+            },
+        ],
+                                               TableName=tablename,
+                                               KeySchema=[
+                                                   {
+                                                       'AttributeName': 'chk',
+                                                       'KeyType': 'HASH'
+                                                   },
+                                               ],
+                                               ProvisionedThroughput={
+                                                   'ReadCapacityUnits': rcu,
+                                                   'WriteCapacityUnits': wcu
+                                               })
+
+    def ds_setup_index(self, rcu: int = 1, wcu: int = 1) -> None:
+        tablename = self.name + '-index'
+        response = self.dynamores.create_table(AttributeDefinitions=[
+            {
+                'AttributeName': 'idx',
+                'AttributeType': 'S'
+            },
+            {
+                'AttributeName': 'ikey',
+                'AttributeType': 'S'
+            },
+        ],
+                                               TableName=tablename,
+                                               KeySchema=[
+                                                   {
+                                                       'AttributeName': 'idx',
+                                                       'KeyType': 'HASH'
+                                                   },
+                                                   {
+                                                       'AttributeName': 'ikey',
+                                                       'KeyType': 'RANGE'
+                                                   },
+                                               ],
+                                               ProvisionedThroughput={
+                                                   'ReadCapacityUnits': rcu,
+                                                   'WriteCapacityUnits': wcu
+                                               })
+
+
+incline_register(
+    'dynamo',
+    InclineDatastoreDynamo,
+    capabilities=[INCLINE_CAPABILITY_INDEXES, INCLINE_CAPABILITY_CHANGES])
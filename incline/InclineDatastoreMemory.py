@@ -1,14 +1,25 @@
+import bisect
+import collections.abc
 import copy
 from decimal import Decimal
+import threading
 from typing import Any
+from incline.codec import incline_serialize
 from incline.InclineDatastore import InclineDatastore
+from incline.InclineFilter import InclineFilter, incline_filter_compile
+from incline.InclineIndex import InclineIndexCondition, incline_index_range
 from incline.InclinePrepare import InclinePxn
 from incline.InclineTrace import InclineTrace
+from incline.registry import (incline_register, INCLINE_CAPABILITY_BATCH_GET,
+                              INCLINE_CAPABILITY_INDEXES,
+                              INCLINE_CAPABILITY_CHANGES)
 from incline.error import (InclineError, InclineExists, InclineDataError,
                            InclineNotFound)
 
 # global memory store
-DATASTORE_MEMORY: dict[str, dict[str, Any]] = dict()
+DATASTORE_MEMORY: dict[str, dict[Any, Any]] = dict()
+# orders change feed appends across datastores of one table
+DATASTORE_MEMORY_FEED_LOCK = threading.Lock()
 """
 LOG FORMAT
 {
@@ -37,6 +48,22 @@ TXN FORMAT
     met: list of versions
     dat: object
 }
+
+GSI, the txn global secondary indexes
+{
+    ('idx', 'sort'): { serialized idx_<idx> value: sorted [(sort, kid, tsv)] }
+}
+sort is ids_<idx> for versions with a composite sort key, tsv otherwise
+
+INDEX, multi-value index entries, with their keys sorted in INDEX KEYS
+{
+    'idx': { 'ikey': entry }
+}
+
+FEED, committed txns in commit order, and SUBSCRIBERS called on each
+{
+    seq: txn
+}
 """
 
 
@@ -66,6 +93,8 @@ class InclineDatastoreMemory(InclineDatastore):
 
         self.logname = self.name + '-log'
         self.txnname = self.name + '-txn'
+        self.chunkname = self.name + '-chunk'
+        self.indexname = self.name + '-index'
 
         if self.logname not in DATASTORE_MEMORY:
             DATASTORE_MEMORY[self.logname] = dict()
@@ -75,9 +104,39 @@ class InclineDatastoreMemory(InclineDatastore):
             DATASTORE_MEMORY[self.txnname] = dict()
         self.txndb = DATASTORE_MEMORY[self.txnname]
 
+        if self.chunkname not in DATASTORE_MEMORY:
+            DATASTORE_MEMORY[self.chunkname] = dict()
+        self.chunkdb = DATASTORE_MEMORY[self.chunkname]
+
+        if self.indexname not in DATASTORE_MEMORY:
+            DATASTORE_MEMORY[self.indexname] = dict()
+        self.indexdb = DATASTORE_MEMORY[self.indexname]
+
+        if self.indexname + '-keys' not in DATASTORE_MEMORY:
+            DATASTORE_MEMORY[self.indexname + '-keys'] = dict()
+        self.indexkeys = DATASTORE_MEMORY[self.indexname + '-keys']
+
+        self.gsiname = self.txnname + '-gsi'
+        if self.gsiname not in DATASTORE_MEMORY:
+            DATASTORE_MEMORY[self.gsiname] = dict()
+        self.gsidb: dict[tuple[str, str], dict[bytes, list[tuple[
+            Any, ...]]]] = DATASTORE_MEMORY[self.gsiname]
+
+        self.feedname = self.txnname + '-feed'
+        if self.feedname not in DATASTORE_MEMORY:
+            DATASTORE_MEMORY[self.feedname] = dict()
+        self.feeddb = DATASTORE_MEMORY[self.feedname]
+
+        if self.feedname + '-subscribers' not in DATASTORE_MEMORY:
+            DATASTORE_MEMORY[self.feedname + '-subscribers'] = dict()
+        self.subscribers: dict[int, collections.abc.Callable[
+            [int, dict[str, Any]],
+            None]] = DATASTORE_MEMORY[self.feedname + '-subscribers']
+
     def ds_get_log(self,
                    kid: str,
-                   pxn: InclinePxn | None = None) -> list[dict[str, Any]]:
+                   pxn: InclinePxn | None = None,
+                   fields: list[str] | None = None) -> list[dict[str, Any]]:
         request_args = locals()
         with self.trace.span("incline.datastore.ds_get_log") as span:
             self.map_request_span(request_args, span)
@@ -92,14 +151,18 @@ class InclineDatastoreMemory(InclineDatastore):
                 # XXX max in prepare transaction id order (counter, client)
                 pxnstr = str(
                     max((l.split('.')[1], l.split('.')[0]) for l in log))
-            local_resp = self.map_log_response(copy.deepcopy(log.get(pxnstr)))
+            if pxnstr not in log:
+                return []
+            local_resp = self.map_log_response(
+                copy.deepcopy(self.project(log[pxnstr], fields)))
             self.map_response_span(local_resp, span)
             return local_resp
 
     def ds_get_txn(self,
                    kid: str,
                    tsv: int | str | Decimal | None = None,
-                   limit: int = 1) -> list[dict[str, Any]]:
+                   limit: int = 1,
+                   fields: list[str] | None = None) -> list[dict[str, Any]]:
         request_args = locals()
         with self.trace.span("incline.datastore.ds_get_txn") as span:
             self.map_request_span(request_args, span)
@@ -117,10 +180,59 @@ class InclineDatastoreMemory(InclineDatastore):
                 if not txn:
                     raise ValueError(self.txndb)
                 tsv = max(txn)
-            local_resp = self.map_txn_response(copy.deepcopy(txn.get(tsv)))
+            if tsv not in txn:
+                return []
+            local_resp = self.map_txn_response(
+                copy.deepcopy(self.project(txn[tsv], fields)))
             self.map_response_span(local_resp, span)
             return local_resp
 
+    def ds_get_txn_asof(self,
+                        kid: str,
+                        tsv: Decimal,
+                        fields: list[str] | None = None,
+                        limit: int = 1) -> list[dict[str, Any]]:
+        request_args = locals()
+        with self.trace.span("incline.datastore.ds_get_txn_asof") as span:
+            self.map_request_span(request_args, span)
+            self.log.info('gettxn %s asof %s', kid, tsv)
+            return self.txn_asof(kid, tsv, fields, limit=limit)
+
+    def ds_get_txns(
+            self,
+            kids: list[str],
+            fields: list[str] | None = None,
+            as_of: Decimal | None = None) -> dict[str, list[dict[str, Any]]]:
+        """
+        Latest txn of many keys under one span, without a lookup per key
+        """
+        request_args = locals()
+        with self.trace.span("incline.datastore.ds_get_txns") as span:
+            self.map_request_span(request_args, span)
+            self.log.info('gettxns [%s]', ','.join(kids))
+            if as_of:
+                return {kid: self.txn_asof(kid, as_of, fields) for kid in kids}
+            txns: dict[str, list[dict[str, Any]]] = dict()
+            for kid in kids:
+                txn = self.txndb.get(kid)
+                txns[kid] = []
+                if txn:
+                    txns[kid] = self.map_txn_response(
+                        copy.deepcopy(self.project(txn[max(txn)], fields)))
+            return txns
+
+    def txn_asof(self,
+                 kid: str,
+                 tsv: Decimal,
+                 fields: list[str] | None,
+                 limit: int = 1) -> list[dict[str, Any]]:
+        txn = self.txndb.get(kid)
+        if not txn:
+            return []
+        tsvs = sorted((t for t in txn if t <= tsv), reverse=True)[:limit]
+        return self.map_txn_response(
+            [copy.deepcopy(self.project(txn[t], fields)) for t in tsvs])
+
     def ds_prepare(self, kid: str, val: dict[str,
                                              Any]) -> list[dict[str, Any]]:
         request_args = locals()
@@ -153,11 +265,21 @@ class InclineDatastoreMemory(InclineDatastore):
                 if kid in self.txndb:
                     raise ValueError
 
-            val = self.gentxn(log, tsv=orgtsv)
+            val = self.gentxn(log, tsv=orgtsv, org=org)
             self.map_txn_span(val, span, prefix="txn")
             if kid not in self.txndb:
                 self.txndb[kid] = {}
+            old = self.txndb[kid].get(log.get('tsv', 0))
+            if old:
+                self.gsi_remove(old)
             self.txndb[kid][log.get('tsv', 0)] = val
+            self.gsi_put(val)
+            puts, deletes = self.index_changes(val, org)
+            self.ds_update_idx(puts, deletes)
+            # commits again of the same version, as refresh makes, are not
+            # changes
+            if not old or old.get('pxn') != val.get('pxn'):
+                self.publish(val)
             return self.map_txn_response(copy.deepcopy(val))
 
     def ds_scan_log(self,
@@ -165,46 +287,134 @@ class InclineDatastoreMemory(InclineDatastore):
                     tsv: Decimal | None = None,
                     limit: int | None = None) -> list[dict[str, Any]]:
         """
-        return list of [{'kid': kid, 'tsv': tsv}]
+        return list of [{'kid': kid, 'pxn': pxn, 'tsv': tsv}]
         """
         request_args = locals()
-        logs = list()
         with self.trace.span("incline.datastore.ds_scan_log") as span:
             self.map_request_span(request_args, span)
+            return list(self.ds_iter_log(kid=kid, tsv=tsv))
 
-            if kid:
-                keys = [kid]
-            else:
-                keys = list(self.logdb.keys())
-
-            for key in keys:
-                for k, v in self.logdb.get(key, {}).items():
-                    logs.append({'kid': key, 'pxn': v.get('pxn')})
+    def ds_iter_log(
+        self,
+        kid: str | None = None,
+        tsv: Decimal | None = None
+    ) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        yield {'kid': kid, 'pxn': pxn, 'tsv': tsv}, grouped by key
+        """
+        if kid:
+            keys = [kid]
+        else:
+            keys = list(self.logdb.keys())
 
-            return logs
+        for key in keys:
+            for v in list(self.logdb.get(key, {}).values()):
+                yield {'kid': key, 'pxn': v.get('pxn'), 'tsv': v.get('tsv')}
 
     def ds_scan_txn(self,
                     kid: str | None = None,
                     tsv: Decimal | int | str | None = None,
                     limit: int | None = None) -> list[dict[str, Any]]:
         request_args = locals()
-        txns = list()
         with self.trace.span("incline.datastore.ds_scan_txn") as span:
             self.map_request_span(request_args, span)
+            return list(self.ds_iter_txn(kid=kid, tsv=tsv))
 
-            if tsv and not isinstance(tsv, Decimal):
-                tsv = self.pxn.decimal(tsv)
+    def ds_iter_txn(
+            self,
+            kid: str | None = None,
+            tsv: Decimal | int | str | None = None,
+            segment: int = 0,
+            segments: int = 1,
+            start: Any = None) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        yield {'kid': kid, 'pxn': pxn, 'tsv': tsv}, grouped by key.  The last
+        version of a key carries the kid as the scan position in 'pos', and
+        start resumes after one.
+        """
+        if kid:
+            keys = [kid]
+        else:
+            keys = list(self.txndb.keys())
+        # keys are in insertion order, a start since deleted rescans
+        if start is not None and start in keys:
+            keys = keys[keys.index(start) + 1:]
 
-            if kid:
-                keys = [kid]
-            else:
-                keys = list(self.txndb.keys())
+        for key in keys:
+            if self.txn_segment(key, segments) != segment:
+                continue
+            versions = list(self.txndb.get(key, {}).values())
+            for i, v in enumerate(versions):
+                txn = {'kid': key, 'pxn': v.get('pxn'), 'tsv': v.get('tsv')}
+                if i + 1 == len(versions):
+                    txn['pos'] = key
+                yield txn
 
-            for key in keys:
-                for k, v in self.txndb.get(key, {}).items():
-                    txns.append({'kid': key, 'tsv': v.get('tsv')})
+    def ds_search_txn(
+            self,
+            where: InclineFilter,
+            segment: int = 0,
+            segments: int = 1) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        Filter compiled to a predicate, evaluated on the latest version of
+        each key in place, without copying its dat
+        """
+        predicate = incline_filter_compile(where)
+        self.log.info('searchtxn %s', where.op)
+        for key in list(self.txndb.keys()):
+            if self.txn_segment(key, segments) != segment:
+                continue
+            versions = self.txndb.get(key)
+            if not versions:
+                continue
+            v = versions[max(versions)]
+            if v.get('tmb'):
+                continue
+            if self.search_encoded(v) or predicate(v.get('dat')):
+                yield {'kid': key, 'pxn': v.get('pxn'), 'tsv': v.get('tsv')}
 
-            return txns
+    def publish(self, txn: dict[str, Any]) -> None:
+        """
+        Append a committed txn to the change feed, and pass it to subscribers
+        """
+        with DATASTORE_MEMORY_FEED_LOCK:
+            seq = len(self.feeddb) + 1
+            self.feeddb[seq] = copy.deepcopy(txn)
+        for callback in list(self.subscribers.values()):
+            try:
+                callback(seq, self.map_txn_response(copy.deepcopy(txn))[0])
+            except Exception as e:
+                self.log.warning('publish %s subscriber failed: %s',
+                                 txn['kid'], e)
+
+    def ds_subscribe(
+        self, callback: collections.abc.Callable[[int, dict[str, Any]], None]
+    ) -> collections.abc.Callable[[], None]:
+        """
+        Call back with (position, txn) on every commit, until the returned
+        function unsubscribes
+        """
+        with DATASTORE_MEMORY_FEED_LOCK:
+            sid = max(self.subscribers, default=0) + 1
+            self.subscribers[sid] = callback
+
+        def unsubscribe() -> None:
+            self.subscribers.pop(sid, None)
+
+        return unsubscribe
+
+    def ds_iter_changes(
+        self,
+        position: Any = None
+    ) -> collections.abc.Iterator[tuple[Any, dict[str, Any]]]:
+        """
+        Positions are feed sequence numbers
+        """
+        seq = int(position or 0)
+        while seq + 1 in self.feeddb:
+            seq += 1
+            for txn in self.map_txn_response(copy.deepcopy(self.feeddb[seq])):
+                yield seq, txn
 
     def ds_delete_log(self, kid: str, pxn: InclinePxn) -> None:
         request_args = locals()
@@ -228,6 +438,204 @@ class InclineDatastoreMemory(InclineDatastore):
                 return
             if tsv not in self.txndb[kid]:
                 return
+            self.gsi_remove(self.txndb[kid][tsv])
             del self.txndb[kid][tsv]
             if not self.txndb[kid]:
                 del self.txndb[kid]
+
+    def ds_update_idx(self, puts: list[dict[str, Any]],
+                      deletes: list[dict[str, Any]]) -> None:
+        """
+        INDEX { 'idx': { 'ikey': entry } }
+        """
+        for d in deletes:
+            if self.indexdb.get(d['idx'], {}).pop(d['ikey'], None):
+                keys = self.indexkeys[d['idx']]
+                del keys[bisect.bisect_left(keys, d['ikey'])]
+        for p in puts:
+            entries = self.indexdb.setdefault(p['idx'], {})
+            if p['ikey'] not in entries:
+                bisect.insort(self.indexkeys.setdefault(p['idx'], []),
+                              p['ikey'])
+            entries[p['ikey']] = p
+
+    def ds_update_txn_index(self, kid: str, tsv: Decimal,
+                            attrs: dict[str, Any], remove: list[str]) -> None:
+        request_args = locals()
+        with self.trace.span("incline.datastore.ds_update_txn_index") as span:
+            self.map_request_span(request_args, span)
+            txn = self.txndb.get(kid, {}).get(tsv)
+            if txn is None:
+                return
+            self.gsi_remove(txn)
+            for k in remove:
+                txn.pop(k, None)
+            txn.update(copy.deepcopy(attrs))
+            self.gsi_put(txn)
+
+    def gsi_entries(
+        self, txn: dict[str, Any]
+    ) -> list[tuple[tuple[str, str], bytes, tuple[Any, ...]]]:
+        """
+        GSI entries of a txn, ((idx, sort), value, (sort, kid, tsv)).  A
+        composite index has only the versions with a sort key, and the sort
+        attribute is taken from the txn so entries outlive index changes.
+        """
+        entries = list()
+        for k, v in txn.items():
+            if not k.startswith('idx_'):
+                continue
+            idx = k[len('idx_'):]
+            sort = f"ids_{idx}" if f"ids_{idx}" in txn else 'tsv'
+            entries.append(((idx, sort), incline_serialize(v),
+                            (txn[sort], txn['kid'], txn['tsv'])))
+        return entries
+
+    def gsi_put(self, txn: dict[str, Any]) -> None:
+        for gsi, value, entry in self.gsi_entries(txn):
+            bisect.insort(
+                self.gsidb.setdefault(gsi, {}).setdefault(value, []), entry)
+
+    def gsi_remove(self, txn: dict[str, Any]) -> None:
+        for gsi, value, entry in self.gsi_entries(txn):
+            entries = self.gsidb.get(gsi, {}).get(value, [])
+            pos = bisect.bisect_left(entries, entry)
+            if pos < len(entries) and entries[pos] == entry:
+                del entries[pos]
+            if not entries:
+                self.gsidb.get(gsi, {}).pop(value, None)
+
+    def ds_query_idx(
+        self,
+        idx: str,
+        val: Any,
+        fields: list[str] | None = None,
+        cond: InclineIndexCondition | None = None,
+        limit: int | None = None,
+        reverse: bool = False,
+        start: dict[str, Any] | None = None
+    ) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+        """
+        Index lookups are a hash of the indexed value, then a binary search of
+        entries sorted as the GSI or the index table sorts them
+        """
+        request_args = locals()
+        with self.trace.span("incline.datastore.ds_query_idx") as span:
+            self.map_request_span(request_args, span)
+            self.log.info('getidx %s val %s', idx, val)
+
+            index = self.indexes.get(idx)
+            sort = self.idx_sort(idx)
+            if index and index.multi:
+                if not cond:
+                    cond = InclineIndexCondition(op='eq', value=val)
+                keys: list[Any] = self.indexkeys.get(idx, [])
+                lo, hi = self.key_bounds(keys, cond, lambda k: k)
+                pos = start['ikey'] if start else None
+            else:
+                if cond and sort == 'tsv':
+                    raise InclineDataError(f"index {idx} has no sort key")
+                keys = self.gsidb.get((idx, sort),
+                                      {}).get(incline_serialize(val), [])
+                lo, hi = 0, len(keys)
+                if cond:
+                    lo, hi = self.key_bounds(keys, cond, lambda e: e[0])
+                pos = (start[sort], start['kid'],
+                       start['tsv']) if start else None
+
+            if pos is not None and not reverse:
+                lo = max(lo, bisect.bisect_right(keys, pos))
+            if pos is not None and reverse:
+                hi = min(hi, bisect.bisect_left(keys, pos))
+            # copy only the page, and one more entry to tell if there is more
+            if limit and reverse:
+                found = keys[max(lo, hi - limit - 1):hi]
+            elif limit:
+                found = keys[lo:min(hi, lo + limit + 1)]
+            else:
+                found = keys[lo:hi]
+            if reverse:
+                found.reverse()
+            last = None
+            if limit and len(found) > limit:
+                found = found[:limit]
+                last = found[-1]
+
+            if index and index.multi:
+                entries = [
+                    self.map_idx_entry(idx, self.indexdb[idx][k])
+                    for k in found
+                ]
+            else:
+                entries = [
+                    self.map_idx_txn(idx, val, sort, e, fields) for e in found
+                ]
+            self.map_response_span(entries, span)
+            if last is None:
+                return entries, None
+            return entries, entries[-1]['idk']
+
+    def key_bounds(
+            self, keys: list[Any], cond: InclineIndexCondition,
+            key: collections.abc.Callable[[Any], str]) -> tuple[int, int]:
+        """
+        Slice of sorted keys matching a key condition
+        """
+        op, vals = incline_index_range(cond)
+        if op == '<':
+            return 0, bisect.bisect_left(keys, vals[0], key=key)
+        if op == '>=':
+            return bisect.bisect_left(keys, vals[0], key=key), len(keys)
+        if op == 'between':
+            return (bisect.bisect_left(keys, vals[0], key=key),
+                    bisect.bisect_right(keys, vals[1], key=key))
+        lo = hi = bisect.bisect_left(keys, vals[0], key=key)
+        while hi < len(keys) and key(keys[hi]).startswith(vals[0]):
+            hi += 1
+        return lo, hi
+
+    def map_idx_entry(self, idx: str, entry: dict[str, Any]) -> dict[str, Any]:
+        data = {
+            k: copy.deepcopy(v)
+            for k, v in entry.items() if k not in ('idx', 'ikey', 'val')
+        }
+        data['idk'] = {'idx': idx, 'ikey': entry['ikey']}
+        return data
+
+    def map_idx_txn(self, idx: str, val: Any, sort: str, entry: tuple[Any,
+                                                                      ...],
+                    fields: list[str] | None) -> dict[str, Any]:
+        _, kid, tsv = entry
+        txn = self.only(
+            self.map_txn_response(
+                copy.deepcopy(self.project(self.txndb[kid][tsv], fields))))
+        data = {
+            k: v
+            for k, v in txn.items()
+            if not k.startswith(('idx_', 'ids_', 'idm_'))
+        }
+        data['idk'] = {
+            f"idx_{idx}": val,
+            sort: entry[0],
+            'kid': kid,
+            'tsv': tsv
+        }
+        return data
+
+    def ds_put_chunk(self, digest: str, data: bytes) -> None:
+        with self.trace.span("incline.datastore.ds_put_chunk") as span:
+            span.set_attribute("incline.chunk", digest)
+            self.chunkdb.setdefault(digest, bytes(data))
+
+    def ds_get_chunk(self, digest: str) -> bytes | None:
+        with self.trace.span("incline.datastore.ds_get_chunk") as span:
+            span.set_attribute("incline.chunk", digest)
+            return self.chunkdb.get(digest)
+
+
+incline_register('memory',
+                 InclineDatastoreMemory,
+                 capabilities=[
+                     INCLINE_CAPABILITY_BATCH_GET, INCLINE_CAPABILITY_INDEXES,
+                     INCLINE_CAPABILITY_CHANGES
+                 ])
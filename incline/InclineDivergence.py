@@ -0,0 +1,15 @@
+from dataclasses import dataclass, field
+from incline.InclineRecord import InclineRecord
+
+
+@dataclass
+class InclineDivergence:
+    """
+    Replicas returning different content for the latest version of a key.
+
+    newest: record with the newest tsv, returned to the caller
+    other:  record from another replica with a different pxn and content
+    """
+    kid: str = field()
+    newest: InclineRecord = field()
+    other: InclineRecord = field()
@@ -0,0 +1,270 @@
+import collections.abc
+from dataclasses import dataclass, field
+import itertools
+import logging
+import time
+from typing import Any
+from incline.checkpoint import InclineCheckpoint
+from incline.InclineDatastore import InclineDatastore
+from incline.InclineMeta import InclineMeta
+from incline.InclinePrepare import InclinePxn
+from incline.InclineRecord import InclineRecord
+from incline.InclineTrace import InclineTrace
+
+# txns read per poll
+INCLINE_FEED_BATCH = 100
+# txns read after the first write of a transaction before it is emitted
+# without the writes still missing
+INCLINE_FEED_PENDING = 1000
+# seconds between polls when following a feed
+INCLINE_FEED_INTERVAL = 1.0
+
+
+@dataclass
+class InclineChange:
+    """
+    pxn:        prepare ID of the transaction
+    records:    committed versions of the keys it wrote, in commit order
+    complete:   every write of the transaction to the datastore was read
+    """
+    pxn: InclinePxn
+    records: list[InclineRecord] = field(default_factory=list)
+    complete: bool = True
+
+
+@dataclass
+class InclineFeedPending:
+    """
+    Transaction read in part.  start and last are the read counts of its first
+    and last writes, before is the position to read its first write again.
+    """
+    start: int
+    before: Any
+    last: int = 0
+    records: dict[str, InclineRecord] = field(default_factory=dict)
+    expect: set[str] | None = field(default_factory=set)
+
+
+class InclineFeed(object):
+    """
+    Change feed of the txns a datastore commits, in commit order per key.
+    Writes are grouped by pxn, and a transaction is emitted once every key
+    its metadata lists in the datastore is read, so consumers apply
+    multi-key transactions atomically.  A transaction is emitted only after
+    the earlier transactions of its keys.
+
+    Txns are read in batches.  The checkpoint is the position before the
+    oldest transaction still in part, with the transactions emitted since,
+    so a restart reads them again and emits each once.
+    """
+
+    def __init__(self,
+                 datastore: InclineDatastore,
+                 fields: list[str] | None = None,
+                 batch: int = INCLINE_FEED_BATCH,
+                 checkpoint: InclineCheckpoint | None = None,
+                 pending: int = INCLINE_FEED_PENDING,
+                 trace: InclineTrace | None = None):
+        """
+        fields:     fields of records, with met always, None for all
+        batch:      txns read per poll
+        checkpoint: where the position is saved, and resumed from
+        pending:    txns read before an incomplete transaction is emitted
+        """
+        self.datastore = datastore
+        self.fields = list(dict.fromkeys(fields + ['met'])) if fields else None
+        self.batch = batch
+        self.checkpoint = checkpoint
+        self.max_pending = pending
+        self.position: Any = None
+        self.read = 0
+        self.caught_up = False
+        self.pending: dict[str, InclineFeedPending] = dict()
+        # pxn emitted, to the read count of its last write and its keys
+        self.emitted: dict[str, tuple[int, list[str]]] = dict()
+        # writes emitted before a restart, (pxn, kid), to skip read again
+        self.replay: set[tuple[str, str]] = set()
+        self.writesets: dict[str, InclineMeta | None] = dict()
+        self.log = logging.getLogger('incline.feed')
+        if not trace:
+            trace = InclineTrace(name='incline.feed')
+        self.trace = trace
+        meter = trace.meter
+        assert meter
+        self.metric_changes = meter.create_counter(
+            'incline.feed.changes', description='committed txns read')
+        self.load()
+
+    def load(self) -> None:
+        state = self.checkpoint.load() if self.checkpoint else None
+        resume = (state or {}).get(self.datastore.loc())
+        if not resume:
+            return
+        self.position = resume.get('position')
+        self.replay = {(p, k)
+                       for p, kids in resume.get('emitted', {}).items()
+                       for k in kids}
+        self.log.info('feed %s resume at %s', self.datastore.loc(),
+                      self.position)
+
+    def save(self) -> None:
+        """
+        Checkpoint the changes polled so far as applied
+        """
+        if not self.checkpoint:
+            return
+        oldest = next(iter(self.pending.values()), None)
+        position = oldest.before if oldest else self.position
+        # emitted with writes after the position
+        emitted: dict[str, list[str]] = {
+            p: kids
+            for p, (_, kids) in self.emitted.items()
+        }
+        for p, k in self.replay:
+            emitted.setdefault(p, []).append(k)
+        state = self.checkpoint.load() or dict()
+        state[self.datastore.loc()] = {
+            'position': position,
+            'emitted': {
+                p: sorted(set(k))
+                for p, k in sorted(emitted.items())
+            }
+        }
+        self.checkpoint.save(state)
+
+    def prune(self) -> None:
+        """
+        Forget emitted transactions read entirely before the checkpoint
+        position, they are not read again
+        """
+        oldest = next(iter(self.pending.values()), None)
+        floor = oldest.start if oldest else self.read + 1
+        self.emitted = {p: e for p, e in self.emitted.items() if e[0] >= floor}
+
+    def changes(
+        self,
+        follow: bool = False,
+        interval: float = INCLINE_FEED_INTERVAL
+    ) -> collections.abc.Iterator[list[InclineChange]]:
+        """
+        Stream batches of changes.  The checkpoint is saved as the next batch
+        is asked for, once the last is applied.  Stops when caught up, or
+        with follow polls again every interval.
+        """
+        while True:
+            changes = self.poll()
+            if changes:
+                yield changes
+            self.save()
+            if not self.caught_up:
+                continue
+            if not follow:
+                return
+            time.sleep(interval)
+
+    def poll(self) -> list[InclineChange]:
+        """
+        Read a batch of committed txns, and return the transactions complete
+        """
+        loc = self.datastore.loc()
+        with self.trace.span("incline.feed.poll") as span:
+            span.set_attribute("incline.location", loc)
+            count = 0
+            changes = self.datastore.ds_iter_changes(self.position)
+            for position, txn in itertools.islice(changes, self.batch):
+                self.add(position, txn)
+                count += 1
+            self.caught_up = count < self.batch
+            ready = self.ready()
+            self.prune()
+            self.metric_changes.add(count, {'incline.location': loc})
+            span.set_attribute("incline.feed.read", count)
+            span.set_attribute("incline.feed.changes", len(ready))
+            span.set_attribute("incline.feed.pending", len(self.pending))
+            self.log.info('feed %s read %d changes %d pending %d', loc, count,
+                          len(ready), len(self.pending))
+            return ready
+
+    def add(self, position: Any, txn: dict[str, Any]) -> None:
+        self.read += 1
+        before, self.position = self.position, position
+        pxn = txn['pxn']
+        if (pxn, txn['kid']) in self.replay:
+            # read again after a restart, emitted before it
+            self.replay.discard((pxn, txn['kid']))
+            return
+        if self.fields:
+            txn = self.datastore.project(txn, self.fields)
+        record = self.datastore.data_to_records([txn])[0]
+
+        group = self.pending.get(pxn)
+        if not group:
+            group = InclineFeedPending(start=self.read, before=before)
+            self.pending[pxn] = group
+        group.records[record.kid] = record
+        group.last = self.read
+        expect = self.expect(record)
+        if expect is None or group.expect is None:
+            group.expect = None
+        else:
+            group.expect |= expect
+
+    def expect(self, record: InclineRecord) -> set[str] | None:
+        """
+        Keys a transaction wrote to the datastore, from the metadata of one of
+        its writes.  None when its write-set cannot be read.
+        """
+        loc = self.datastore.loc()
+        kids = {record.kid}
+        for m in record.met.meta:
+            if m.pxn != record.pxn:
+                continue
+            writes = [m]
+            if m.writeset:
+                met = self.writeset(m.kid, m.pxn)
+                if met is None:
+                    return None
+                writes = met.meta
+            kids.update(w.kid for w in writes if w.loc == loc)
+        return kids
+
+    def writeset(self, kid: str, pxn: InclinePxn) -> InclineMeta | None:
+        """
+        Shared write-set of a transaction, logged in the datastore
+        """
+        if pxn.pxn not in self.writesets:
+            logs = self.datastore.ds_get_log(kid, pxn, fields=['met'])
+            met = None
+            if logs:
+                met = self.datastore.data_to_records(logs)[0].met
+            else:
+                self.log.warning('feed %s write-set %s not found',
+                                 self.datastore.loc(), pxn.pxn)
+            self.writesets[pxn.pxn] = met
+        return self.writesets[pxn.pxn]
+
+    def ready(self) -> list[InclineChange]:
+        """
+        Emit complete transactions, and those pending too long, unless an
+        earlier pending transaction wrote one of their keys
+        """
+        changes: list[InclineChange] = list()
+        blocked: set[str] = set()
+        for pxn, group in list(self.pending.items()):
+            kids = set(group.records)
+            complete = group.expect is not None and group.expect <= kids
+            expired = self.read - group.start >= self.max_pending
+            if (complete or expired) and not kids & blocked:
+                if not complete:
+                    self.log.warning('feed %s emit %s incomplete',
+                                     self.datastore.loc(), pxn)
+                del self.pending[pxn]
+                self.emitted[pxn] = (group.last, sorted(kids))
+                self.writesets.pop(pxn, None)
+                changes.append(
+                    InclineChange(pxn=InclinePxn().loads(pxn),
+                                  records=list(group.records.values()),
+                                  complete=complete))
+                continue
+            blocked |= kids
+        return changes
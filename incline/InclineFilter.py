@@ -0,0 +1,170 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+import operator
+from typing import Any, Callable
+from incline.error import InclineInterface
+
+INCLINE_FILTER_EQ = 'eq'
+INCLINE_FILTER_NE = 'ne'
+INCLINE_FILTER_LT = 'lt'
+INCLINE_FILTER_LTE = 'lte'
+INCLINE_FILTER_GT = 'gt'
+INCLINE_FILTER_GTE = 'gte'
+INCLINE_FILTER_BETWEEN = 'between'
+INCLINE_FILTER_BEGINS_WITH = 'begins_with'
+INCLINE_FILTER_IN = 'in'
+INCLINE_FILTER_EXISTS = 'exists'
+INCLINE_FILTER_AND = 'and'
+INCLINE_FILTER_OR = 'or'
+INCLINE_FILTER_NOT = 'not'
+INCLINE_FILTER_COMPARISONS = [
+    INCLINE_FILTER_EQ, INCLINE_FILTER_NE, INCLINE_FILTER_LT,
+    INCLINE_FILTER_LTE, INCLINE_FILTER_GT, INCLINE_FILTER_GTE,
+    INCLINE_FILTER_BETWEEN, INCLINE_FILTER_BEGINS_WITH, INCLINE_FILTER_IN,
+    INCLINE_FILTER_EXISTS
+]
+INCLINE_FILTER_LOGICAL = [
+    INCLINE_FILTER_AND, INCLINE_FILTER_OR, INCLINE_FILTER_NOT
+]
+INCLINE_FILTER_PATH_SEPARATOR = '.'
+# value of a path not in dat, unlike any value including None
+INCLINE_FILTER_MISSING = object()
+
+INCLINE_FILTER_OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+    INCLINE_FILTER_EQ: operator.eq,
+    INCLINE_FILTER_NE: operator.ne,
+    INCLINE_FILTER_LT: operator.lt,
+    INCLINE_FILTER_LTE: operator.le,
+    INCLINE_FILTER_GT: operator.gt,
+    INCLINE_FILTER_GTE: operator.ge,
+}
+
+
+@dataclass
+class InclineFilter:
+    """
+    Predicate on the dat of records.  A comparison of the value at a dotted
+    path, or the and, or and not of filters, combined with &, | and ~.
+
+    op:         comparison or logical operator
+    path:       dotted path in dat
+    value:      compared with, the lower bound of between, a list for in
+    upper:      upper bound of between
+    filters:    operands of and, or and not
+    """
+    op: str
+    path: str = ''
+    value: Any = None
+    upper: Any = None
+    filters: list["InclineFilter"] = field(default_factory=list)
+
+    def __and__(self, other: "InclineFilter") -> "InclineFilter":
+        return InclineFilter(INCLINE_FILTER_AND, filters=[self, other])
+
+    def __or__(self, other: "InclineFilter") -> "InclineFilter":
+        return InclineFilter(INCLINE_FILTER_OR, filters=[self, other])
+
+    def __invert__(self) -> "InclineFilter":
+        return InclineFilter(INCLINE_FILTER_NOT, filters=[self])
+
+
+def incline_filter_validate(where: InclineFilter) -> None:
+    if where.op in INCLINE_FILTER_LOGICAL:
+        if not where.filters:
+            raise InclineInterface(f"filter {where.op} has no filters")
+        if where.op == INCLINE_FILTER_NOT and len(where.filters) != 1:
+            raise InclineInterface("filter not takes one filter")
+        for f in where.filters:
+            incline_filter_validate(f)
+        return
+    if where.op not in INCLINE_FILTER_COMPARISONS:
+        raise InclineInterface(f"unknown filter {where.op}")
+    if not where.path:
+        raise InclineInterface(f"filter {where.op} has no path")
+    if where.op == INCLINE_FILTER_IN and not isinstance(
+            where.value, (list, tuple, set)):
+        raise InclineInterface("filter in takes a list of values")
+    if where.op == INCLINE_FILTER_BEGINS_WITH and not isinstance(
+            where.value, str):
+        raise InclineInterface("filter begins_with takes a string")
+
+
+def incline_filter_number(value: Any) -> Any:
+    """
+    Floats as the Decimal a datastore stores, so both compare equal
+    """
+    if isinstance(value, float):
+        return Decimal(f"{value}")
+    if isinstance(value, (list, tuple, set)):
+        return [incline_filter_number(v) for v in value]
+    return value
+
+
+def incline_filter_value(dat: Any, path: str) -> Any:
+    """
+    Value at a dotted path in dat, INCLINE_FILTER_MISSING when not found
+    """
+    for part in path.split(INCLINE_FILTER_PATH_SEPARATOR):
+        if not isinstance(dat, dict) or part not in dat:
+            return INCLINE_FILTER_MISSING
+        dat = dat[part]
+    return dat
+
+
+def incline_filter_compile(where: InclineFilter) -> Callable[[Any], bool]:
+    """
+    Compile a filter to a predicate on dat.  A comparison is false when the
+    path is missing or the types cannot compare, as in DynamoDB.
+    """
+    incline_filter_validate(where)
+
+    def build(f: InclineFilter) -> Callable[[Any], bool]:
+        if f.op in INCLINE_FILTER_LOGICAL:
+            parts = [build(p) for p in f.filters]
+            if f.op == INCLINE_FILTER_AND:
+                return lambda dat: all(p(dat) for p in parts)
+            if f.op == INCLINE_FILTER_OR:
+                return lambda dat: any(p(dat) for p in parts)
+            return lambda dat: not parts[0](dat)
+
+        path, op = f.path, f.op
+        value = incline_filter_number(f.value)
+        upper = incline_filter_number(f.upper)
+        compare = INCLINE_FILTER_OPERATORS.get(op)
+
+        def test(dat: Any) -> bool:
+            v = incline_filter_value(dat, path)
+            if v is INCLINE_FILTER_MISSING:
+                return False
+            if op == INCLINE_FILTER_EXISTS:
+                return True
+            v = incline_filter_number(v)
+            try:
+                if op == INCLINE_FILTER_BETWEEN:
+                    return bool(value <= v <= upper)
+                if op == INCLINE_FILTER_BEGINS_WITH:
+                    return isinstance(v, str) and v.startswith(value)
+                if op == INCLINE_FILTER_IN:
+                    return v in value
+                assert compare
+                return bool(compare(v, value))
+            except TypeError:
+                return False
+
+        return test
+
+    return build(where)
+
+
+def incline_filter_equals(where: InclineFilter) -> dict[str, Any]:
+    """
+    Paths every match equals a value at, from the equalities anded at the
+    top of a filter
+    """
+    if where.op == INCLINE_FILTER_EQ:
+        return {where.path: incline_filter_number(where.value)}
+    equals: dict[str, Any] = dict()
+    if where.op == INCLINE_FILTER_AND:
+        for f in where.filters:
+            equals.update(incline_filter_equals(f))
+    return equals
@@ -1,9 +1,141 @@
-from dataclasses import dataclass
+import base64
+from dataclasses import dataclass, field
+from decimal import Decimal
 from typing import Any
+from incline.codec import incline_encode, incline_decode, INCLINE_CODEC_JSON
+from incline.error import InclineInterface, InclineDataError
+
+# components of a composite key, sorting below any printable character
+INCLINE_INDEX_KEY_SEPARATOR = '\x1f'
+# just above the separator, bounds every key starting with a component
+INCLINE_INDEX_KEY_AFTER = '\x20'
+INCLINE_INDEX_KEY_DIGITS = 20
+# entries per page of an index query
+INCLINE_INDEX_PAGE = 100
+
+INCLINE_INDEX_EQ = 'eq'
+INCLINE_INDEX_LT = 'lt'
+INCLINE_INDEX_LTE = 'lte'
+INCLINE_INDEX_GT = 'gt'
+INCLINE_INDEX_GTE = 'gte'
+INCLINE_INDEX_BETWEEN = 'between'
+INCLINE_INDEX_BEGINS_WITH = 'begins_with'
+INCLINE_INDEX_CONDITIONS = [
+    INCLINE_INDEX_EQ, INCLINE_INDEX_LT, INCLINE_INDEX_LTE, INCLINE_INDEX_GT,
+    INCLINE_INDEX_GTE, INCLINE_INDEX_BETWEEN, INCLINE_INDEX_BEGINS_WITH
+]
 
 
 @dataclass
 class InclineIndex:
+    """
+    name:   index name, stored as idx_<name>
+    path:   dotted path in dat of the indexed value
+    value:  fixed value, for indexes not read from dat
+    sort:   composite sort key, dotted paths concatenated into ids_<name>
+    multi:  path names a list, each element is an entry in the index table
+    """
     name: str
     path: str = ''
     value: Any = None
+    sort: list[str] = field(default_factory=list)
+    multi: bool = False
+
+
+@dataclass
+class InclineIndexCondition:
+    """
+    Condition on an index sort key, or on the values of a multi-value index.
+    Values are scalars, or lists of the components of a composite key.
+    """
+    op: str
+    value: Any
+    upper: Any = None
+
+
+def incline_index_sortable(value: Any) -> str:
+    """
+    String sorting in the same order as the value.  Numbers are zero padded,
+    negative numbers complemented.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bool, int, float, Decimal)):
+        number = Decimal(str(value))
+        whole, _, frac = format(abs(number), 'f').partition('.')
+        frac = frac.rstrip('0')
+        whole = whole.zfill(INCLINE_INDEX_KEY_DIGITS)
+        if number >= 0:
+            return f"1{whole}.{frac}"
+        complement = str.maketrans('0123456789', '9876543210')
+        return f"0{whole.translate(complement)}.{frac.translate(complement)}~"
+    return str(value)
+
+
+def incline_index_key(*values: Any) -> str:
+    """
+    Composite key of values, sorting as a tuple of the values
+    """
+    return INCLINE_INDEX_KEY_SEPARATOR.join(
+        incline_index_sortable(v) for v in values)
+
+
+def incline_index_range(cond: InclineIndexCondition) -> tuple[str, list[str]]:
+    """
+    Key condition on composite keys, (op, [values]) with op one of '<', '>=',
+    'between' or 'begins_with'.  A key matches a value when the value is the
+    whole key or its first components, so entries keyed by value and a
+    suffix match too.
+    """
+
+    def key(value: Any) -> str:
+        if isinstance(value, (list, tuple)):
+            return incline_index_key(*value)
+        return incline_index_sortable(value)
+
+    if cond.op == INCLINE_INDEX_EQ:
+        return 'between', [
+            key(cond.value),
+            key(cond.value) + INCLINE_INDEX_KEY_AFTER
+        ]
+    if cond.op == INCLINE_INDEX_LT:
+        return '<', [key(cond.value)]
+    if cond.op == INCLINE_INDEX_LTE:
+        return '<', [key(cond.value) + INCLINE_INDEX_KEY_AFTER]
+    if cond.op == INCLINE_INDEX_GT:
+        return '>=', [key(cond.value) + INCLINE_INDEX_KEY_AFTER]
+    if cond.op == INCLINE_INDEX_GTE:
+        return '>=', [key(cond.value)]
+    if cond.op == INCLINE_INDEX_BETWEEN:
+        return 'between', [
+            key(cond.value),
+            key(cond.upper) + INCLINE_INDEX_KEY_AFTER
+        ]
+    if cond.op == INCLINE_INDEX_BEGINS_WITH:
+        if isinstance(cond.value, (list, tuple)):
+            return 'begins_with', [
+                key(cond.value) + INCLINE_INDEX_KEY_SEPARATOR
+            ]
+        return 'begins_with', [key(cond.value)]
+    raise InclineInterface(f"unknown index condition {cond.op}")
+
+
+def incline_index_token(state: dict[str, Any]) -> str:
+    """
+    Opaque token to resume an index query
+    """
+    return base64.urlsafe_b64encode(incline_encode(state)).decode()
+
+
+def incline_index_state(token: str) -> dict[str, Any]:
+    """
+    State of an index query from a resume token
+    """
+    try:
+        state = incline_decode(INCLINE_CODEC_JSON,
+                               base64.urlsafe_b64decode(token))
+    except (ValueError, InclineDataError) as e:
+        raise InclineInterface(f"invalid index token: {e}")
+    if not isinstance(state, dict):
+        raise InclineInterface("invalid index token")
+    return state
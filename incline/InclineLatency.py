@@ -0,0 +1,58 @@
+from dataclasses import dataclass, field
+import math
+import threading
+
+INCLINE_LATENCY_ALPHA = 0.2
+INCLINE_LATENCY_Z95 = 1.645
+INCLINE_LATENCY_MIN = 0.001
+
+
+@dataclass
+class InclineLatency:
+    """
+    Exponentially weighted moving average of request latency, in seconds.
+
+    p95 is estimated from the weighted mean and variance, assuming latency is
+    roughly normal.  Cheap enough to update on every request.
+
+    alpha: weight of the newest sample
+    mean:  EWMA of latency
+    var:   EWMA of variance
+    count: number of samples
+    """
+    alpha: float = field(default=INCLINE_LATENCY_ALPHA)
+    mean: float = field(default=0.0)
+    var: float = field(default=0.0)
+    count: int = field(default=0)
+    lock: threading.Lock = field(default_factory=threading.Lock,
+                                 repr=False,
+                                 compare=False)
+
+    def add(self, sample: float) -> None:
+        with self.lock:
+            if not self.count:
+                self.mean = sample
+                self.var = 0.0
+            else:
+                diff = sample - self.mean
+                incr = self.alpha * diff
+                self.mean += incr
+                self.var = (1 - self.alpha) * (self.var + diff * incr)
+            self.count += 1
+
+    @property
+    def p95(self) -> float:
+        """
+        Estimated 95th percentile.  Infinite until the first sample arrives.
+        """
+        if not self.count:
+            return math.inf
+        return max(self.mean + INCLINE_LATENCY_Z95 * math.sqrt(self.var),
+                   INCLINE_LATENCY_MIN)
+
+    def rank(self) -> tuple[bool, float]:
+        """
+        Sort key, fastest first.  Locations without samples sort ahead so they
+        are measured.
+        """
+        return (self.count > 0, self.mean)
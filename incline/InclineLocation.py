@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+import functools
+from incline.error import InclineInterface
+
+INCLINE_LOCATION_DELIMITER = '|'
+INCLINE_LOCATION_CACHE = 4096
+
+
+@dataclass(frozen=True)
+class InclineLocation:
+    """
+    Parsed datastore location string <type>|<region>|<name>
+
+    Hashable, so it can key a connection registry.  loc is the canonical
+    location string.
+    """
+    dbtype: str
+    region: str
+    name: str
+    delimiter: str = field(default=INCLINE_LOCATION_DELIMITER, compare=False)
+    loc: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self, 'loc',
+            self.delimiter.join([self.dbtype, self.region, self.name]))
+
+    def __format__(self, format_spec: str) -> str:
+        return self.loc
+
+    def __str__(self) -> str:
+        return self.loc
+
+    def to_dict(self) -> dict[str, str]:
+        return {
+            'dbtype': self.dbtype,
+            'region': self.region,
+            'name': self.name
+        }
+
+
+@functools.lru_cache(maxsize=INCLINE_LOCATION_CACHE)
+def incline_location(
+        location: str,
+        delimiter: str = INCLINE_LOCATION_DELIMITER) -> InclineLocation:
+    """
+    Parse a location string once.  Repeated lookups of the same location are
+    served from the cache.
+    """
+    parts = location.split(delimiter)
+    if len(parts) != 3:
+        raise InclineInterface('location string incorrect format')
+    return InclineLocation(dbtype=parts[0],
+                           region=parts[1],
+                           name=parts[2],
+                           delimiter=delimiter)
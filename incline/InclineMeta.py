@@ -2,6 +2,16 @@ from dataclasses import dataclass, field, InitVar
 from typing import Any
 from incline.InclinePrepare import InclinePxn
 
+INCLINE_META_WRITESET = '~ws.'
+
+
+def incline_writeset_kid(pxn: InclinePxn) -> str:
+    """
+    Key ID of the shared write-set log item for a prepare transaction.  The
+    ~ws. prefix is reserved.
+    """
+    return f"{INCLINE_META_WRITESET}{pxn.pxn}"
+
 
 @dataclass
 class InclineMetaWrite:
@@ -19,6 +29,13 @@ class InclineMetaWrite:
         if meta:
             self.from_dict(meta)
 
+    @property
+    def writeset(self) -> bool:
+        """
+        Reference to a shared write-set log item instead of a single write
+        """
+        return self.kid.startswith(INCLINE_META_WRITESET)
+
     def to_dict(self) -> dict[str, str]:
         return {'kid': self.kid, 'loc': self.loc, 'pxn': self.pxn.pxn}
 
@@ -2,13 +2,16 @@ from dataclasses import dataclass, field
 from decimal import Decimal
 import numbers
 import time
-from typing import SupportsInt
+from typing import Any, SupportsInt
 import uuid
-from incline.base62 import base_encode, base_decode
+from incline.base62 import base_encode, base_encode_just, base_decode
 
 INCLINE_TXN_MULTIPLY = 1000000000
 INCLINE_TXN_QUANTIZE = "1.000000"
 INCLINE_TXN_MONOTIZE = "0.000001"
+INCLINE_TXN_EXPONENT = -6
+INCLINE_TXN_NS_PER_US = 1000
+INCLINE_TXN_QUANTUM = Decimal(INCLINE_TXN_QUANTIZE)
 INCLINE_TXN_CID_JUST = 9
 INCLINE_TXN_CNT_JUST = 11
 """
@@ -42,20 +45,34 @@ class InclinePxn:
     cnt: Timestamp
     cid: ClientID
     pxn: {clientid:9}.{timestamp:11}
+
+    The encoded pxn string is cached until cnt or cid change.
     """
     cnt: int = field(default=0)
     cid: int = field(default=INCLINE_TXN_CLIENTID)
+    _pxn: str = field(default="", init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name != '_pxn':
+            object.__setattr__(self, '_pxn', "")
+        object.__setattr__(self, name, value)
 
     @property
     def pxn(self) -> str:
-        cid = base_encode(self.cid).rjust(INCLINE_TXN_CID_JUST, '0')
-        cnt = base_encode(self.cnt).rjust(INCLINE_TXN_CNT_JUST, '0')
-        return f"{cid}.{cnt}"
+        if not self._pxn:
+            cid = base_encode_just(self.cid, INCLINE_TXN_CID_JUST)
+            cnt = base_encode_just(self.cnt, INCLINE_TXN_CNT_JUST)
+            self._pxn = f"{cid}.{cnt}"
+        return self._pxn
 
     def loads(self, pxn: str) -> "InclinePxn":
         (cid, _, cnt) = pxn.partition('.')
         self.cid = base_decode(cid)
         self.cnt = base_decode(cnt)
+        # already canonical, skip encoding on first read
+        if (len(cid) == INCLINE_TXN_CID_JUST
+                and len(cnt) == INCLINE_TXN_CNT_JUST):
+            self._pxn = pxn
         return self
 
     def __format__(self, format_spec: str) -> str:
@@ -76,7 +93,7 @@ class InclinePrepare(object):
         self.__cid = INCLINE_TXN_CLIENTID
         self.__cidstr = ""
         self.__cnt = int(0)
-        self.__tsv = Decimal(0)
+        self.__tsv = int(0)
         self.__cidstr = self.cid(cid)
 
     def pxn(self) -> InclinePxn:
@@ -93,15 +110,14 @@ class InclinePrepare(object):
             else:
                 self.__cid = base_decode(cid)
         if not self.__cidstr:
-            self.__cidstr = base_encode(self.__cid).rjust(
-                INCLINE_TXN_CID_JUST, '0')
+            self.__cidstr = base_encode_just(self.__cid, INCLINE_TXN_CID_JUST)
         return self.__cidstr
 
     def cnt(self, cnt: int | None = None) -> int:
         """
         Monotonic timestamp counter
         """
-        now = int(self.now() * INCLINE_TXN_MULTIPLY)
+        now = self.now_us() * INCLINE_TXN_NS_PER_US
         if not cnt or cnt < now:
             cnt = now
         if cnt < self.__cnt:
@@ -111,16 +127,33 @@ class InclinePrepare(object):
 
     def now(self) -> Decimal:
         """
-        Monotonic nanosecond UTC timestamp
+        Monotonic UTC timestamp, quantized to microseconds
+        """
+        return self.tsv(self.now_us())
+
+    def now_us(self) -> int:
+        """
+        Monotonic integer microsecond UTC timestamp.  Hybrid logical clock,
+        wall clock time unless the clock has not advanced or went backwards,
+        then one microsecond after the last timestamp issued.
         """
-        now = self.decimal(time.time_ns() / INCLINE_TXN_MULTIPLY)
+        now = time.time_ns() // INCLINE_TXN_NS_PER_US
 
-        # Add a microsecond if quantized time is equal or backwards
+        # Add a microsecond if time is equal or backwards
         if now <= self.__tsv:
-            now = self.__tsv + self.decimal(INCLINE_TXN_MONOTIZE)
+            now = self.__tsv + 1
 
         self.__tsv = now
         return now
 
+    def tsv(self, us: int) -> Decimal:
+        """
+        Integer microseconds to a quantized Decimal timestamp, without float
+        division or quantize
+        """
+        return Decimal(us).scaleb(INCLINE_TXN_EXPONENT)
+
     def decimal(self, number: str | int | float | Decimal) -> Decimal:
-        return Decimal(number).quantize(Decimal(INCLINE_TXN_QUANTIZE))
+        if not isinstance(number, Decimal):
+            number = Decimal(number)
+        return number.quantize(INCLINE_TXN_QUANTUM)
@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field, InitVar
 from decimal import Decimal
-from typing import Any
+from typing import Any, Callable
+from incline.codec import incline_decode, incline_summary
 from incline.InclineIndex import InclineIndex
 from incline.InclineMeta import InclineMeta
 from incline.InclinePrepare import InclinePxn
@@ -27,7 +28,14 @@ class InclineRecord:
                              init=False,
                              repr=False,
                              compare=False)
-    dat: Any = field(init=False, repr=False, compare=False)
+    dig: str = field(default="", init=False, repr=False, compare=False)
+    siz: int = field(default=0, init=False, repr=False, compare=False)
+    cdc: str = field(default="", init=False, repr=False, compare=False)
+    raw: Any = field(default=None, init=False, repr=False, compare=False)
+    load: Callable[[], Any] | None = field(default=None,
+                                           init=False,
+                                           repr=False,
+                                           compare=False)
     idx: dict[str, InclineIndex] = field(default_factory=dict)
     record: InitVar[dict[str, Any] | None] = None
 
@@ -41,10 +49,45 @@ class InclineRecord:
     def __str__(self) -> str:
         return f"kid={self.kid} tsv={self.tsv} pxn={self.pxn}"
 
+    @property
+    def dat(self) -> Any:
+        """
+        Data, read and decoded on first access when stored in chunks or with a
+        codec
+        """
+        self.fetch()
+        if self.cdc:
+            self.raw = incline_decode(self.cdc, self.raw)
+            self.cdc = ""
+        return self.raw
+
+    @dat.setter
+    def dat(self, val: Any) -> None:
+        self.raw = val
+        self.cdc = ""
+        self.load = None
+
+    def fetch(self) -> None:
+        """
+        Read dat stored in chunks, still encoded
+        """
+        if self.load:
+            self.raw = self.load()
+            self.load = None
+
     @property
     def data(self) -> Any:
         return self.dat
 
+    @property
+    def digest(self) -> str:
+        """
+        Content hash of dat, as stored or computed for older records
+        """
+        if not self.dig:
+            self.dig, self.siz = incline_summary(self.dat)
+        return self.dig
+
     @property
     def meta(self) -> dict[str, Any]:
         return {
@@ -57,7 +100,9 @@ class InclineRecord:
             'rid': self.rid,
             'org': self.org,
             'ver': self.ver,
-            'met': self.met
+            'met': self.met,
+            'dig': self.dig,
+            'siz': self.siz
         }
 
     def from_dict(self, val: dict[str, Any]) -> "InclineRecord":
@@ -97,10 +142,17 @@ class InclineRecord:
             else:
                 self.met = InclineMeta().from_dict(val['met'])
 
+        if val.get('dig'):
+            self.dig = val['dig']
+
+        if val.get('siz'):
+            self.siz = int(val['siz'])
+
         # delete records use dat=None, ensure dat exists
         self.dat = None
-        if val.get('dat'):
-            self.dat = val['dat']
+        if val.get('dat') or val.get('chk'):
+            self.raw = val.get('dat')
+            self.cdc = val.get('cdc') or ""
 
         for k, v in val.items():
             if k.startswith('idx_'):
@@ -121,5 +173,17 @@ class InclineRecord:
             'org': self.org,
             'ver': self.ver,
             'met': self.met.to_dict(),
-            'dat': self.dat
+            'dig': self.dig,
+            'siz': self.siz,
+            **self.encoded()
         }
+
+    def encoded(self) -> dict[str, Any]:
+        """
+        dat as stored, still encoded when it has not been read.  Chunks are
+        joined, for the datastore to chunk again.
+        """
+        self.fetch()
+        if self.cdc:
+            return {'cdc': self.cdc, 'dat': self.raw}
+        return {'dat': self.raw}
@@ -0,0 +1,229 @@
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from decimal import Decimal
+import collections.abc
+import logging
+import threading
+from typing import Any
+from incline.InclineDatastore import InclineDatastore, INCLINE_TXN_SUMMARY
+from incline.InclineMeta import INCLINE_META_WRITESET
+from incline.InclinePrepare import InclinePxn
+from incline.InclineTrace import InclineTrace
+from incline.throttle import InclineThrottle
+
+INCLINE_RECOVERY_TIMEOUT = 60.0
+INCLINE_RECOVERY_BATCH = 100
+INCLINE_RECOVERY_WORKERS = 4
+INCLINE_RECOVERY_RATE = 50.0
+INCLINE_RECOVERY_INTERVAL = 300.0
+
+
+@dataclass
+class InclineRecoveryStats:
+    """
+    scanned:    log entries read
+    committed:  orphans committed
+    superseded: prepares older than the latest commit, left alone
+    pending:    prepares younger than the timeout, may still commit
+    errors:     orphans that failed to commit
+    lag:        age of the oldest orphan committed, seconds
+    """
+    scanned: int = field(default=0)
+    committed: int = field(default=0)
+    superseded: int = field(default=0)
+    pending: int = field(default=0)
+    errors: int = field(default=0)
+    lag: float = field(default=0.0)
+
+    def add(self, other: "InclineRecoveryStats") -> None:
+        self.scanned += other.scanned
+        self.committed += other.committed
+        self.superseded += other.superseded
+        self.pending += other.pending
+        self.errors += other.errors
+        self.lag = max(self.lag, other.lag)
+
+
+class InclineRecovery(object):
+    """
+    Commit orphaned prepares, left in the log by a client that died between
+    prepare and commit.
+
+    The log is streamed and grouped into batches of whole keys.  Each batch
+    reads the latest commit of its keys in one request, and commits the
+    newest prepare of any key whose latest commit is older and whose prepare
+    is older than the timeout.  Batches run in parallel, commits are rate
+    limited.
+    """
+
+    def __init__(self,
+                 datastores: list[InclineDatastore],
+                 timeout: float = INCLINE_RECOVERY_TIMEOUT,
+                 batch: int = INCLINE_RECOVERY_BATCH,
+                 workers: int = INCLINE_RECOVERY_WORKERS,
+                 rate: float = INCLINE_RECOVERY_RATE,
+                 trace: InclineTrace | None = None):
+        """
+        timeout: seconds a prepare may wait for its commit
+        batch:   keys per txn lookup
+        workers: batches in parallel
+        rate:    commits per second, zero is unlimited
+        """
+        self.datastores = datastores
+        self.timeout = Decimal(str(timeout))
+        self.batch = batch
+        self.workers = workers
+        self.throttle = InclineThrottle(rate=rate)
+        self.log = logging.getLogger('incline.recovery')
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread | None = None
+
+        if not trace:
+            trace = InclineTrace(name='incline.recovery')
+        self.trace = trace
+        meter = trace.meter
+        assert meter
+        self.metric_scanned = meter.create_counter(
+            'incline.recovery.scanned', description='log entries scanned')
+        self.metric_orphans = meter.create_counter(
+            'incline.recovery.orphans', description='orphaned prepares found')
+        self.metric_committed = meter.create_counter(
+            'incline.recovery.committed',
+            description='orphaned prepares committed')
+        self.metric_lag = meter.create_histogram(
+            'incline.recovery.lag',
+            unit='s',
+            description='age of orphaned prepares when committed')
+
+    def run(self) -> InclineRecoveryStats:
+        """
+        One pass over every datastore
+        """
+        stats = InclineRecoveryStats()
+        for con in self.datastores:
+            stats.add(self.recover(con))
+        return stats
+
+    def recover(self, con: InclineDatastore) -> InclineRecoveryStats:
+        stats = InclineRecoveryStats()
+        with self.trace.span("incline.recovery.recover") as span:
+            span.set_attribute("incline.location", con.loc())
+            self.log.info('recover %s', con.loc())
+            pending: set[Future[InclineRecoveryStats]] = set()
+            with ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='incline-recovery') as executor:
+                for logs in self.batches(con.ds_iter_log()):
+                    # bound batches in flight, the scan is streamed
+                    while len(pending) >= self.workers * 2:
+                        done, pending = wait(pending,
+                                             return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            stats.add(fut.result())
+                    pending.add(executor.submit(self.recover_batch, con, logs))
+                for fut in pending:
+                    stats.add(fut.result())
+
+            span.set_attribute("incline.recovery.scanned", stats.scanned)
+            span.set_attribute("incline.recovery.committed", stats.committed)
+            self.log.info('recover %s scanned %d committed %d errors %d',
+                          con.loc(), stats.scanned, stats.committed,
+                          stats.errors)
+            return stats
+
+    def batches(
+        self, logs: collections.abc.Iterable[dict[str, Any]]
+    ) -> collections.abc.Iterator[list[dict[str, Any]]]:
+        """
+        Group a log scan into batches, never splitting a key across batches
+        so the newest prepare of a key is seen by one worker
+        """
+        batch: list[dict[str, Any]] = list()
+        kids: set[str] = set()
+        for log in logs:
+            if log['kid'] not in kids and len(kids) >= self.batch:
+                yield batch
+                batch = list()
+                kids = set()
+            kids.add(log['kid'])
+            batch.append(log)
+        if batch:
+            yield batch
+
+    def recover_batch(self, con: InclineDatastore,
+                      logs: list[dict[str, Any]]) -> InclineRecoveryStats:
+        stats = InclineRecoveryStats(scanned=len(logs))
+        attrs = {'incline.location': con.loc()}
+        self.metric_scanned.add(len(logs), attrs)
+
+        # newest prepare of each key, write-sets are never committed
+        newest: dict[str, dict[str, Any]] = dict()
+        for log in logs:
+            if log['kid'].startswith(INCLINE_META_WRITESET):
+                continue
+            cur = newest.get(log['kid'])
+            if not cur or InclinePxn().loads(log['pxn']) > InclinePxn().loads(
+                    cur['pxn']):
+                newest[log['kid']] = log
+        if not newest:
+            return stats
+
+        txns = con.ds_get_txns(list(newest), fields=INCLINE_TXN_SUMMARY)
+        now = con.pxn.now()
+        for kid, log in newest.items():
+            txn = con.first(txns.get(kid, []))
+            if txn and txn.get('pxn') == log['pxn']:
+                continue
+            if txn and con.pxn.decimal(txn['tsv']) >= con.pxn.decimal(
+                    log['tsv']):
+                stats.superseded += 1
+                continue
+            age = now - con.pxn.decimal(log['tsv'])
+            if age < self.timeout:
+                stats.pending += 1
+                continue
+
+            pxn = InclinePxn().loads(log['pxn'])
+            self.metric_orphans.add(1, attrs)
+            self.log.warning('recover orphan %s pxn %s age %s', kid,
+                             format(pxn), age)
+            self.throttle.acquire()
+            try:
+                con.commit(kid, pxn)
+            except Exception as e:
+                self.log.warning('recover %s pxn %s failed: %s', kid,
+                                 format(pxn), e)
+                stats.errors += 1
+                continue
+            stats.committed += 1
+            stats.lag = max(stats.lag, float(age))
+            self.metric_committed.add(1, attrs)
+            self.metric_lag.record(float(age), attrs)
+        return stats
+
+    def start(self, interval: float = INCLINE_RECOVERY_INTERVAL) -> None:
+        """
+        Run a pass every interval seconds on a daemon thread
+        """
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.serve,
+                                       args=(interval, ),
+                                       name='incline-recovery',
+                                       daemon=True)
+        self.thread.start()
+
+    def serve(self, interval: float) -> None:
+        while not self.stop_event.is_set():
+            try:
+                self.run()
+            except Exception as e:
+                self.log.warning('recovery pass failed: %s', e)
+            self.stop_event.wait(interval)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
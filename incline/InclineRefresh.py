@@ -0,0 +1,202 @@
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+import collections.abc
+import copy
+import logging
+from typing import Any
+from incline.checkpoint import InclineCheckpoint
+from incline.InclineDatastore import InclineDatastore, INCLINE_TXN_SUMMARY
+from incline.InclinePrepare import InclinePxn, INCLINE_TXN_QUANTUM
+from incline.InclineTrace import InclineTrace
+from incline.throttle import InclineThrottle
+
+INCLINE_REFRESH_BATCH = 100
+INCLINE_REFRESH_WORKERS = 8
+INCLINE_REFRESH_RATE = 0.0
+
+
+@dataclass
+class InclineRefreshStats:
+    """
+    scanned:    keys read from the source
+    refreshed:  commits to target datastores
+    current:    targets already holding the latest version
+    errors:     commits that failed
+    position:   source scan position of the keys done, where a resumed run
+                starts
+    """
+    scanned: int = field(default=0)
+    refreshed: int = field(default=0)
+    current: int = field(default=0)
+    errors: int = field(default=0)
+    position: Any = field(default=None)
+
+    def add(self, other: "InclineRefreshStats") -> None:
+        self.scanned += other.scanned
+        self.refreshed += other.refreshed
+        self.current += other.current
+        self.errors += other.errors
+
+
+class InclineRefresh(object):
+    """
+    Bulk refresh, copying the latest version of every key in a source
+    datastore to target datastores, as when a replica is added.
+
+    Keys stream from the source txn table and are read in batches.  Each
+    batch reads the latest version from the source and the targets in one
+    request each, and commits only where a target is behind.  Batches run in
+    parallel, the key rate is limited, and the source scan position of the
+    last contiguous batch done is checkpointed so a restart resumes after it.
+    """
+
+    def __init__(self,
+                 source: InclineDatastore,
+                 targets: list[InclineDatastore],
+                 batch: int = INCLINE_REFRESH_BATCH,
+                 workers: int = INCLINE_REFRESH_WORKERS,
+                 rate: float = INCLINE_REFRESH_RATE,
+                 checkpoint: InclineCheckpoint | None = None,
+                 trace: InclineTrace | None = None):
+        """
+        batch:      keys per read
+        workers:    batches in parallel
+        rate:       keys per second, zero is unlimited
+        checkpoint: where progress is saved, and resumed from
+        """
+        self.source = source
+        self.targets = [t for t in targets if t.loc() != source.loc()]
+        self.batch = batch
+        self.workers = workers
+        self.throttle = InclineThrottle(rate=rate, burst=max(rate, batch))
+        self.checkpoint = checkpoint
+        self.log = logging.getLogger('incline.refresh')
+        if not trace:
+            trace = InclineTrace(name='incline.refresh')
+        self.trace = trace
+        meter = trace.meter
+        assert meter
+        self.metric_scanned = meter.create_counter(
+            'incline.refresh.scanned', description='keys read from source')
+        self.metric_refreshed = meter.create_counter(
+            'incline.refresh.refreshed', description='commits to targets')
+
+    def batches(self,
+                start: Any) -> collections.abc.Iterator[tuple[Any, list[str]]]:
+        """
+        (scan position after batch, keys) of distinct source keys, scanning
+        after start.  Scans return every version grouped by key, and a
+        position covers only keys already read.
+        """
+        batch: list[str] = list()
+        position = start
+        last = None
+        for txn in self.source.ds_iter_txn(start=start):
+            position = txn.get('pos', position)
+            if txn['kid'] == last:
+                continue
+            last = txn['kid']
+            batch.append(last)
+            if len(batch) >= self.batch:
+                yield position, batch
+                batch = list()
+        if batch:
+            yield position, batch
+
+    def run(self) -> InclineRefreshStats:
+        stats = InclineRefreshStats()
+        state = self.checkpoint.load() if self.checkpoint else None
+        if state and state.get('source') == self.source.loc():
+            stats.position = state.get('position')
+            self.log.info('refresh %s resume after %s', self.source.loc(),
+                          stats.position)
+
+        with self.trace.span("incline.refresh.run") as span:
+            span.set_attribute("incline.location", self.source.loc())
+            # batches in flight in scan order, to checkpoint only contiguous
+            # work
+            inflight: list[int] = list()
+            positions: dict[int, Any] = dict()
+            done_batches: set[int] = set()
+            pending: dict[Future[InclineRefreshStats], int] = dict()
+
+            def collect(
+                futs: collections.abc.Iterable[Future[InclineRefreshStats]]
+            ) -> None:
+                for fut in futs:
+                    done_batches.add(pending.pop(fut))
+                    stats.add(fut.result())
+                while inflight and inflight[0] in done_batches:
+                    seq = inflight.pop(0)
+                    done_batches.discard(seq)
+                    stats.position = positions.pop(seq)
+                    self.save(stats)
+
+            with ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='incline-refresh') as executor:
+                for seq, (position,
+                          kids) in enumerate(self.batches(stats.position)):
+                    # bound batches in flight, the scan is streamed
+                    while len(pending) >= self.workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    self.throttle.acquire(len(kids))
+                    inflight.append(seq)
+                    positions[seq] = position
+                    pending[executor.submit(self.refresh_batch, kids)] = seq
+                collect(list(pending))
+
+            span.set_attribute("incline.refresh.scanned", stats.scanned)
+            span.set_attribute("incline.refresh.refreshed", stats.refreshed)
+            self.log.info('refresh %s scanned %d refreshed %d errors %d',
+                          self.source.loc(), stats.scanned, stats.refreshed,
+                          stats.errors)
+            return stats
+
+    def save(self, stats: InclineRefreshStats) -> None:
+        if self.checkpoint:
+            self.checkpoint.save({
+                'source': self.source.loc(),
+                'position': stats.position
+            })
+
+    def refresh_batch(self, kids: list[str]) -> InclineRefreshStats:
+        stats = InclineRefreshStats(scanned=len(kids))
+        attrs = {'incline.location': self.source.loc()}
+        self.metric_scanned.add(len(kids), attrs)
+
+        # latest version including tombstones, deletes replicate too
+        records = {
+            kid: self.source.data_to_records(txns)
+            for kid, txns in self.source.ds_get_txns(kids).items() if txns
+        }
+        for target in self.targets:
+            current = target.ds_get_txns(list(records),
+                                         fields=INCLINE_TXN_SUMMARY)
+            for kid, recs in records.items():
+                record = recs[0]
+                txn = target.first(current.get(kid, []))
+                # each datastore stamps its own tsv, the pxn orders versions
+                # across them
+                if txn and InclinePxn().loads(txn['pxn']) >= record.pxn:
+                    stats.current += 1
+                    continue
+                if txn and target.pxn.decimal(txn['tsv']) >= record.tsv:
+                    # commit above the older version the target holds
+                    record = copy.copy(record)
+                    record.tsv = target.pxn.decimal(
+                        txn['tsv']) + INCLINE_TXN_QUANTUM
+                try:
+                    target.replicate(record)
+                except Exception as e:
+                    self.log.warning('refresh %s to %s failed: %s', kid,
+                                     target.loc(), e)
+                    stats.errors += 1
+                    continue
+                stats.refreshed += 1
+                self.metric_refreshed.add(
+                    1, {
+                        **attrs, 'incline.target': target.loc()
+                    })
+        return stats
@@ -3,13 +3,17 @@ import string
 BASE_LIST = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
 BASE_DICT = dict((c, i) for i, c in enumerate(BASE_LIST))
 
+# two digits per divmod for the default base
+BASE_PAIRS = [a + b for a in BASE_LIST for b in BASE_LIST]
+BASE_PAIRS_LEN = len(BASE_PAIRS)
+
 
 def base_decode(string: str, reverse_base: dict[str, int] = BASE_DICT) -> int:
     string = str(string)
     length = len(reverse_base)
     ret = 0
-    for i, c in enumerate(string[::-1]):
-        ret += (length**i) * reverse_base[c]
+    for c in string:
+        ret = ret * length + reverse_base[c]
 
     return ret
 
@@ -17,14 +21,50 @@ def base_decode(string: str, reverse_base: dict[str, int] = BASE_DICT) -> int:
 def base_encode(integer: int, base: str = BASE_LIST) -> str:
     if integer <= 0:
         return base[0]
+    # floats are truncated, inf cannot be encoded
+    try:
+        integer = int(integer)
+    except OverflowError as e:
+        raise ValueError(f"cannot encode {integer}") from e
+
+    if base is BASE_LIST:
+        return base_encode_pairs(integer)
 
     length = len(base)
-    ret = ''
+    ret = []
     while integer > 0:
-        code = int(integer % length)
-        ret = base[code] + ret
-        integer -= code
-        # floor division to remain int type
-        integer //= length
+        integer, code = divmod(integer, length)
+        ret.append(base[code])
 
-    return ret
+    return ''.join(reversed(ret))
+
+
+def base_encode_pairs(integer: int) -> str:
+    """
+    Default base, two digits per divmod from the BASE_PAIRS lookup table
+    """
+    ret = []
+    while integer >= BASE_PAIRS_LEN:
+        integer, code = divmod(integer, BASE_PAIRS_LEN)
+        ret.append(BASE_PAIRS[code])
+
+    # no leading zero from the lookup table
+    if integer >= len(BASE_LIST):
+        ret.append(BASE_PAIRS[integer])
+    elif integer > 0:
+        ret.append(BASE_LIST[integer])
+
+    return ''.join(reversed(ret))
+
+
+def base_encode_just(integer: int, width: int) -> str:
+    """
+    Fixed width encoding, zero padded.  Same as base_encode().rjust(), wider
+    when the value does not fit
+    """
+    if integer <= 0:
+        return BASE_LIST[0] * width
+    ret = base_encode(integer)
+    if len(ret) >= width:
+        return ret
+    return BASE_LIST[0] * (width - len(ret)) + ret
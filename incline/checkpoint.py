@@ -0,0 +1,60 @@
+import json
+import os
+import threading
+from typing import Any
+
+
+class InclineCheckpoint(object):
+    """
+    Progress of a long running job, so a restart resumes where it stopped.
+    Held in memory, subclasses persist it.
+    """
+
+    def __init__(self) -> None:
+        self.state: dict[str, Any] | None = None
+        self.lock = threading.Lock()
+
+    def load(self) -> dict[str, Any] | None:
+        with self.lock:
+            return dict(self.state) if self.state is not None else None
+
+    def save(self, state: dict[str, Any]) -> None:
+        with self.lock:
+            self.state = dict(state)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.state = None
+
+
+class InclineCheckpointFile(InclineCheckpoint):
+    """
+    Checkpoint in a JSON file, replaced atomically on every save
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+
+    def load(self) -> dict[str, Any] | None:
+        with self.lock:
+            try:
+                with open(self.path) as f:
+                    state: dict[str, Any] = json.load(f)
+                    return state
+            except FileNotFoundError:
+                return None
+
+    def save(self, state: dict[str, Any]) -> None:
+        with self.lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(state, f, default=str)
+            os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        with self.lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
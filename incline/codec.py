@@ -0,0 +1,141 @@
+from decimal import Decimal
+import hashlib
+import json
+from typing import Any
+import zlib
+from incline.error import InclineDataError
+
+INCLINE_DIGEST_SIZE = 16
+INCLINE_CODEC_ZLIB = 'zlib'
+INCLINE_CODEC_JSON = 'json'
+INCLINE_CODEC_THRESHOLD = 4096
+INCLINE_CODEC_LEVEL = 6
+
+
+def incline_canonical(val: Any) -> Any:
+    """
+    Numbers by value, tagged so they never equal a string.  Datastores store
+    floats as Decimal and return integral numbers as int, the same value
+    must serialize the same either way.
+    """
+    if isinstance(val, bool) or val is None or isinstance(val, str):
+        return val
+    if isinstance(val, (int, float, Decimal)):
+        number = Decimal(str(val)).normalize()
+        return {'__number__': format(number, 'f')}
+    if isinstance(val, dict):
+        return {str(k): incline_canonical(v) for k, v in val.items()}
+    if isinstance(val, (list, tuple)):
+        return [incline_canonical(v) for v in val]
+    return val
+
+
+def incline_serialize(val: Any) -> bytes:
+    """
+    Canonical JSON, keys sorted and without whitespace, so equal values
+    always serialize to equal bytes
+    """
+    return json.dumps(incline_canonical(val),
+                      sort_keys=True,
+                      separators=(',', ':'),
+                      default=str).encode()
+
+
+def incline_digest(val: Any) -> str:
+    """
+    Content hash of a value
+    """
+    digest, _ = incline_summary(val)
+    return digest
+
+
+def incline_summary(val: Any) -> tuple[str, int]:
+    """
+    Content hash and serialized size of a value, serializing once
+    """
+    data = incline_serialize(val)
+    digest = hashlib.blake2b(data, digest_size=INCLINE_DIGEST_SIZE)
+    return digest.hexdigest(), len(data)
+
+
+def incline_encode_default(val: Any) -> Any:
+    if isinstance(val, Decimal):
+        return {'__decimal__': str(val)}
+    raise TypeError(f"cannot encode {type(val)}")
+
+
+def incline_decode_hook(val: dict[str, Any]) -> Any:
+    if len(val) == 1 and '__decimal__' in val:
+        return Decimal(val['__decimal__'])
+    return val
+
+
+def incline_encode(dat: Any) -> bytes:
+    """
+    Compact JSON of dat, raising TypeError or ValueError when JSON cannot
+    encode it
+    """
+    return json.dumps(dat,
+                      separators=(',', ':'),
+                      default=incline_encode_default).encode()
+
+
+def incline_decode_bytes(cdc: str, dat: Any) -> bytes:
+    """
+    JSON of dat stored with a codec marker.  Binary attributes may come back
+    wrapped, as boto3 Binary.
+    """
+    data = bytes(getattr(dat, 'value', dat))
+    if cdc == INCLINE_CODEC_JSON:
+        return data
+    if cdc != INCLINE_CODEC_ZLIB:
+        raise InclineDataError(f"unknown codec {cdc}")
+    try:
+        return zlib.decompress(data)
+    except zlib.error as e:
+        raise InclineDataError(f"codec {cdc} decode failed: {e}")
+
+
+def incline_decode(cdc: str, dat: Any) -> Any:
+    """
+    Decode dat stored with a codec marker
+    """
+    data = incline_decode_bytes(cdc, dat)
+    try:
+        return json.loads(data, object_hook=incline_decode_hook)
+    except ValueError as e:
+        raise InclineDataError(f"codec {cdc} decode failed: {e}")
+
+
+class InclineCodec(object):
+    """
+    Compress dat above a size threshold, as compact JSON under zlib stored
+    in a binary attribute, marked with the codec in 'cdc'.  Smaller values,
+    and values JSON cannot encode, are stored as they are.
+
+    threshold:  serialized bytes before compressing
+    level:      zlib compression level
+    """
+
+    def __init__(self,
+                 threshold: int = INCLINE_CODEC_THRESHOLD,
+                 level: int = INCLINE_CODEC_LEVEL):
+        self.threshold = threshold
+        self.level = level
+
+    def encode(self, val: dict[str, Any]) -> dict[str, Any]:
+        """
+        Encode the dat of a log or txn item, returning a new item
+        """
+        if val.get('cdc') or not val.get('dat'):
+            return val
+        try:
+            data = incline_encode(val['dat'])
+        except (TypeError, ValueError):
+            return val
+        if len(data) < self.threshold:
+            return val
+        encoded = dict(val)
+        encoded['dat'] = zlib.compress(data, self.level)
+        encoded['cdc'] = INCLINE_CODEC_ZLIB
+        return encoded
@@ -0,0 +1,44 @@
+import copy
+from typing import Any
+
+INCLINE_DELTA_SET = 'set'
+INCLINE_DELTA_DEL = 'del'
+INCLINE_DELTA_SUB = 'sub'
+
+
+def incline_delta(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """
+    Patch from one document to another.  Changed keys are set, removed keys
+    deleted, and nested documents patched in turn.  Lists and other values
+    are replaced whole.
+    """
+    patch: dict[str, Any] = dict()
+    for k, v in new.items():
+        if k not in old:
+            patch.setdefault(INCLINE_DELTA_SET, dict())[k] = v
+        elif isinstance(v, dict) and isinstance(old[k], dict):
+            sub = incline_delta(old[k], v)
+            if sub:
+                patch.setdefault(INCLINE_DELTA_SUB, dict())[k] = sub
+        elif type(v) != type(old[k]) or v != old[k]:
+            patch.setdefault(INCLINE_DELTA_SET, dict())[k] = v
+    removed = [k for k in old if k not in new]
+    if removed:
+        patch[INCLINE_DELTA_DEL] = removed
+    return patch
+
+
+def incline_patch(old: dict[str, Any], patch: dict[str,
+                                                   Any]) -> dict[str, Any]:
+    """
+    Apply a patch, returning a new document
+    """
+    new = dict(old)
+    for k in patch.get(INCLINE_DELTA_DEL, []):
+        new.pop(k, None)
+    for k, v in patch.get(INCLINE_DELTA_SET, {}).items():
+        new[k] = copy.deepcopy(v)
+    for k, sub in patch.get(INCLINE_DELTA_SUB, {}).items():
+        base = new.get(k)
+        new[k] = incline_patch(base if isinstance(base, dict) else {}, sub)
+    return new
@@ -0,0 +1,114 @@
+import hashlib
+from decimal import Decimal
+
+INCLINE_MERKLE_DEPTH = 10
+INCLINE_MERKLE_DIGEST = 16
+
+
+def merkle_hash(*parts: bytes) -> bytes:
+    h = hashlib.blake2b(digest_size=INCLINE_MERKLE_DIGEST)
+    for p in parts:
+        h.update(p)
+    return h.digest()
+
+
+class InclineMerkle(object):
+    """
+    Hash tree over the latest (kid, tsv, pxn) of every key in a datastore.
+
+    Each datastore stamps its own tsv on a commit, so the tsv picks the latest
+    version within a datastore and the pxn identifies it across datastores.
+    Keys are bucketed by a hash of the kid into 2^depth leaves, so trees from
+    datastores with the same keys line up leaf for leaf.  Comparing two trees
+    descends only into differing subtrees, and yields the keys whose latest
+    version differs.
+    """
+
+    def __init__(self, depth: int = INCLINE_MERKLE_DEPTH):
+        self.depth = depth
+        self.leaves: list[dict[str, tuple[Decimal, str]]] = [
+            dict() for _ in range(1 << depth)
+        ]
+        # levels[0] is the root, levels[depth] the leaves
+        self.levels: list[list[bytes]] = list()
+
+    def bucket(self, kid: str) -> int:
+        digest = merkle_hash(kid.encode())
+        return int.from_bytes(digest[:8], 'big') >> (64 - self.depth)
+
+    def add(self, kid: str, tsv: Decimal, pxn: str) -> None:
+        """
+        Add a version, keeping the latest per key
+        """
+        leaf = self.leaves[self.bucket(kid)]
+        cur = leaf.get(kid)
+        if not cur or tsv > cur[0]:
+            leaf[kid] = (tsv, pxn)
+
+    def latest(self, kid: str) -> tuple[Decimal, str] | None:
+        """
+        (tsv, pxn) of the latest version of a key
+        """
+        return self.leaves[self.bucket(kid)].get(kid)
+
+    def build(self) -> "InclineMerkle":
+        hashes = list()
+        for leaf in self.leaves:
+            entries = [
+                f"{kid}\0{pxn}\n".encode()
+                for kid, (_, pxn) in sorted(leaf.items())
+            ]
+            hashes.append(merkle_hash(*entries))
+        self.levels = [hashes]
+        while len(self.levels[0]) > 1:
+            below = self.levels[0]
+            self.levels.insert(0, [
+                merkle_hash(below[i], below[i + 1])
+                for i in range(0, len(below), 2)
+            ])
+        return self
+
+    @property
+    def root(self) -> bytes:
+        if not self.levels:
+            self.build()
+        return self.levels[0][0]
+
+    def diff(self, other: "InclineMerkle") -> tuple[list[int], int]:
+        """
+        Leaves that differ, and the number of nodes compared
+        """
+        if self.depth != other.depth:
+            raise ValueError('merkle trees of different depth')
+        if not self.levels:
+            self.build()
+        if not other.levels:
+            other.build()
+        nodes = [0]
+        compared = 0
+        for level in range(self.depth + 1):
+            differ = list()
+            for n in nodes:
+                compared += 1
+                if self.levels[level][n] != other.levels[level][n]:
+                    differ.append(n)
+            if level == self.depth:
+                return differ, compared
+            nodes = [c for n in differ for c in (2 * n, 2 * n + 1)]
+        return [], compared
+
+    def diff_keys(self, other: "InclineMerkle") -> tuple[list[str], int]:
+        """
+        Keys whose latest version differs, and the number of nodes compared
+        """
+        leaves, compared = self.diff(other)
+        kids = list()
+        for n in leaves:
+            mine = self.leaves[n]
+            theirs = other.leaves[n]
+            for kid in sorted(set(mine) | set(theirs)):
+                a = mine.get(kid)
+                b = theirs.get(kid)
+                if not a or not b or a[1] != b[1]:
+                    kids.append(kid)
+        return kids, compared
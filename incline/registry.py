@@ -0,0 +1,72 @@
+from dataclasses import dataclass, field
+from typing import Callable
+from incline.InclineDatastore import InclineDatastore
+from incline.InclineTrace import InclineTrace
+from incline.error import InclineInterface
+
+# datastore reads many keys in one request
+INCLINE_CAPABILITY_BATCH_GET = 'batch_get'
+# datastore answers index lookups
+INCLINE_CAPABILITY_INDEXES = 'indexes'
+# datastore feeds the txns it commits
+INCLINE_CAPABILITY_CHANGES = 'changes'
+
+INCLINE_CAPABILITIES = frozenset([
+    INCLINE_CAPABILITY_BATCH_GET, INCLINE_CAPABILITY_INDEXES,
+    INCLINE_CAPABILITY_CHANGES
+])
+
+InclineDatastoreFactory = Callable[[str, str, InclineTrace | None],
+                                   InclineDatastore]
+
+
+@dataclass(frozen=True)
+class InclineRegistration:
+    """
+    dbtype:       location type, the first field of a location string
+    factory:      called with (name, region, trace) to open a datastore
+    capabilities: fast paths the datastore supports
+    """
+    dbtype: str
+    factory: InclineDatastoreFactory = field(compare=False)
+    capabilities: frozenset[str] = field(default=frozenset())
+
+    def capable(self, capability: str) -> bool:
+        return capability in self.capabilities
+
+
+# global registry, datastore modules register themselves on import
+INCLINE_REGISTRY: dict[str, InclineRegistration] = dict()
+
+
+def incline_register(
+    dbtype: str,
+    factory: InclineDatastoreFactory,
+    capabilities: frozenset[str] | set[str] | list[str] = frozenset()
+) -> InclineRegistration:
+    """
+    Register a datastore factory for a location dbtype.  Registering an
+    existing dbtype replaces it.
+    """
+    if not dbtype:
+        raise InclineInterface('datastore registration with no dbtype')
+    unknown = set(capabilities) - INCLINE_CAPABILITIES
+    if unknown:
+        raise InclineInterface(
+            f"unknown datastore capabilities {','.join(sorted(unknown))}")
+    reg = InclineRegistration(dbtype=dbtype,
+                              factory=factory,
+                              capabilities=frozenset(capabilities))
+    INCLINE_REGISTRY[dbtype] = reg
+    return reg
+
+
+def incline_unregister(dbtype: str) -> None:
+    INCLINE_REGISTRY.pop(dbtype, None)
+
+
+def incline_registration(dbtype: str) -> InclineRegistration:
+    reg = INCLINE_REGISTRY.get(dbtype)
+    if not reg:
+        raise InclineInterface(f"unknown datastore type {dbtype}")
+    return reg
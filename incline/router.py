@@ -3,12 +3,19 @@ from incline.error import InclineError, InclineInterface, InclineNotFound
 
 class InclineRouter(object):
 
-    def __init__(self, name: str = 'incline', region: str = 'us-west-2'):
-        self.init(name=name, region=region)
-
-    def init(self, name: str, region: str) -> None:
+    def __init__(self,
+                 name: str = 'incline',
+                 region: str = 'us-west-2',
+                 dbtype: str = 'dynamo'):
+        self.init(name=name, region=region, dbtype=dbtype)
+
+    def init(self, name: str, region: str, dbtype: str = 'dynamo') -> None:
+        """
+        dbtype: datastore type of every route, any registered type
+        """
         self.name = name
         self.region = region
+        self.dbtype = dbtype
         self.delimiter = '|'
         self.route_read: list[str] = list()
         self.route_write: list[str] = list()
@@ -46,47 +53,53 @@ class InclineRouter(object):
 
 class InclineRouterOne(InclineRouter):
 
-    def __init__(self, name: str = 'incline', region: str = 'us-west-2'):
-        self.init(name=name, region=region)
+    def __init__(self,
+                 name: str = 'incline',
+                 region: str = 'us-west-2',
+                 dbtype: str = 'dynamo'):
+        self.init(name=name, region=region, dbtype=dbtype)
 
     def default(self) -> None:
         self.route_read = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name)
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name)
         ]
         self.route_write = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name)
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name)
         ]
         self.route_search = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name)
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name)
         ]
 
 
 class InclineRouterTwo(InclineRouter):
 
-    def __init__(self, name: str = 'incline', region: str = 'us-west-2'):
-        self.init(name=name, region=region)
+    def __init__(self,
+                 name: str = 'incline',
+                 region: str = 'us-west-2',
+                 dbtype: str = 'dynamo'):
+        self.init(name=name, region=region, dbtype=dbtype)
 
     def default(self) -> None:
         self.route_read = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '1'),
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '2')
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '1'),
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '2')
         ]
         self.route_write = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '1'),
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '2')
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '1'),
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '2')
         ]
         self.route_search = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '1'),
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '2')
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '1'),
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '2')
         ]
 
 
@@ -97,26 +110,29 @@ class InclineRouterRead1(InclineRouter):
     Read 1
     """
 
-    def __init__(self, name: str = 'incline', region: str = 'us-west-2'):
-        self.init(name=name, region=region)
+    def __init__(self,
+                 name: str = 'incline',
+                 region: str = 'us-west-2',
+                 dbtype: str = 'dynamo'):
+        self.init(name=name, region=region, dbtype=dbtype)
 
     def default(self) -> None:
         # XXX FOR TESTING XXX
         self.route_read = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '1'),
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '1'),
         ]
         self.route_write = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '1'),
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '2')
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '1'),
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '2')
         ]
         self.route_search = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '1'),
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '2')
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '1'),
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '2')
         ]
 
 
@@ -127,24 +143,27 @@ class InclineRouterRead2(InclineRouter):
     Read 2
     """
 
-    def __init__(self, name: str = 'incline', region: str = 'us-west-2'):
-        self.init(name=name, region=region)
+    def __init__(self,
+                 name: str = 'incline',
+                 region: str = 'us-west-2',
+                 dbtype: str = 'dynamo'):
+        self.init(name=name, region=region, dbtype=dbtype)
 
     def default(self) -> None:
         # XXX FOR TESTING XXX
         self.route_read = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '2')
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '2')
         ]
         self.route_write = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '1'),
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '2')
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '1'),
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '2')
         ]
         self.route_search = [
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '1'),
-            'dynamo{0}{1}{2}{3}'.format(self.delimiter, self.region,
-                                        self.delimiter, self.name + '2')
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '1'),
+            '{0}{1}{2}{3}{4}'.format(self.dbtype, self.delimiter, self.region,
+                                     self.delimiter, self.name + '2')
         ]
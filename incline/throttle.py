@@ -0,0 +1,44 @@
+import threading
+import time
+from typing import Callable
+
+
+class InclineThrottle(object):
+    """
+    Token bucket rate limiter, safe to share between threads.
+
+    rate:  tokens per second, zero is unlimited
+    burst: bucket size, defaults to one second of tokens
+    """
+
+    def __init__(self,
+                 rate: float = 0.0,
+                 burst: float | None = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.last = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens, sleeping until they are available.  Returns the seconds
+        waited.
+        """
+        if not self.rate:
+            return 0.0
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # reserve now, callers queue behind each other's debt
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            self.sleep(wait)
+        return wait
@@ -0,0 +1,84 @@
+import unittest
+import logging
+from incline.router import InclineRouterTwo
+from memory import memory_client
+
+log = logging.getLogger('incline')
+log.setLevel(logging.INFO)
+
+TEST_TABLE = "test-incline-antientropy"
+TEST_REGION = "us-west-2"
+TEST_PREFIX = "test-InclineAntiEntropy"
+
+
+class TestInclineAntiEntropy(unittest.TestCase):
+    maxDiff = None
+
+    def test_repair(self) -> None:
+        name = f"{TEST_TABLE}-repair"
+        ramp = memory_client(name, InclineRouterTwo)
+        kids = [f"{TEST_PREFIX}-repair-{i}" for i in range(20)]
+        for kid in kids:
+            ramp.put(kid, {'value': 1})
+        ds1, ds2 = [ramp.ds_open(ds) for ds in ramp.rtr.write]
+
+        # key missing from the second replica
+        txn = ds2.only(ds2.ds_get_txn(kids[0]))
+        ds2.ds_delete_txn(kids[0], txn['tsv'])
+
+        # newer version written to the first replica only
+        one = memory_client(f"{name}1")
+        one.put(kids[1], {'value': 2})
+
+        entropy = ramp.anti_entropy()
+        stats = entropy.run()
+        self.assertEqual(stats.scanned, 2 * len(kids))
+        self.assertEqual(stats.divergent, 2)
+        self.assertEqual(stats.repaired, 2)
+        self.assertEqual(stats.errors, 0)
+        self.assertLess(stats.compared, 2**(entropy.depth + 1) - 1)
+        self.assertEqual({'value': 1}, ds2.get(kids[0])[0].dat)
+        self.assertEqual({'value': 2}, ds2.get(kids[1])[0].dat)
+
+        # replicas now agree
+        stats = entropy.run()
+        self.assertEqual(stats.divergent, 0)
+        self.assertEqual(stats.compared, 1)
+
+    def test_skew(self) -> None:
+        """ the newer pxn wins over a higher tsv from a skewed clock """
+        name = f"{TEST_TABLE}-skew"
+        kid = f"{TEST_PREFIX}-skew"
+        ramp = memory_client(name, InclineRouterTwo)
+        ramp.put(kid, {'value': 1})
+        ds1, ds2 = [ramp.ds_open(ds) for ds in ramp.rtr.write]
+        old = ds2.get(kid)[0]
+
+        # newer version on the first replica, the older version stamped
+        # later on the second
+        one = memory_client(f"{name}1")
+        one.put(kid, {'value': 2})
+        new = ds1.get(kid)[0]
+        old.tsv = new.tsv + 10
+        ds2.replicate(old)
+        self.assertGreater(new.pxn, old.pxn)
+
+        stats = ramp.anti_entropy().run()
+        self.assertEqual(stats.divergent, 1)
+        self.assertEqual(stats.repaired, 1)
+        self.assertEqual({'value': 2}, ds1.get(kid)[0].dat)
+        self.assertEqual({'value': 2}, ds2.get(kid)[0].dat)
+        self.assertEqual(new.pxn, ds2.get(kid)[0].pxn)
+        self.assertEqual(ramp.anti_entropy().run().divergent, 0)
+
+    def test_single(self) -> None:
+        name = f"{TEST_TABLE}-single"
+        ramp = memory_client(name)
+        ramp.put(f"{TEST_PREFIX}-single", {'value': 1})
+        stats = ramp.anti_entropy().run()
+        self.assertEqual(stats.scanned, 0)
+        self.assertEqual(stats.divergent, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
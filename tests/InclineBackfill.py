@@ -0,0 +1,134 @@
+import unittest
+import logging
+from incline.checkpoint import InclineCheckpoint
+from incline.InclineBackfill import InclineBackfill
+from incline.InclineDatastoreMemory import InclineDatastoreMemory
+from incline.InclineIndex import InclineIndex
+from memory import memory_client
+
+log = logging.getLogger('incline')
+log.setLevel(logging.INFO)
+
+TEST_TABLE = "test-incline-backfill"
+TEST_REGION = "us-west-2"
+TEST_PREFIX = "test-InclineBackfill"
+
+
+class TestInclineBackfill(unittest.TestCase):
+    maxDiff = None
+
+    def test_backfill(self) -> None:
+        name = f"{TEST_TABLE}-fill"
+        ramp = memory_client(name)
+        kids = [f"{TEST_PREFIX}-fill-{i}" for i in range(25)]
+        for i, kid in enumerate(kids):
+            ramp.put(kid, {'team': f"t{i % 2}", 'tags': ['a', f"b{i}"]})
+        ramp.put(kids[0], {'team': 't1', 'tags': ['c']})
+        ramp.delete(kids[1])
+
+        con = ramp.ds_open(ramp.rtr.write[0])
+        assert isinstance(con, InclineDatastoreMemory)
+        versions = sum(len(v) for v in con.txndb.values())
+        team = InclineIndex(name='team', path='team')
+        tags = InclineIndex(name='tags', path='tags', multi=True)
+        bulk = InclineBackfill(con, [team, tags], batch=4, segments=3)
+        stats = bulk.run()
+        self.assertEqual(stats.scanned, len(kids))
+        self.assertEqual(stats.updated, len(kids) - 1)
+        self.assertEqual(stats.deleted, 1)
+        self.assertEqual(stats.errors, 0)
+
+        # in place, no new versions
+        self.assertEqual(versions, sum(len(v) for v in con.txndb.values()))
+        latest = con.only(con.ds_get_txn(kids[0]))
+        self.assertEqual(latest['idx_team'], 't1')
+        self.assertEqual(latest['idm_tags'], ['c'])
+        self.assertEqual(
+            sorted(con.indexdb['tags']),
+            sorted([f"a\x1f{kid}" for kid in kids[2:]] +
+                   [f"b{i}\x1f{kid}"
+                    for i, kid in enumerate(kids)][2:] + [f"c\x1f{kids[0]}"]))
+        self.assertNotIn('idx_team', con.only(con.ds_get_txn(kids[1])))
+
+        # second run finds every version current
+        stats = bulk.run()
+        self.assertEqual(stats.updated, 0)
+        self.assertEqual(stats.current, len(kids) - 1)
+
+    def test_backfill_checkpoint(self) -> None:
+        name = f"{TEST_TABLE}-checkpoint"
+        ramp = memory_client(name)
+        kids = [f"{TEST_PREFIX}-checkpoint-{i}" for i in range(10)]
+        for kid in kids:
+            ramp.put(kid, {'team': 't'})
+        con = ramp.ds_open(ramp.rtr.write[0])
+        team = InclineIndex(name='team', path='team')
+        checkpoint = InclineCheckpoint()
+        # resumes after the scan position, keys are scanned in write order
+        checkpoint.save({
+            con.loc(): {
+                'segments': 1,
+                'indexes': ['team'],
+                'positions': {
+                    '0': kids[3]
+                }
+            }
+        })
+        bulk = InclineBackfill(con, [team],
+                               batch=3,
+                               segments=1,
+                               checkpoint=checkpoint)
+        stats = bulk.run()
+        self.assertEqual(stats.scanned, 6)
+        self.assertEqual(stats.updated, 6)
+        self.assertEqual(
+            checkpoint.load(), {
+                con.loc(): {
+                    'segments': 1,
+                    'indexes': ['team'],
+                    'positions': {
+                        '0': kids[-1]
+                    }
+                }
+            })
+
+    def test_backfill_checkpoint_segments(self) -> None:
+        name = f"{TEST_TABLE}-checkpoint-segments"
+        ramp = memory_client(name)
+        kids = [f"{TEST_PREFIX}-checkpoint-segments-{i}" for i in range(12)]
+        for kid in kids:
+            ramp.put(kid, {'team': 't'})
+        con = ramp.ds_open(ramp.rtr.write[0])
+        team = InclineIndex(name='team', path='team')
+        checkpoint = InclineCheckpoint()
+        bulk = InclineBackfill(con, [team],
+                               batch=2,
+                               segments=3,
+                               checkpoint=checkpoint)
+        self.assertEqual(bulk.run().scanned, len(kids))
+
+        # each segment saved its own position, the last key it scanned
+        state = checkpoint.load()
+        assert state
+        positions = state[con.loc()]['positions']
+        self.assertEqual(sorted(positions), ['0', '1', '2'])
+        for segment, position in positions.items():
+            self.assertEqual(position, [
+                k for k in kids if con.txn_segment(k, 3) == int(segment)
+            ][-1])
+        self.assertEqual(bulk.run().scanned, 0)
+
+    def test_backfill_client(self) -> None:
+        name = f"{TEST_TABLE}-client"
+        ramp = memory_client(name)
+        kid = f"{TEST_PREFIX}-client"
+        ramp.put(kid, {'team': 't'})
+        ramp.set_index(InclineIndex(name='team', path='team'))
+        stats = ramp.backfill(rate=1000)
+        self.assertEqual(stats.updated, 1)
+        con = ramp.ds_open(ramp.rtr.write[0])
+        self.assertEqual(con.only(con.ds_get_txn(kid))['idx_team'], 't')
+
+
+if __name__ == "__main__":
+    unittest.main()
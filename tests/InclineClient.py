@@ -1,12 +1,26 @@
 import unittest
 from decimal import Decimal
 import logging
+import queue
+import random
+import threading
+from typing import Any
 
 import incline.InclineClient
+from incline.codec import InclineCodec, INCLINE_CODEC_ZLIB
+from incline.InclineDatastoreMemory import InclineDatastoreMemory
+from incline.InclineDivergence import InclineDivergence
+from incline.InclineFilter import InclineFilter
+from incline.InclineIndex import InclineIndex, InclineIndexCondition
 from incline.InclinePrepare import InclinePxn
+from incline.InclineRecord import InclineRecord
+from incline.registry import incline_register, incline_unregister
+from incline.router import InclineRouterTwo
 from incline.InclineTraceConsole import InclineTraceConsole
 import incline.InclineTraceConsole
-from incline.error import InclineExists, InclineNotFound
+from incline.error import (InclineExists, InclineNotFound, InclineInterface,
+                           InclineDataError)
+from memory import memory_client
 
 log = logging.getLogger('incline')
 log.setLevel(logging.INFO)
@@ -16,6 +30,26 @@ TEST_REGION = "us-west-2"
 TEST_PREFIX = "test-InclineClient"
 
 
+class InclineDatastoreHedge(InclineDatastoreMemory):
+    """
+    Memory replica whose reads wait for gate, or fail
+    """
+    gate: threading.Event | None = None
+    fail: bool = False
+
+    def get(self,
+            kid: str,
+            tsv: Decimal | None = None,
+            pxn: InclinePxn | None = None,
+            limit: int = 1,
+            fields: list[str] | None = None) -> list[InclineRecord]:
+        if self.fail:
+            raise InclineDataError(f"{self.loc()} unavailable")
+        if self.gate:
+            self.gate.wait(timeout=10)
+        return super().get(kid, tsv=tsv, pxn=pxn, limit=limit, fields=fields)
+
+
 class TestInclineClient(unittest.TestCase):
     maxDiff = None
     ramp: incline.InclineClient.InclineClient
@@ -50,9 +84,6 @@ class TestInclineClient(unittest.TestCase):
     def test_puts(self) -> None:
         pass
 
-    def test_search(self) -> None:
-        pass
-
     def test_create(self) -> None:
         kid = f"{TEST_PREFIX}-create-{self.tsv}"
         dat = {'key': kid}
@@ -125,6 +156,85 @@ class TestInclineClient(unittest.TestCase):
     def test_getkey(self) -> None:
         pass
 
+    def test_getkey_verify(self) -> None:
+        kid = f"{TEST_PREFIX}-getkey-verify-{self.tsv}"
+        resp = self.ramp.create(kid, {'key': kid})
+        rec = self.ramp.getkey(
+            kid, policy=incline.InclineClient.INCLINE_READ_VERIFY)
+        self.assertEqual(resp.only.to_dict(), rec.to_dict())
+
+    def test_getkey_hedge(self) -> None:
+        kid = f"{TEST_PREFIX}-getkey-hedge-{self.tsv}"
+        resp = self.ramp.create(kid, {'key': kid})
+        rec = self.ramp.getkey(kid,
+                               policy=incline.InclineClient.INCLINE_READ_HEDGE)
+        self.assertEqual(resp.only.to_dict(), rec.to_dict())
+
+    def test_read_policy_invalid(self) -> None:
+        with self.assertRaises(InclineInterface):
+            incline.InclineClient.InclineClient(name=TEST_TABLE,
+                                                region=TEST_REGION,
+                                                read_policy='never')
+
+    def test_getkey_hedge_replicas(self) -> None:
+        name = f"{TEST_TABLE}-hedge"
+        hedge = incline.InclineClient.INCLINE_READ_HEDGE
+        incline_register('hedge', InclineDatastoreHedge)
+        try:
+            ramp = incline.InclineClient.InclineClient(name=name,
+                                                       region=TEST_REGION)
+            ramp.rtr = InclineRouterTwo(name=name,
+                                        region=TEST_REGION,
+                                        dbtype='hedge')
+            kid = f"{TEST_PREFIX}-getkey-hedge-replicas"
+            resp = ramp.put(kid, {'key': kid})
+            first, second = ramp.rtr.read
+            one, two = ramp.ds_open(first), ramp.ds_open(second)
+            assert isinstance(one, InclineDatastoreHedge)
+            assert isinstance(two, InclineDatastoreHedge)
+
+            def rank() -> None:
+                """ first replica ranks fastest """
+                ramp.latency = dict()
+                ramp.ds_latency(first).add(0.001)
+                ramp.ds_latency(second).add(0.002)
+
+            # failing replica moves on to the next
+            rank()
+            one.fail = True
+            self.assertEqual(ramp.getkey(kid, policy=hedge).pxn, resp.pxn)
+            one.fail = False
+
+            # replica missing the key moves on to the next
+            missing = f"{kid}-missing"
+            ramp.put(missing, {'key': missing})
+            one.ds_delete_txn(missing,
+                              one.only(one.ds_get_txn(missing))['tsv'])
+            rank()
+            self.assertEqual(
+                ramp.getkey(missing, policy=hedge).dat, {'key': missing})
+
+            # every replica failing or missing the key
+            two.fail = True
+            with self.assertRaises(InclineDataError):
+                ramp.getkey(missing, policy=hedge)
+            two.fail = False
+            with self.assertRaises(InclineNotFound):
+                ramp.getkey(f"{kid}-never", policy=hedge)
+
+            # slow replica is hedged after its p95, its read still waiting
+            rank()
+            one.gate = threading.Event()
+            try:
+                rec = ramp.getkey(kid, policy=hedge)
+                self.assertEqual(ramp.ds_latency(first).count, 1)
+                self.assertEqual(ramp.ds_latency(second).count, 2)
+            finally:
+                one.gate.set()
+            self.assertEqual(rec.pxn, resp.pxn)
+        finally:
+            incline_unregister('hedge')
+
     def test_getlog(self) -> None:
         pass
 
@@ -134,23 +244,517 @@ class TestInclineClient(unittest.TestCase):
     def test_genmet(self) -> None:
         pass
 
+    def test_genmet_writeset(self) -> None:
+        pxn = self.ramp.prepare.pxn()
+        location = f"dynamo|{TEST_REGION}|{TEST_TABLE}"
+        dat: list[dict[str, Any]] = [{
+            'kid': f"{TEST_PREFIX}-genmet-writeset-{i}",
+            'dat': {},
+            'datastores': [location]
+        } for i in range(self.ramp.writeset_min + 1)]
+        met = self.ramp.genmet([location], location, dat[0]['kid'], pxn, dat)
+        self.assertEqual(len(met.meta), 1)
+        self.assertTrue(met.meta[0].writeset)
+        self.assertEqual(met.meta[0].pxn, pxn)
+
+        writeset = self.ramp.genwriteset(pxn, dat)
+        self.assertEqual([m.kid for m in writeset.meta],
+                         [d['kid'] for d in dat])
+
+    def test_puts_writeset(self) -> None:
+        dat: list[dict[str, Any]] = [{
+            'kid': f"{TEST_PREFIX}-puts-writeset-{i}-{self.tsv}",
+            'dat': {
+                'value': i
+            }
+        } for i in range(self.ramp.writeset_min + 1)]
+        resp = self.ramp.puts(dat)
+        get = self.ramp.get([d['kid'] for d in dat])
+        self.assertEqual(resp.pxn, get.pxn)
+        for d in dat:
+            self.assertEqual(d['dat'], get.data[d['kid']].dat)
+
+    def test_puts_writeset_repair(self) -> None:
+        """
+        Round 2 repairs a write-set member whose commit is missing
+        """
+        ramp = memory_client(f"{TEST_TABLE}-writeset-repair")
+        kids = [
+            f"{TEST_PREFIX}-writeset-repair-{i}"
+            for i in range(ramp.writeset_min + 1)
+        ]
+        ramp.put(kids[0], {'value': -1})
+        resp = ramp.puts([{'kid': k, 'dat': {'value': i}}
+                          for i, k in enumerate(kids)])
+        # the batch commit of the first key is lost, its older version stays
+        con = ramp.ds_open(ramp.rtr.write[0])
+        txn = con.only(con.ds_get_txn(kids[0]))
+        con.ds_delete_txn(kids[0], txn['tsv'])
+        self.assertNotEqual(con.only(con.ds_get_txn(kids[0]))['pxn'],
+                            resp.pxn.pxn)
+
+        get = ramp.get(kids)
+        self.assertEqual(get.data[kids[0]].pxn, resp.pxn)
+        self.assertEqual(get.data[kids[0]].dat, {'value': 0})
+        self.assertEqual(get.pxn, resp.pxn)
+
+    def test_puts_reserved(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-reserved")
+        with self.assertRaises(InclineInterface):
+            ramp.put('~ws.reserved', {'value': 1})
+        with self.assertRaises(InclineInterface):
+            ramp.puts([{
+                'kid': f"{TEST_PREFIX}-reserved",
+                'dat': {}
+            }, {
+                'kid': '~ws.reserved',
+                'dat': {}
+            }])
+        # nothing of the batch was written
+        with self.assertRaises(InclineNotFound):
+            ramp.get(f"{TEST_PREFIX}-reserved")
+
     def test_cmpval(self) -> None:
         pass
 
+    def record(self, kid: str, tsv: Decimal, pxn: InclinePxn,
+               dat: Any) -> InclineRecord:
+        return InclineRecord(kid,
+                             record={
+                                 'kid': kid,
+                                 'tsv': tsv,
+                                 'pxn': pxn,
+                                 'dat': dat
+                             })
+
     def test_verify(self) -> None:
-        pass
+        kid = f"{TEST_PREFIX}-verify"
+        pxn = self.ramp.prepare.pxn()
+        a = self.record(kid, self.tsv, pxn, {'value': 1})
+        b = self.record(kid, self.tsv + 1, pxn, {'value': 1})
+        self.assertIs(b, self.ramp.verify([a, b]))
+
+    def test_verify_divergence(self) -> None:
+        divergences: queue.Queue[InclineDivergence] = queue.Queue()
+        ramp = incline.InclineClient.InclineClient(
+            name=TEST_TABLE,
+            region=TEST_REGION,
+            on_divergence=divergences.put_nowait)
+        kid = f"{TEST_PREFIX}-verify-divergence"
+        a = self.record(kid, self.tsv, ramp.prepare.pxn(), {'value': 1})
+        b = self.record(kid, self.tsv + 1, ramp.prepare.pxn(), {'value': 2})
+        # same content under another pxn has not diverged
+        c = self.record(kid, self.tsv, ramp.prepare.pxn(), {'value': 2})
+        self.assertIs(b, ramp.verify([a, b, c]))
+        divergence = divergences.get_nowait()
+        self.assertEqual(kid, divergence.kid)
+        self.assertIs(b, divergence.newest)
+        self.assertIs(a, divergence.other)
+        self.assertTrue(divergences.empty())
 
     def test_strval(self) -> None:
         pass
 
     def test_ds_find(self) -> None:
-        pass
+        location = f"dynamo|{TEST_REGION}|{TEST_TABLE}-find"
+        self.assertIsNone(self.ramp.ds_find(location))
+        con = self.ramp.ds_open(location)
+        self.assertIs(con, self.ramp.ds_find(location))
 
     def test_ds_equal(self) -> None:
-        pass
+        location = f"dynamo|{TEST_REGION}|{TEST_TABLE}-equal"
+        con = self.ramp.ds_open(location)
+        self.assertTrue(self.ramp.ds_equal(con, location))
+        self.assertFalse(
+            self.ramp.ds_equal(con, f"dynamo|{TEST_REGION}|{TEST_TABLE}"))
 
     def test_ds_open(self) -> None:
-        pass
+        location = f"dynamo|{TEST_REGION}|{TEST_TABLE}-open"
+        con = self.ramp.ds_open(location)
+        self.assertEqual(con.loc(), location)
+        self.assertIs(con, self.ramp.ds_open(location))
+
+    def test_ds_open_memory(self) -> None:
+        location = f"memory|{TEST_REGION}|{TEST_TABLE}-open"
+        con = self.ramp.ds_open(location)
+        self.assertIsInstance(con, InclineDatastoreMemory)
+        self.assertEqual(con.loc(), location)
+
+    def test_ds_open_unknown(self) -> None:
+        with self.assertRaises(InclineInterface):
+            self.ramp.ds_open(f"unknown|{TEST_REGION}|{TEST_TABLE}")
+
+    def test_ds_capable(self) -> None:
+        self.assertTrue(
+            self.ramp.ds_capable(f"memory|{TEST_REGION}|{TEST_TABLE}",
+                                 'batch_get'))
+        self.assertFalse(
+            self.ramp.ds_capable(f"dynamo|{TEST_REGION}|{TEST_TABLE}",
+                                 'batch_get'))
+
+    def test_feed(self) -> None:
+        feed = self.ramp.feed(f"memory|{TEST_REGION}|{TEST_TABLE}-feed")
+        self.assertEqual(feed.datastore.loc(),
+                         f"memory|{TEST_REGION}|{TEST_TABLE}-feed")
+        with self.assertRaises(InclineInterface):
+            self.ramp.feed(f"unknown|{TEST_REGION}|{TEST_TABLE}")
+
+    def test_getkeys_batch(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-batch")
+        dat: list[dict[str, Any]] = [{
+            'kid': f"{TEST_PREFIX}-getkeys-batch-{i}",
+            'dat': {
+                'value': i
+            }
+        } for i in range(3)]
+        resp = ramp.puts(dat)
+        keys = [d['kid'] for d in reversed(dat)]
+        get = ramp.get(keys)
+        self.assertEqual(resp.pxn, get.pxn)
+        self.assertEqual(keys, list(get.data.keys()))
+        for d in dat:
+            self.assertEqual(d['dat'], get.data[d['kid']].dat)
+        with self.assertRaises(InclineNotFound):
+            ramp.get(keys + [f"{TEST_PREFIX}-getkeys-batch-missing"])
+
+    def test_get_fields(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-fields")
+        kid = f"{TEST_PREFIX}-get-fields"
+        resp = ramp.puts([{
+            'kid': kid,
+            'dat': {
+                'value': 1
+            }
+        }, {
+            'kid': f"{kid}-other",
+            'dat': {
+                'value': 2
+            }
+        }])
+        get = ramp.get(kid, fields=['siz'])
+        rec = get.data[kid]
+        self.assertEqual(resp.pxn, rec.pxn)
+        self.assertIsNone(rec.dat)
+        self.assertGreater(rec.siz, 0)
+        self.assertEqual(resp.data[kid].dig, rec.dig)
+        # metadata is read for round 2
+        self.assertEqual([f"{kid}-other"], [m.kid for m in rec.met.meta])
+
+        history = ramp.history(kid, fields=[])
+        self.assertEqual({'value': 1}, history.data[str(rec.tsv)].dat)
+        history = ramp.history(kid, fields=['tsv'])
+        self.assertIsNone(history.data[str(rec.tsv)].dat)
+
+    def test_codec(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-codec")
+        kid = f"{TEST_PREFIX}-codec"
+        ramp.put(f"{kid}-before", {'value': 1})
+        ramp.set_codec(InclineCodec(threshold=64))
+        ramp.set_index(InclineIndex(name='codec', path='team.id'))
+        dat = {'team': {'id': 'codec'}, 'text': 'x' * 1000}
+        ramp.put(kid, dat)
+
+        con = ramp.ds_open(ramp.rtr.write[0])
+        assert isinstance(con, InclineDatastoreMemory)
+        txn = con.txndb[kid][max(con.txndb[kid])]
+        self.assertEqual(txn['cdc'], INCLINE_CODEC_ZLIB)
+        self.assertLess(len(txn['dat']), 1000)
+        # indexes read the encoded data
+        self.assertEqual(txn['idx_codec'], 'codec')
+
+        get = ramp.get([kid, f"{kid}-before"])
+        rec = get.data[kid]
+        self.assertEqual(rec.cdc, INCLINE_CODEC_ZLIB)
+        self.assertEqual(dat, rec.dat)
+        self.assertEqual(rec.cdc, '')
+        self.assertEqual({'value': 1}, get.data[f"{kid}-before"].dat)
+
+        # refresh keeps the stored encoding
+        resp = ramp.refresh(kid)
+        self.assertEqual(resp.data[kid].cdc, INCLINE_CODEC_ZLIB)
+        self.assertEqual(dat, resp.data[kid].dat)
+
+    def test_chunking(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-chunk")
+        ramp.set_chunking(threshold=1024, size=512)
+        ramp.set_index(InclineIndex(name='chunk', path='team.id'))
+        kid = f"{TEST_PREFIX}-chunk"
+        text = random.Random(1).randbytes(2000).hex()
+        dat = {'team': {'id': 'chunk'}, 'text': text, 'value': 1}
+        ramp.put(kid, dat)
+
+        con = ramp.ds_open(ramp.rtr.write[0])
+        assert isinstance(con, InclineDatastoreMemory)
+        txn = con.txndb[kid][max(con.txndb[kid])]
+        self.assertIsNone(txn['dat'])
+        self.assertEqual(len(txn['chk']), 8)
+        self.assertEqual(len(con.chunkdb), 8)
+        self.assertEqual(txn['idx_chunk'], 'chunk')
+
+        rec = ramp.get(kid).data[kid]
+        self.assertEqual(dat, rec.dat)
+        self.assertEqual(dat, con.only(con.get(kid, pxn=rec.pxn)).dat)
+
+        # unchanged chunks are not written again
+        chunks = set(con.chunkdb)
+        con.chunks_known.clear()
+        dat['value'] = 2
+        ramp.put(kid, dat)
+        txn = con.txndb[kid][max(con.txndb[kid])]
+        self.assertEqual(len(set(txn['chk']) - chunks), 1)
+        self.assertEqual(len(con.chunkdb), 9)
+        self.assertEqual(dat, ramp.get(kid).only.dat)
+
+        # small values stay in the item, refresh keeps the chunks
+        ramp.put(f"{kid}-small", {'value': 1})
+        self.assertNotIn(
+            'chk', con.txndb[f"{kid}-small"][max(con.txndb[f"{kid}-small"])])
+        resp = ramp.refresh(kid)
+        self.assertEqual(dat, resp.data[kid].dat)
+        self.assertEqual(len(con.chunkdb), 9)
+
+    def test_delta(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-delta")
+        ramp.set_delta(snapshot=4)
+        kid = f"{TEST_PREFIX}-delta"
+        dats = list()
+        for i in range(6):
+            dat: dict[str, Any] = {'text': 'x' * 1000, 'count': {'value': i}}
+            if i % 2:
+                dat['odd'] = True
+            dats.append(dat)
+            ramp.put(kid, dat)
+
+        con = ramp.ds_open(ramp.rtr.write[0])
+        assert isinstance(con, InclineDatastoreMemory)
+        tsvs = sorted(con.txndb[kid])
+        txns = [con.txndb[kid][t] for t in tsvs]
+        self.assertEqual([t.get('dep', 0) for t in txns], [0, 1, 2, 3, 0, 1])
+        self.assertEqual(txns[1]['dlt'], {
+            'sub': {
+                'count': {
+                    'set': {
+                        'value': 1
+                    }
+                }
+            },
+            'set': {
+                'odd': True
+            }
+        })
+        self.assertIsNone(txns[1]['dat'])
+        self.assertEqual(txns[4]['dat'], dats[4])
+
+        # rebuild every version without the cache
+        con.deltas.clear()
+        self.assertEqual(dats[3], con.only(con.get(kid, tsv=tsvs[3])).dat)
+        self.assertEqual(len(con.deltas), 4)
+        for i, tsv in enumerate(tsvs):
+            self.assertEqual(dats[i], ramp.history(kid, tsv=tsv).only.dat)
+        get = ramp.get(kid).only
+        self.assertEqual(dats[5], get.dat)
+        self.assertEqual(get.digest, txns[5]['dig'])
+
+        # deletes are snapshots
+        ramp.delete(kid)
+        self.assertNotIn('dlt', con.txndb[kid][max(con.txndb[kid])])
+
+    def test_get_as_of(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-asof")
+        con = ramp.ds_open(ramp.rtr.write[0])
+        assert isinstance(con, InclineDatastoreMemory)
+        keys = [f"{TEST_PREFIX}-asof-{i}" for i in range(4)]
+        ramp.puts([{'kid': k, 'dat': {'value': 0}} for k in keys[:3]])
+        before = con.pxn.now()
+        resp = ramp.puts([{'kid': k, 'dat': {'value': 1}} for k in keys[:2]])
+        ramp.delete(keys[2])
+        ramp.put(keys[3], {'value': 3})
+
+        get = ramp.get(keys[:3], as_of=before)
+        self.assertEqual({k: {
+            'value': 0
+        }
+                          for k in keys[:3]}, {
+                              k: v.dat
+                              for k, v in get.data.items()
+                          })
+        with self.assertRaises(InclineNotFound):
+            ramp.get(keys, as_of=before)
+
+        # a lost commit is repaired from the log
+        tsv = max(t for t, v in con.txndb[keys[1]].items()
+                  if v['pxn'] == resp.pxn.pxn)
+        del con.txndb[keys[1]][tsv]
+        now = con.pxn.now()
+        get = ramp.get(keys[:2], as_of=now)
+        self.assertEqual(resp.pxn, get.pxn)
+        self.assertEqual({'value': 1}, get.data[keys[1]].dat)
+
+        # one key per batch, repairs span batches and tombstones are left out
+        recs = list(ramp.snapshot(keys, as_of=now, batch=1))
+        self.assertEqual([keys[0], keys[1], keys[3]], [r.kid for r in recs])
+        self.assertEqual([1, 1, 3], [r.dat['value'] for r in recs])
+        recs = list(ramp.snapshot(keys, as_of=before, fields=['siz']))
+        self.assertEqual(keys[:3], [r.kid for r in recs])
+        self.assertIsNone(recs[0].dat)
+
+    def test_index_page(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-index", InclineRouterTwo)
+        ramp.set_index(InclineIndex(name='team', path='team', sort=['age']))
+        keys = [f"{TEST_PREFIX}-index-{i}" for i in range(7)]
+        for i, k in enumerate(keys):
+            ramp.put(k, {'team': 'page', 'age': i})
+
+        # copies in both datastores are returned once, in sort order
+        entries = ramp.index('team', 'page')
+        self.assertEqual(keys, [e['kid'] for e in entries])
+        pages = list()
+        token = None
+        while True:
+            page, token = ramp.index_page('team',
+                                          'page',
+                                          limit=3,
+                                          reverse=True,
+                                          token=token)
+            pages.append([e['kid'] for e in page])
+            if token is None:
+                break
+        self.assertEqual(keys[::-1], sum(pages, []))
+        self.assertTrue(all(len(p) <= 3 for p in pages))
+
+        cond = InclineIndexCondition('gte', 5)
+        self.assertEqual(
+            keys[5:],
+            [e['kid'] for e in ramp.index_iter('team', 'page', cond=cond)])
+        with self.assertRaises(InclineInterface):
+            ramp.index_page('team', 'page', limit=0)
+
+    def test_index_records(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-index-records", InclineRouterTwo)
+        ramp.set_index(InclineIndex(name='team', path='team'))
+        keys = [f"{TEST_PREFIX}-index-records-{i}" for i in range(3)]
+        for k in keys:
+            ramp.put(k, {'team': 'red'})
+        ramp.put(keys[1], {'team': 'blue'})
+        ramp.delete(keys[2])
+
+        # the GSI still holds the old versions, only current hits are kept
+        resp = ramp.index_records('team', 'red')
+        self.assertEqual([keys[0]], list(resp.data))
+        self.assertEqual({'team': 'red'}, resp.data[keys[0]].dat)
+        with self.assertRaises(InclineNotFound):
+            ramp.index_records('team', 'green')
+
+    def test_search(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-search", InclineRouterTwo)
+        keys = [f"{TEST_PREFIX}-search-{i}" for i in range(10)]
+        for i, k in enumerate(keys):
+            ramp.put(k, {'team': f"t{i % 2}", 'age': i + 0.5})
+        ramp.put(keys[0], {'team': 't1', 'age': 0.5})
+        ramp.delete(keys[2])
+
+        where = InclineFilter('eq', 'team', 't0') & InclineFilter(
+            'between', 'age', 2, 8)
+        found = [r.kid for r in ramp.search(where, batch=2)]
+        self.assertEqual([keys[4], keys[6]], sorted(found))
+        found = [r.kid for r in ramp.search(~InclineFilter('lt', 'age', 8.5))]
+        self.assertEqual(keys[8:], sorted(found))
+        self.assertEqual([], list(ramp.search(InclineFilter('eq', 'x', 1))))
+        with self.assertRaises(InclineInterface):
+            list(ramp.search(InclineFilter('like', 'team', 't')))
+
+    def test_search_index(self) -> None:
+        ramp = memory_client(f"{TEST_TABLE}-search-index", InclineRouterTwo)
+        ramp.set_index(InclineIndex(name='team', path='team'), complete=True)
+        keys = [f"{TEST_PREFIX}-search-index-{i}" for i in range(6)]
+        for i, k in enumerate(keys):
+            ramp.put(k, {'team': f"t{i % 2}", 'age': i})
+        ramp.put(keys[0], {'team': 't1', 'age': 0})
+
+        # the index holds the old version, the record no longer matches
+        found = [
+            r.kid for r in ramp.search(
+                InclineFilter('eq', 'team', 't0')
+                & InclineFilter('gt', 'age', 1))
+        ]
+        self.assertEqual([keys[2], keys[4]], sorted(found))
+
+    def test_search_index_backfill(self) -> None:
+        """ keys written before set_index are found until backfill """
+        ramp = memory_client(f"{TEST_TABLE}-search-backfill")
+        before = f"{TEST_PREFIX}-search-backfill-before"
+        after = f"{TEST_PREFIX}-search-backfill-after"
+        ramp.put(before, {'team': 't0'})
+        ramp.set_index(InclineIndex(name='team', path='team'))
+        ramp.put(after, {'team': 't0'})
+        where = InclineFilter('eq', 'team', 't0')
+
+        # the index misses the earlier key, search scans
+        self.assertEqual(
+            [after],
+            [e['kid'] for e in ramp.index_iter('team', 't0', fields=['pxn'])])
+        self.assertEqual([after, before],
+                         sorted(r.kid for r in ramp.search(where)))
+
+        # complete once backfilled, and answered from the index
+        ramp.backfill()
+        self.assertIn('team', ramp.indexes_complete)
+        self.assertEqual([after, before],
+                         sorted(r.kid for r in ramp.search(where)))
+
+    def test_commit_behind(self) -> None:
+        ramp = memory_client(
+            f"{TEST_TABLE}-behind",
+            commit_policy=incline.InclineClient.INCLINE_COMMIT_BEHIND)
+        kid = f"{TEST_PREFIX}-commit-behind"
+        resp = ramp.put(kid, {'value': 1})
+        self.assertTrue(ramp.flush())
+        get = ramp.get(kid)
+        self.assertEqual(resp.pxn, get.pxn)
+        self.assertEqual({'value': 1}, get.only.dat)
+
+        # create commits in line
+        resp = ramp.create(f"{kid}-create", {'value': 2})
+        self.assertEqual(resp.only.pxn, ramp.get(f"{kid}-create").pxn)
+        self.assertTrue(ramp.close())
+
+    def test_commit_behind_repair(self) -> None:
+        """
+        Readers repair from the log while a write-behind commit is queued
+        """
+        ramp = memory_client(f"{TEST_TABLE}-behind-repair")
+        keys = [f"{TEST_PREFIX}-commit-behind-repair-{i}" for i in range(2)]
+        ramp.puts([{'kid': k, 'dat': {'value': 0}} for k in keys])
+        committer = ramp.committer()
+        release = threading.Event()
+
+        def block() -> None:
+            release.wait()
+
+        # hold the workers so the next commit stays queued
+        for _ in range(committer.workers):
+            committer.submit(block)
+        dat: list[dict[str, Any]] = [{
+            'kid': k,
+            'dat': {
+                'value': 1
+            }
+        } for k in keys]
+        resp = ramp.putatomic(
+            dat, commit=incline.InclineClient.INCLINE_COMMIT_BEHIND)
+        ramp.ds_open(ramp.rtr.write[0]).commit(keys[0], resp.pxn)
+        get = ramp.get(keys)
+        self.assertEqual(resp.pxn, get.pxn)
+        for k in keys:
+            self.assertEqual({'value': 1}, get.data[k].dat)
+        release.set()
+        self.assertTrue(ramp.close())
+
+    def test_commit_policy_invalid(self) -> None:
+        with self.assertRaises(InclineInterface):
+            incline.InclineClient.InclineClient(name=TEST_TABLE,
+                                                region=TEST_REGION,
+                                                commit_policy='never')
 
     def test_putget_1(self) -> None:
         self.ramp.put(f"{TEST_PREFIX}-putget", dict(value=self.tsv))
@@ -0,0 +1,92 @@
+import unittest
+import functools
+import threading
+from incline.InclineCommitter import InclineCommitter
+from incline.error import InclineError, InclineDataError
+
+
+class TestInclineCommitter(unittest.TestCase):
+    maxDiff = None
+
+    def test_flush(self) -> None:
+        committer = InclineCommitter(name='test-flush', workers=2)
+        done: list[int] = list()
+        lock = threading.Lock()
+
+        def job(i: int) -> None:
+            with lock:
+                done.append(i)
+
+        for i in range(100):
+            committer.submit(functools.partial(job, i))
+        self.assertTrue(committer.flush())
+        self.assertEqual(sorted(done), list(range(100)))
+        self.assertTrue(committer.close())
+
+    def test_flush_error(self) -> None:
+        committer = InclineCommitter(name='test-flush-error', workers=1)
+
+        def fail() -> None:
+            raise InclineDataError('commit failed')
+
+        committer.submit(fail)
+        with self.assertRaises(InclineDataError):
+            committer.flush()
+        # errors are raised once
+        self.assertTrue(committer.flush())
+        committer.close()
+
+    def test_flush_timeout(self) -> None:
+        committer = InclineCommitter(name='test-flush-timeout', workers=1)
+        release = threading.Event()
+
+        def block() -> None:
+            release.wait()
+
+        committer.submit(block)
+        self.assertFalse(committer.flush(timeout=0.01))
+        release.set()
+        self.assertTrue(committer.close())
+
+    def test_backpressure(self) -> None:
+        committer = InclineCommitter(name='test-backpressure',
+                                     workers=1,
+                                     size=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def block() -> None:
+            started.set()
+            release.wait()
+
+        committer.submit(block)
+        started.wait()
+        # worker busy, one slot in the queue
+        committer.submit(lambda: None)
+        submitted = threading.Event()
+
+        def submit() -> None:
+            committer.submit(lambda: None)
+            submitted.set()
+
+        t = threading.Thread(target=submit)
+        t.start()
+        self.assertFalse(submitted.wait(timeout=0.05))
+        release.set()
+        self.assertTrue(submitted.wait(timeout=5))
+        t.join()
+        self.assertTrue(committer.close())
+
+    def test_close(self) -> None:
+        committer = InclineCommitter(name='test-close', workers=2)
+        self.assertTrue(committer.close())
+        self.assertTrue(committer.close())
+        with self.assertRaises(InclineError):
+            committer.submit(lambda: None)
+        for t in committer.threads:
+            t.join(timeout=5)
+            self.assertFalse(t.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,10 @@ from typing import Any, Type
 import uuid
 import incline.InclineDatastore
 import incline.InclineClient
+from incline.codec import incline_digest, incline_summary
+from incline.InclineDatastore import INCLINE_TXN_SUMMARY
+from incline.InclineIndex import (InclineIndex, incline_index_key,
+                                  incline_index_sortable)
 from incline.InclineMeta import InclineMeta
 from incline.InclinePrepare import InclinePxn
 from incline.InclineRecord import InclineRecord
@@ -32,7 +36,8 @@ class InclineDatastoreTest(incline.InclineDatastore.InclineDatastore):
 
     def ds_get_log(self,
                    kid: str,
-                   pxn: InclinePxn | None = None) -> list[dict[str, Any]]:
+                   pxn: InclinePxn | None = None,
+                   fields: list[str] | None = None) -> list[dict[str, Any]]:
         logs = self.store_log.get(kid)
         if not logs:
             return []
@@ -41,12 +46,13 @@ class InclineDatastoreTest(incline.InclineDatastore.InclineDatastore):
         log = logs.get(pxn.pxn)
         if not log:
             raise ValueError(f"{kid} {format(pxn)} not found")
-        return [log]
+        return [self.project(log, fields)]
 
     def ds_get_txn(self,
                    kid: str,
                    tsv: Decimal | None = None,
-                   limit: int = 1) -> list[dict[str, Any]]:
+                   limit: int = 1,
+                   fields: list[str] | None = None) -> list[dict[str, Any]]:
         txns = self.store_txn.get(kid)
         if not txns:
             return []
@@ -55,7 +61,7 @@ class InclineDatastoreTest(incline.InclineDatastore.InclineDatastore):
         txn = txns.get(tsv)
         if not txn:
             raise ValueError(f"{kid} {tsv} not found")
-        return [txn]
+        return [self.project(txn, fields)]
 
     def ds_prepare(self, kid: str, val: dict[str,
                                              Any]) -> list[dict[str, Any]]:
@@ -81,8 +87,8 @@ class InclineDatastoreTest(incline.InclineDatastore.InclineDatastore):
                     limit: int | None = None) -> list[dict[str, Any]]:
         logs = list()
         for k, v in self.store_log.items():
-            for p in v.keys():
-                logs.append({'kid': k, 'pxn': p})
+            for p, l in v.items():
+                logs.append({'kid': k, 'pxn': p, 'tsv': l.get('tsv')})
         return logs
 
     def ds_scan_txn(self,
@@ -91,8 +97,8 @@ class InclineDatastoreTest(incline.InclineDatastore.InclineDatastore):
                     limit: int | None = None) -> list[dict[str, Any]]:
         txns = list()
         for k, v in self.store_txn.items():
-            for t in v.keys():
-                txns.append({'kid': k, 'tsv': t})
+            for t, txn in v.items():
+                txns.append({'kid': k, 'pxn': txn.get('pxn'), 'tsv': t})
         return txns
 
     def ds_delete_log(self, kid: str, pxn: InclinePxn) -> None:
@@ -251,6 +257,7 @@ class TestDatastore(unittest.TestCase):
         self.assertEqual(p['uid'], self.ds.uid())
         self.assertIsInstance(p['tsv'], Decimal)
         self.assertGreater(self.ds.pxn.now(), p['tsv'])
+        self.assertEqual((p['dig'], p['siz']), incline_summary(dat))
 
     def fixture(self,
                 kid: str,
@@ -325,6 +332,103 @@ class TestDatastore(unittest.TestCase):
         self.assertGreater(resp['tmb'], 0)
         self.assertEqual(resp['dat'], {})
 
+    def test_ds_get_txn_summary(self) -> None:
+        kid = f"{TEST_PREFIX}-get-txn-summary"
+        dat = {'kid': kid, 'value': 1}
+        fix = self.ds.only(self.fixture(kid, dat))
+        self.assertEqual(fix.dig, incline_digest(dat))
+        self.assertEqual(fix.digest, incline_digest(dat))
+        self.assertGreater(fix.siz, 0)
+        txn = self.ds.only(self.ds.ds_get_txn(kid, fields=INCLINE_TXN_SUMMARY))
+        self.assertNotIn('dat', txn)
+        self.assertNotIn('met', txn)
+        self.assertEqual(txn['pxn'], fix.pxn.pxn)
+        self.assertEqual(txn['dig'], fix.dig)
+        self.assertEqual(txn['siz'], fix.siz)
+
+    def test_get_fields(self) -> None:
+        kid = f"{TEST_PREFIX}-get-fields"
+        fix = self.ds.only(self.fixture(kid, {'kid': kid}))
+        txn = self.ds.only(self.ds.get(kid, fields=['cid']))
+        self.assertEqual(txn.pxn, fix.pxn)
+        self.assertEqual(txn.cid, fix.cid)
+        self.assertIsNone(txn.dat)
+        log = self.ds.only(self.ds.get(kid, pxn=fix.pxn, fields=['dat']))
+        self.assertEqual(log.dat, {'kid': kid})
+        self.assertEqual(log.met, InclineMeta())
+
+    def test_ds_iter_log(self) -> None:
+        kid = f"{TEST_PREFIX}-iter-log"
+        fix = self.ds.only(self.fixture(kid, {'kid': kid}))
+        logs = [l for l in self.ds.ds_iter_log(kid=kid) if l['kid'] == kid]
+        self.assertIn(fix.pxn.pxn, [l['pxn'] for l in logs])
+        for l in logs:
+            self.assertIsInstance(l['tsv'], Decimal)
+
+    def test_get_batch(self) -> None:
+        kids = [f"{TEST_PREFIX}-get-batch-{i}" for i in range(2)]
+        deleted = f"{TEST_PREFIX}-get-batch-deleted"
+        missing = f"{TEST_PREFIX}-never-store-this"
+        for kid in kids:
+            self.fixture(kid, {'kid': kid})
+        self.fixture(deleted, None)
+        resp = self.ds.get_batch(kids + [deleted, missing])
+        self.assertEqual(list(resp.keys()), kids + [deleted, missing])
+        for kid in kids:
+            self.assertEqual(self.ds.only(resp[kid]).dat, {'kid': kid})
+        self.assertEqual(resp[deleted], [])
+        self.assertEqual(resp[missing], [])
+
+    def test_add_indexes_composite(self) -> None:
+        index = InclineIndex(name='team-age',
+                             path='team',
+                             sort=['age', 'name'])
+        tags = InclineIndex(name='tags', path='tags', multi=True)
+        self.ds.set_index(index)
+        self.ds.set_index(tags)
+        try:
+            val = self.ds.add_indexes({
+                'dat': {
+                    'team': 't1',
+                    'age': 30,
+                    'name': 'ann',
+                    'tags': ['b', 'a', 'b', 5]
+                }
+            })
+        finally:
+            self.ds.del_index(index)
+            self.ds.del_index(tags)
+        self.assertEqual(val['idx_team-age'], 't1')
+        self.assertEqual(val['ids_team-age'], incline_index_key(30, 'ann'))
+        self.assertEqual(val['idm_tags'],
+                         sorted(['a', 'b', incline_index_sortable(5)]))
+        self.assertNotIn('idx_tags', val)
+
+    def test_index_changes(self) -> None:
+        tags = InclineIndex(name='tags', path='tags', multi=True)
+        org = {'kid': 'k', 'tsv': Decimal(1), 'tmb': False, 'idm_tags': ['a']}
+        txn = {
+            'kid': 'k',
+            'tsv': Decimal(2),
+            'pxn': 'p',
+            'tmb': False,
+            'idm_tags': ['b']
+        }
+        self.ds.set_index(tags)
+        try:
+            puts, deletes = self.ds.index_changes(txn, org)
+            stale = self.ds.index_changes(org, txn)
+            gone = self.ds.index_changes(dict(txn, tsv=Decimal(3), tmb=True),
+                                         txn)
+        finally:
+            self.ds.del_index(tags)
+        self.assertEqual([p['ikey'] for p in puts], ['b\x1fk'])
+        self.assertEqual([(p['val'], p['kid'], p['tsv']) for p in puts],
+                         [('b', 'k', Decimal(2))])
+        self.assertEqual(deletes, [{'idx': 'tags', 'ikey': 'a\x1fk'}])
+        self.assertEqual(stale, ([], []))
+        self.assertEqual(gone, ([], [{'idx': 'tags', 'ikey': 'b\x1fk'}]))
+
     def test_prepare_commit_create(self) -> None:
         pass
 
@@ -1,8 +1,12 @@
 import unittest
+from incline.InclineClient import InclineClient
 from incline.InclineDatastoreDynamo import InclineDatastoreDynamo
 from incline.InclineTraceConsole import InclineTraceConsole
+from incline.router import InclineRouterOne
 from InclineDatastore import TestDatastore
+import json
 import logging
+import os
 from typing import Any
 import sys
 import botocore
@@ -29,6 +33,7 @@ class TestDatastoreDynamo(TestDatastore):
         """  ensure tests run on the correct datastore type """
         self.assertEqual(self.ds.dbtype, "dynamo")
 
+
 #    def ds_get_log(self, kid, pxn=None) -> None:
 #        pass
 #
@@ -65,6 +70,84 @@ class TestDatastoreDynamo(TestDatastore):
                              'ResourceInUseException')
 
 
+class TestDatastoreDynamoStub(unittest.TestCase):
+    """
+    DynamoDB datastore on the offline stand-in, for behaviour AWS only shows
+    at scale
+    """
+    maxDiff = None
+    dynamo_stub: Any
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # offline DynamoDB stand-in of the benchmarks
+        benchmarks = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  '..', 'benchmarks')
+        if benchmarks not in sys.path:
+            sys.path.append(benchmarks)
+        import dynamostub
+        cls.dynamo_stub = staticmethod(dynamostub.dynamo_stub)
+
+    def test_delta_chain_pages(self) -> None:
+        """ delta chains are read back across query pages """
+        name = f"{TEST_TABLE}-delta-pages"
+        kid = f"{TEST_PREFIX}-delta-pages"
+        with self.dynamo_stub() as tables:
+            ramp = InclineClient(name=name, region=TEST_REGION)
+            ramp.rtr = InclineRouterOne(name=name,
+                                        region=TEST_REGION,
+                                        dbtype='dynamo')
+            ramp.set_delta(snapshot=8)
+            for i in range(6):
+                ramp.put(kid, {'fill': 'x' * 1000, 'n': i})
+            con = ramp.ds_open(ramp.rtr.write[0])
+            assert isinstance(con, InclineDatastoreDynamo)
+            latest = con.only(con.ds_get_txn(kid))
+            self.assertEqual(latest['dep'], 5)
+
+            # a page holds one version, the chain spans five
+            tables[con.txnname].page_bytes = 1
+            con.deltas.clear()
+            self.assertEqual(
+                ramp.get(kid).only.dat, {
+                    'fill': 'x' * 1000,
+                    'n': 5
+                })
+            versions = con.ds_get_txn_asof(kid, latest['tsv'], limit=3)
+            self.assertEqual(
+                [v['tsv'] for v in versions],
+                [latest['tsv'], latest['org'], versions[1]['org']])
+
+    def test_scan_position(self) -> None:
+        """ scans resume after the LastEvaluatedKey of a page """
+        name = f"{TEST_TABLE}-scan-position"
+        with self.dynamo_stub():
+            ramp = InclineClient(name=name, region=TEST_REGION)
+            ramp.rtr = InclineRouterOne(name=name,
+                                        region=TEST_REGION,
+                                        dbtype='dynamo')
+            ramp.puts([{
+                'kid': f"{TEST_PREFIX}-scan-position-{i}",
+                'dat': {
+                    'n': i
+                }
+            } for i in range(150)])
+            con = ramp.ds_open(ramp.rtr.write[0])
+            txns = list(con.ds_iter_txn())
+            self.assertEqual(len(txns), 150)
+
+            # one position, on the last txn of the first page
+            positions = [i for i, t in enumerate(txns) if 'pos' in t]
+            self.assertEqual(len(positions), 1)
+            pos = txns[positions[0]]['pos']
+            self.assertEqual(pos['kid'], txns[positions[0]]['kid'])
+
+            # as a checkpoint file holds it
+            start = json.loads(json.dumps(pos, default=str))
+            self.assertEqual([t['kid'] for t in con.ds_iter_txn(start=start)],
+                             [t['kid'] for t in txns[positions[0] + 1:]])
+
+
 #    def test_ds_setup(self) -> None:
 #        pass
 #
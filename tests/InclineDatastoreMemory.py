@@ -2,6 +2,8 @@ import unittest
 import logging
 from typing import Any
 from incline.InclineDatastoreMemory import InclineDatastoreMemory
+from incline.InclineFilter import InclineFilter
+from incline.InclineIndex import InclineIndex, InclineIndexCondition
 from incline.InclineTraceConsole import InclineTraceConsole
 #import InclineDatastore
 from InclineDatastore import TestDatastore
@@ -28,6 +30,131 @@ class TestDatastoreMemory(TestDatastore):
         """  ensure tests run on the correct datastore type """
         self.assertEqual(self.ds.dbtype, "memory")
 
+    def test_index_table(self) -> None:
+        kid = f"{TEST_PREFIX}-index-table"
+        ds = self.ds
+        assert isinstance(ds, InclineDatastoreMemory)
+        tags = InclineIndex(name='memory-tags', path='tags', multi=True)
+        ds.set_index(tags)
+        try:
+            self.fixture(kid, {'tags': ['a', 'b']})
+            self.assertEqual(sorted(ds.indexdb['memory-tags']),
+                             [f"a\x1f{kid}", f"b\x1f{kid}"])
+            self.fixture(kid, {'tags': ['b', 'c']})
+            self.assertEqual(sorted(ds.indexdb['memory-tags']),
+                             [f"b\x1f{kid}", f"c\x1f{kid}"])
+            self.fixture(kid, None)
+            self.assertEqual(ds.indexdb['memory-tags'], {})
+        finally:
+            ds.del_index(tags)
+
+    def test_index_query(self) -> None:
+        kids = [f"{TEST_PREFIX}-index-query-{i}" for i in range(5)]
+        team = InclineIndex(name='memory-team', path='team', sort=['age'])
+        self.ds.set_index(team)
+        try:
+            for i, kid in enumerate(kids):
+                self.fixture(kid, {'team': 'query', 'age': 10 - i})
+            entries = self.ds.ds_get_idx('memory-team', 'query')
+            self.assertEqual([e['kid'] for e in entries], kids[::-1])
+            self.assertNotIn('idk', entries[0])
+
+            cond = InclineIndexCondition('between', 7, 9)
+            page, start = self.ds.ds_query_idx('memory-team',
+                                               'query',
+                                               cond=cond,
+                                               limit=2,
+                                               reverse=True)
+            self.assertEqual([e['kid'] for e in page], kids[1:3])
+            self.assertIsNotNone(start)
+            page, start = self.ds.ds_query_idx('memory-team',
+                                               'query',
+                                               cond=cond,
+                                               limit=2,
+                                               reverse=True,
+                                               start=start)
+            self.assertEqual([e['kid'] for e in page], kids[3:4])
+            self.assertIsNone(start)
+
+            # a new version is indexed, the old stays as a GSI keeps it
+            self.fixture(kids[0], {'team': 'query', 'age': 0})
+            entries = self.ds.ds_get_idx('memory-team',
+                                         'query',
+                                         cond=InclineIndexCondition('lt', 6))
+            self.assertEqual([e['kid'] for e in entries], [kids[0]])
+            txn = self.ds.only(self.ds.ds_get_txn(kids[0]))
+            self.ds.ds_delete_txn(kids[0], txn['tsv'])
+            entries = self.ds.ds_get_idx('memory-team',
+                                         'query',
+                                         cond=InclineIndexCondition('lt', 6))
+            self.assertEqual(entries, [])
+        finally:
+            self.ds.del_index(team)
+
+    def test_search_txn(self) -> None:
+        kids = [f"{TEST_PREFIX}-search-{i}" for i in range(4)]
+        for i, kid in enumerate(kids):
+            self.fixture(kid, {'search': {'n': i}})
+        self.fixture(kids[0], {'search': {'n': 9}})
+        self.fixture(kids[1], None)
+        where = InclineFilter('lt', 'search.n', 3)
+        found = self.ds.ds_search_txn(where)
+        # latest versions only, no tombstones
+        self.assertEqual(sorted(t['kid'] for t in found), kids[2:3])
+        found = self.ds.ds_search_txn(InclineFilter('exists', 'search'),
+                                      segment=0,
+                                      segments=1)
+        self.assertEqual(sorted(t['kid'] for t in found),
+                         [kids[0], kids[2], kids[3]])
+
+    def test_changes(self) -> None:
+        kid = f"{TEST_PREFIX}-changes"
+        ds = self.ds
+        assert isinstance(ds, InclineDatastoreMemory)
+        position = None
+        for position, _ in ds.ds_iter_changes():
+            pass
+        published: list[tuple[int, str]] = list()
+        unsubscribe = ds.ds_subscribe(lambda seq, txn: published.append(
+            (seq, txn['dat']['n'])))
+        self.fixture(kid, {'n': 1})
+        self.fixture(kid, {'n': 2})
+        unsubscribe()
+        self.fixture(kid, {'n': 3})
+        changes = [(seq, txn['dat']['n'])
+                   for seq, txn in ds.ds_iter_changes(position)]
+        self.assertEqual([n for _, n in changes], [1, 2, 3])
+        self.assertEqual(published, changes[:2])
+        self.assertEqual(list(ds.ds_iter_changes(changes[-1][0])), [])
+
+    def test_index_query_multi(self) -> None:
+        kids = [f"{TEST_PREFIX}-index-multi-{i}" for i in range(3)]
+        tags = InclineIndex(name='memory-multi', path='tags', multi=True)
+        self.ds.set_index(tags)
+        try:
+            for i, kid in enumerate(kids):
+                self.fixture(kid, {'tags': ['all', f"tag{i}"]})
+            entries = self.ds.ds_get_idx('memory-multi', 'all')
+            self.assertEqual([e['kid'] for e in entries], kids)
+            entries = self.ds.ds_get_idx('memory-multi',
+                                         None,
+                                         cond=InclineIndexCondition(
+                                             'begins_with', 'tag'))
+            self.assertEqual([e['kid'] for e in entries], kids)
+            page, start = self.ds.ds_query_idx('memory-multi', 'all', limit=2)
+            self.assertEqual([e['kid'] for e in page], kids[:2])
+            page, start = self.ds.ds_query_idx('memory-multi',
+                                               'all',
+                                               limit=2,
+                                               start=start)
+            self.assertEqual([e['kid'] for e in page], kids[2:])
+            self.assertIsNone(start)
+            self.fixture(kids[1], {'tags': ['tag1']})
+            entries = self.ds.ds_get_idx('memory-multi', 'all')
+            self.assertEqual([e['kid'] for e in entries], [kids[0], kids[2]])
+        finally:
+            self.ds.del_index(tags)
+
 
 if __name__ == "__main__":
     unittest.main()
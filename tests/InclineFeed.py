@@ -0,0 +1,113 @@
+import unittest
+import logging
+from incline.checkpoint import InclineCheckpoint
+from incline.InclineDatastoreMemory import InclineDatastoreMemory
+from incline.InclineFeed import InclineFeed, InclineChange
+from incline.InclineMeta import InclineMeta, InclineMetaWrite
+from incline.InclinePrepare import InclinePrepare, InclinePxn
+
+log = logging.getLogger('incline')
+log.setLevel(logging.INFO)
+
+TEST_TABLE = "test-incline-feed"
+TEST_REGION = "us-west-2"
+TEST_PREFIX = "test-InclineFeed"
+
+
+class TestInclineFeed(unittest.TestCase):
+    maxDiff = None
+
+    def setUp(self) -> None:
+        self.prep = InclinePrepare()
+
+    def prepare(self, ds: InclineDatastoreMemory, kids: list[str],
+                n: int) -> InclinePxn:
+        """
+        Prepare a transaction writing kids, committed by the test
+        """
+        pxn = self.prep.pxn()
+        for kid in kids:
+            met = InclineMeta()
+            for other in kids:
+                if other != kid:
+                    met.add_write(InclineMetaWrite(other, ds.loc(), pxn))
+            ds.prepare(kid, pxn, met, {'n': n})
+        return pxn
+
+    def read(self, feed: InclineFeed) -> list[InclineChange]:
+        return [c for batch in feed.changes() for c in batch]
+
+    def summary(self, changes: list[InclineChange]) -> list[list[str]]:
+        return [[r.kid for r in c.records] for c in changes]
+
+    def interleave(self,
+                   name: str) -> tuple[InclineDatastoreMemory, list[str]]:
+        """
+        Transaction a on x and y, with b on z and c on x committed between
+        its writes
+        """
+        ds = InclineDatastoreMemory(name=f"{TEST_TABLE}-{name}",
+                                    region=TEST_REGION)
+        x, y, z = [f"{TEST_PREFIX}-{name}-{k}" for k in 'xyz']
+        a = self.prepare(ds, [x, y], 1)
+        ds.commit(x, a)
+        ds.commit(z, self.prepare(ds, [z], 2))
+        ds.commit(x, self.prepare(ds, [x], 3))
+        ds.commit(y, a)
+        return ds, [x, y, z]
+
+    def test_group(self) -> None:
+        ds, (x, y, z) = self.interleave('group')
+        changes = self.read(InclineFeed(ds, batch=1))
+        # z is emitted first, the later write to x waits for the transaction
+        self.assertEqual(self.summary(changes), [[z], [x, y], [x]])
+        self.assertEqual([c.records[0].dat['n'] for c in changes], [2, 1, 3])
+        self.assertTrue(all(c.complete for c in changes))
+        self.assertEqual(changes[1].pxn.pxn, changes[1].records[1].pxn.pxn)
+
+    def test_fields(self) -> None:
+        ds, (x, y, z) = self.interleave('fields')
+        changes = self.read(InclineFeed(ds, fields=['met']))
+        # read in one batch, emitted in order of first write
+        self.assertEqual(self.summary(changes), [[x, y], [z], [x]])
+        self.assertIsNone(changes[0].records[0].dat)
+
+    def test_checkpoint(self) -> None:
+        ds, (x, y, z) = self.interleave('checkpoint')
+        checkpoint = InclineCheckpoint()
+        feed = InclineFeed(ds, batch=1, checkpoint=checkpoint)
+        changes = feed.changes()
+        first = next(changes)
+        self.assertEqual(self.summary(first), [[z]])
+        # z applied, a is still in part
+        next(changes)
+        state = checkpoint.load()
+        assert state
+        self.assertIsNone(state[ds.loc()]['position'])
+        self.assertEqual(state[ds.loc()]['emitted'], {first[0].pxn.pxn: [z]})
+
+        # restart reads a again, not z
+        resumed = self.read(InclineFeed(ds, batch=1, checkpoint=checkpoint))
+        self.assertEqual(self.summary(resumed), [[x, y], [x]])
+        self.assertEqual(
+            self.read(InclineFeed(ds, batch=1, checkpoint=checkpoint)), [])
+
+        ds.commit(z, self.prepare(ds, [z], 4))
+        resumed = self.read(InclineFeed(ds, checkpoint=checkpoint))
+        self.assertEqual(self.summary(resumed), [[z]])
+
+    def test_incomplete(self) -> None:
+        ds = InclineDatastoreMemory(name=f"{TEST_TABLE}-incomplete",
+                                    region=TEST_REGION)
+        x, y = [f"{TEST_PREFIX}-incomplete-{k}" for k in 'xy']
+        ds.commit(x, self.prepare(ds, [x, y], 1))
+        for i in range(3):
+            ds.commit(f"{x}-{i}", self.prepare(ds, [f"{x}-{i}"], 2))
+        changes = self.read(InclineFeed(ds, batch=1, pending=2))
+        self.assertEqual([c.complete for c in changes],
+                         [True, False, True, True])
+        self.assertEqual(self.summary(changes)[1], [x])
+
+
+if __name__ == "__main__":
+    unittest.main()
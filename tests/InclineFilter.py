@@ -0,0 +1,79 @@
+import unittest
+from decimal import Decimal
+from incline.InclineFilter import (InclineFilter, incline_filter_compile,
+                                   incline_filter_equals)
+from incline.error import InclineInterface
+
+DAT = {
+    'team': {
+        'id': 't1',
+        'size': Decimal('4.5')
+    },
+    'name': 'red',
+    'tags': ['a', 'b'],
+    'none': None
+}
+
+
+class TestInclineFilter(unittest.TestCase):
+    maxDiff = None
+
+    def match(self, where: InclineFilter) -> bool:
+        return incline_filter_compile(where)(DAT)
+
+    def test_compare(self) -> None:
+        self.assertTrue(self.match(InclineFilter('eq', 'team.id', 't1')))
+        self.assertTrue(self.match(InclineFilter('ne', 'team.id', 't2')))
+        self.assertTrue(self.match(InclineFilter('eq', 'team.size', 4.5)))
+        self.assertTrue(self.match(InclineFilter('lt', 'team.size', 5)))
+        self.assertTrue(self.match(InclineFilter('lte', 'team.size', 4.5)))
+        self.assertFalse(self.match(InclineFilter('gt', 'team.size', 4.5)))
+        self.assertTrue(self.match(InclineFilter('gte', 'team.size', 4)))
+        self.assertTrue(self.match(InclineFilter('between', 'team.size', 4,
+                                                 5)))
+        self.assertTrue(self.match(InclineFilter('begins_with', 'name', 're')))
+        self.assertTrue(self.match(InclineFilter('in', 'name', ['red', 'x'])))
+        self.assertTrue(self.match(InclineFilter('eq', 'tags', ['a', 'b'])))
+
+    def test_missing(self) -> None:
+        self.assertTrue(self.match(InclineFilter('exists', 'none')))
+        self.assertFalse(self.match(InclineFilter('exists', 'team.x')))
+        self.assertFalse(self.match(InclineFilter('ne', 'team.x', 1)))
+        self.assertFalse(self.match(InclineFilter('eq', 'name.x', 'red')))
+        # mismatched types compare false
+        self.assertFalse(self.match(InclineFilter('lt', 'name', 1)))
+
+    def test_logical(self) -> None:
+        red = InclineFilter('eq', 'name', 'red')
+        blue = InclineFilter('eq', 'name', 'blue')
+        self.assertTrue(self.match(red | blue))
+        self.assertFalse(self.match(red & blue))
+        self.assertTrue(self.match(~blue))
+        self.assertTrue(self.match(~InclineFilter('lt', 'name', 1)))
+
+    def test_invalid(self) -> None:
+        for where in [
+                InclineFilter('like', 'name', 'r'),
+                InclineFilter('eq'),
+                InclineFilter('and'),
+                InclineFilter('not',
+                              filters=[InclineFilter('eq', 'a', 1)] * 2),
+                InclineFilter('in', 'name', 'red'),
+                InclineFilter('begins_with', 'name', 1),
+        ]:
+            with self.assertRaises(InclineInterface):
+                incline_filter_compile(where)
+
+    def test_equals(self) -> None:
+        where = (InclineFilter('eq', 'a', 1.5) & InclineFilter('gt', 'b', 1)
+                 & InclineFilter('eq', 'c', 'x'))
+        self.assertEqual(incline_filter_equals(where), {
+            'a': Decimal('1.5'),
+            'c': 'x'
+        })
+        where = InclineFilter('eq', 'a', 1) | InclineFilter('eq', 'c', 'x')
+        self.assertEqual(incline_filter_equals(where), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from decimal import Decimal
+from incline.InclineIndex import (InclineIndexCondition,
+                                  incline_index_sortable, incline_index_key,
+                                  incline_index_range, incline_index_token,
+                                  incline_index_state)
+from incline.error import InclineInterface
+
+
+class TestInclineIndex(unittest.TestCase):
+    maxDiff = None
+
+    def test_sortable_numbers(self) -> None:
+        values = [
+            -100, -10.5, -10, -1, 0, 0.25, 1, 9, 10,
+            Decimal('10.5'), 100
+        ]
+        keys = [incline_index_sortable(v) for v in values]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_sortable_string(self) -> None:
+        self.assertEqual(incline_index_sortable('abc'), 'abc')
+
+    def test_key_composite(self) -> None:
+        keys = [
+            incline_index_key(1, 'b'),
+            incline_index_key(1, 'ba'),
+            incline_index_key(2, 'a'),
+            incline_index_key(10, 'a'),
+        ]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_range_eq(self) -> None:
+        op, vals = incline_index_range(InclineIndexCondition('eq', [1, 'b']))
+        self.assertEqual(op, 'between')
+        self.assertLess(vals[0], incline_index_key(1, 'b', 'kid'))
+        self.assertGreater(vals[1], incline_index_key(1, 'b', 'kid'))
+        self.assertLess(vals[1], incline_index_key(1, 'ba'))
+
+    def test_range_gt(self) -> None:
+        op, vals = incline_index_range(InclineIndexCondition('gt', 1))
+        self.assertEqual(op, '>=')
+        self.assertGreater(vals[0], incline_index_key(1, 'z'))
+        self.assertLess(vals[0], incline_index_key(2))
+
+    def test_range_begins_with(self) -> None:
+        op, vals = incline_index_range(
+            InclineIndexCondition('begins_with', ['a']))
+        self.assertEqual(op, 'begins_with')
+        self.assertTrue(incline_index_key('a', 1).startswith(vals[0]))
+        self.assertFalse(incline_index_key('ab', 1).startswith(vals[0]))
+
+    def test_range_unknown(self) -> None:
+        with self.assertRaises(InclineInterface):
+            incline_index_range(InclineIndexCondition('ne', 1))
+
+    def test_token(self) -> None:
+        state = {
+            'pos': {
+                'dynamo|us-west-2|one': {
+                    'kid': 'a',
+                    'tsv': Decimal('1.5')
+                },
+                'dynamo|us-west-2|two': None
+            },
+            'seen': [['a', 'pxn']]
+        }
+        token = incline_index_token(state)
+        self.assertIsInstance(token, str)
+        self.assertEqual(incline_index_state(token), state)
+
+    def test_token_invalid(self) -> None:
+        for token in ['not a token',
+                      incline_index_token([])]:    # type: ignore
+            with self.assertRaises(InclineInterface):
+                incline_index_state(token)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import math
+from incline.InclineLatency import InclineLatency, INCLINE_LATENCY_MIN
+
+
+class TestInclineLatency(unittest.TestCase):
+    maxDiff = None
+
+    def test_empty(self) -> None:
+        lat = InclineLatency()
+        self.assertEqual(lat.count, 0)
+        self.assertEqual(lat.p95, math.inf)
+
+    def test_first_sample(self) -> None:
+        lat = InclineLatency()
+        lat.add(0.5)
+        self.assertEqual(lat.mean, 0.5)
+        self.assertEqual(lat.var, 0.0)
+        self.assertEqual(lat.p95, 0.5)
+
+    def test_ewma(self) -> None:
+        lat = InclineLatency(alpha=0.5)
+        lat.add(1.0)
+        lat.add(2.0)
+        self.assertEqual(lat.mean, 1.5)
+        self.assertGreater(lat.var, 0)
+        self.assertGreater(lat.p95, lat.mean)
+
+    def test_p95_floor(self) -> None:
+        lat = InclineLatency()
+        lat.add(0.0)
+        self.assertEqual(lat.p95, INCLINE_LATENCY_MIN)
+
+    def test_rank(self) -> None:
+        slow = InclineLatency()
+        slow.add(0.2)
+        fast = InclineLatency()
+        fast.add(0.1)
+        unknown = InclineLatency()
+        ranked = sorted([slow, fast, unknown], key=lambda l: l.rank())
+        self.assertIs(ranked[0], unknown)
+        self.assertIs(ranked[1], fast)
+        self.assertIs(ranked[2], slow)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from incline.InclineLocation import InclineLocation, incline_location
+from incline.InclineDatastore import incline_resolve
+from incline.error import InclineInterface
+
+
+class TestInclineLocation(unittest.TestCase):
+    maxDiff = None
+
+    def test_location(self) -> None:
+        loc = incline_location('dynamo|us-west-2|test')
+        self.assertEqual(loc.dbtype, 'dynamo')
+        self.assertEqual(loc.region, 'us-west-2')
+        self.assertEqual(loc.name, 'test')
+        self.assertEqual(loc.loc, 'dynamo|us-west-2|test')
+        self.assertEqual(str(loc), loc.loc)
+        self.assertEqual(format(loc), loc.loc)
+
+    def test_location_cached(self) -> None:
+        loc1 = incline_location('dynamo|us-west-2|cached')
+        loc2 = incline_location('dynamo|us-west-2|cached')
+        self.assertIs(loc1, loc2)
+
+    def test_location_hashable(self) -> None:
+        loc1 = InclineLocation('dynamo', 'us-west-2', 'hash')
+        loc2 = incline_location('dynamo|us-west-2|hash')
+        self.assertEqual(loc1, loc2)
+        self.assertEqual({loc1: True}[loc2], True)
+
+    def test_location_delimiter(self) -> None:
+        loc = incline_location('memory/us-west-2/test', delimiter='/')
+        self.assertEqual(loc.name, 'test')
+        self.assertEqual(loc.loc, 'memory/us-west-2/test')
+        self.assertEqual(loc, InclineLocation('memory', 'us-west-2', 'test'))
+
+    def test_location_invalid(self) -> None:
+        with self.assertRaises(InclineInterface):
+            incline_location('dynamo|us-west-2')
+        with self.assertRaises(InclineInterface):
+            incline_location('dynamo|us-west-2|test|extra')
+
+    def test_resolve(self) -> None:
+        self.assertEqual(incline_resolve('dynamo|us-west-2|test'), {
+            'dbtype': 'dynamo',
+            'region': 'us-west-2',
+            'name': 'test'
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
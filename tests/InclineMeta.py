@@ -1,5 +1,6 @@
 import unittest
-from incline.InclineMeta import InclineMeta, InclineMetaWrite
+from incline.InclineMeta import (InclineMeta, InclineMetaWrite,
+                                 incline_writeset_kid)
 from incline.InclinePrepare import InclinePxn
 
 
@@ -43,3 +44,14 @@ class TestInclineMeta(unittest.TestCase):
             'loc': '2',
             'pxn': '000000003.00000000000'
         })
+
+    def test_writeset_kid(self) -> None:
+        kid = incline_writeset_kid(InclinePxn(cid=3))
+        self.assertEqual(kid, '~ws.000000003.00000000000')
+
+    def test_metawrite_writeset(self) -> None:
+        pxn = InclinePxn(cid=3)
+        write = InclineMetaWrite(incline_writeset_kid(pxn), "2", pxn)
+        self.assertTrue(write.writeset)
+        write = InclineMetaWrite("1", "2", pxn)
+        self.assertFalse(write.writeset)
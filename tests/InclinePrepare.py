@@ -60,6 +60,23 @@ class TestInclinePrepare(unittest.TestCase):
         self.assertEqual(p2.cid, 190070690681122)
         self.assertEqual(p2.cnt, 0)
 
+    def test_pxn_cached(self) -> None:
+        p = incline.InclinePrepare.InclinePxn(cid=0)
+        self.assertEqual(p.pxn, "000000000.00000000000")
+        p.cnt = 1
+        self.assertEqual(p.pxn, "000000000.00000000001")
+        p.cid = 1
+        self.assertEqual(p.pxn, "000000001.00000000001")
+        p.loads("000000002.00000000003")
+        self.assertEqual(p.pxn, "000000002.00000000003")
+        self.assertEqual(p, incline.InclinePrepare.InclinePxn(cid=2, cnt=3))
+
+    def test_pxn_loads_unpadded(self) -> None:
+        p = incline.InclinePrepare.InclinePxn().loads("2.3")
+        self.assertEqual(p.cid, 2)
+        self.assertEqual(p.cnt, 3)
+        self.assertEqual(p.pxn, "000000002.00000000003")
+
     def test_cid(self) -> None:
         self.assertEqual(pxn.cid(), base_encode(uuid.getnode()).rjust(9, '0'))
 
@@ -96,6 +113,38 @@ class TestInclinePrepare(unittest.TestCase):
         now3 = Decimal(time.time_ns()) / 1000000000
         self.assertGreater(now3, now)
 
+    def test_now_us(self) -> None:
+        now = pxn.now_us()
+        now2 = pxn.now_us()
+        self.assertIsInstance(now, int)
+        self.assertGreater(now2, now)
+        self.assertGreater(time.time_ns() // 1000 + 1, now)
+
+    def test_now_quantized(self) -> None:
+        (s, d, e) = pxn.now().as_tuple()
+        self.assertEqual(e, -6)
+
+    def test_now_monotonic(self) -> None:
+        """ faster than the clock still increases by a microsecond """
+        p = incline.InclinePrepare.InclinePrepare()
+        stamps = [p.now_us() for i in range(1000)]
+        self.assertEqual(len(stamps), len(set(stamps)))
+        self.assertEqual(stamps, sorted(stamps))
+
+    def test_tsv(self) -> None:
+        self.assertEqual(pxn.tsv(1700000000123456),
+                         Decimal("1700000000.123456"))
+        self.assertEqual(pxn.tsv(1700000000000000), pxn.decimal("1700000000"))
+        (s, d, e) = pxn.tsv(1700000000000000).as_tuple()
+        self.assertEqual(e, -6)
+
+    def test_cnt_nanoseconds(self) -> None:
+        p = incline.InclinePrepare.InclinePrepare()
+        cnt = p.cnt()
+        now = p.now()
+        self.assertEqual(cnt % 1000, 0)
+        self.assertGreater(now * 1000000000, cnt)
+
     def test_decimal(self) -> None:
         """ Same tests as Datastore """
         self.assertIsInstance(pxn.decimal(int(1)), Decimal)
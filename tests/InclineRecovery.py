@@ -0,0 +1,89 @@
+import unittest
+import logging
+from typing import Any
+from incline.InclineClient import InclineClient
+from incline.InclineDatastore import InclineDatastore
+from incline.InclineMeta import InclineMeta, incline_writeset_kid
+from incline.InclineRecovery import InclineRecovery
+from memory import memory_client
+
+log = logging.getLogger('incline')
+log.setLevel(logging.INFO)
+
+TEST_TABLE = "test-incline-recovery"
+TEST_REGION = "us-west-2"
+TEST_PREFIX = "test-InclineRecovery"
+
+
+class TestInclineRecovery(unittest.TestCase):
+    maxDiff = None
+    ramp: InclineClient
+    con: InclineDatastore
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.ramp = memory_client(TEST_TABLE)
+        cls.con = cls.ramp.ds_open(cls.ramp.rtr.write[0])
+
+    def orphan(self, kid: str, dat: dict[str, Any]) -> None:
+        """
+        Prepare without commit, as a client dying between phases
+        """
+        pxn = self.ramp.prepare.pxn()
+        self.con.prepare(kid, pxn, InclineMeta(), dat)
+
+    def test_recover(self) -> None:
+        committed = f"{TEST_PREFIX}-committed"
+        orphan = f"{TEST_PREFIX}-orphan"
+        superseded = f"{TEST_PREFIX}-superseded"
+        self.ramp.put(committed, {'value': 1})
+        self.ramp.put(orphan, {'value': 1})
+        self.orphan(orphan, {'value': 2})
+        self.orphan(orphan, {'value': 3})
+        self.orphan(superseded, {'value': 1})
+        resp = self.ramp.put(superseded, {'value': 2})
+        # log of the newer commit expired, the older prepare remains
+        self.con.ds_delete_log(superseded, resp.pxn)
+        self.con.prepare(incline_writeset_kid(self.ramp.prepare.pxn()),
+                         self.ramp.prepare.pxn(), InclineMeta(), {'keys': 2})
+
+        recovery = InclineRecovery([self.con], timeout=0, batch=2, rate=0)
+        stats = recovery.run()
+        self.assertEqual(stats.committed, 1)
+        self.assertEqual(stats.superseded, 1)
+        self.assertEqual(stats.errors, 0)
+        self.assertGreater(stats.lag, 0)
+        self.assertGreaterEqual(stats.scanned, 6)
+
+        # newest prepare committed, others left alone
+        self.assertEqual({'value': 3}, self.ramp.get(orphan).only.dat)
+        self.assertEqual({'value': 2}, self.ramp.get(superseded).only.dat)
+
+        # second pass finds nothing
+        stats = recovery.run()
+        self.assertEqual(stats.committed, 0)
+
+    def test_recover_pending(self) -> None:
+        kid = f"{TEST_PREFIX}-pending"
+        self.orphan(kid, {'value': 1})
+        recovery = self.ramp.recovery(timeout=3600, rate=0)
+        stats = recovery.run()
+        self.assertGreaterEqual(stats.pending, 1)
+        self.assertEqual([], self.con.get(kid))
+
+    def test_batches(self) -> None:
+        recovery = InclineRecovery([], batch=2)
+        logs = [{'kid': k} for k in ['a', 'a', 'b', 'c', 'c', 'c', 'd']]
+        batches = [[l['kid'] for l in b] for b in recovery.batches(logs)]
+        self.assertEqual(batches, [['a', 'a', 'b'], ['c', 'c', 'c', 'd']])
+
+    def test_start_stop(self) -> None:
+        recovery = InclineRecovery([self.con], timeout=3600, rate=0)
+        recovery.start(interval=60)
+        self.assertIsNotNone(recovery.thread)
+        recovery.stop(timeout=5)
+        self.assertIsNone(recovery.thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import logging
+from incline.checkpoint import InclineCheckpoint
+from incline.InclineDatastoreMemory import InclineDatastoreMemory
+from incline.InclineRefresh import InclineRefresh
+from incline.router import InclineRouterTwo
+from memory import memory_client
+
+log = logging.getLogger('incline')
+log.setLevel(logging.INFO)
+
+TEST_TABLE = "test-incline-refresh"
+TEST_REGION = "us-west-2"
+TEST_PREFIX = "test-InclineRefresh"
+
+
+class TestInclineRefresh(unittest.TestCase):
+    maxDiff = None
+
+    def test_refresh(self) -> None:
+        name = f"{TEST_TABLE}-copy"
+        ramp = memory_client(name)
+        kids = [f"{TEST_PREFIX}-copy-{i}" for i in range(25)]
+        for kid in kids:
+            ramp.put(kid, {'value': 1})
+        ramp.put(kids[0], {'value': 2})
+        ramp.delete(kids[1])
+
+        # new replica behind a two datastore router
+        source = ramp.ds_open(ramp.rtr.read[0])
+        target = InclineDatastoreMemory(name=f"{name}-replica",
+                                        region=TEST_REGION)
+        bulk = InclineRefresh(source, [source, target], batch=10, workers=2)
+        self.assertEqual(bulk.targets, [target])
+        stats = bulk.run()
+        self.assertEqual(stats.scanned, len(kids))
+        self.assertEqual(stats.refreshed, len(kids))
+        self.assertEqual(stats.errors, 0)
+        self.assertEqual(stats.position, kids[-1])
+
+        got = target.get_batch(kids)
+        self.assertEqual({'value': 2}, got[kids[0]][0].dat)
+        self.assertEqual([], got[kids[1]])
+        self.assertEqual({'value': 1}, got[kids[2]][0].dat)
+        self.assertEqual(
+            source.only(source.ds_get_txn(kids[0]))['tsv'],
+            target.only(target.ds_get_txn(kids[0]))['tsv'])
+
+        # second run finds every target current
+        stats = bulk.run()
+        self.assertEqual(stats.refreshed, 0)
+        self.assertEqual(stats.current, len(kids))
+
+    def test_refresh_checkpoint(self) -> None:
+        name = f"{TEST_TABLE}-checkpoint"
+        ramp = memory_client(name)
+        kids = [f"{TEST_PREFIX}-checkpoint-{i}" for i in range(10)]
+        for kid in kids:
+            ramp.put(kid, {'value': 1})
+        source = ramp.ds_open(ramp.rtr.read[0])
+        target = InclineDatastoreMemory(name=f"{name}-replica",
+                                        region=TEST_REGION)
+        checkpoint = InclineCheckpoint()
+        # resumes after the scan position, keys are scanned in write order
+        checkpoint.save({'source': source.loc(), 'position': kids[3]})
+        bulk = InclineRefresh(source, [target],
+                              batch=3,
+                              workers=2,
+                              checkpoint=checkpoint)
+        stats = bulk.run()
+        self.assertEqual(stats.scanned, 6)
+        self.assertEqual(stats.refreshed, 6)
+        self.assertEqual(checkpoint.load(), {
+            'source': source.loc(),
+            'position': kids[-1]
+        })
+
+    def test_refresh_bulk(self) -> None:
+        name = f"{TEST_TABLE}-bulk"
+        ramp = memory_client(name)
+        kid = f"{TEST_PREFIX}-bulk"
+        ramp.put(kid, {'value': 1})
+        source = ramp.rtr.read[0]
+
+        # add a replica, read from the original
+        ramp.rtr = InclineRouterTwo(name=name,
+                                    region=TEST_REGION,
+                                    dbtype='memory')
+        stats = ramp.refresh_bulk(source=source, rate=1000)
+        self.assertEqual(stats.refreshed, 2)
+        for ds in ramp.rtr.read:
+            self.assertEqual({'value': 1}, ramp.ds_open(ds).get(kid)[0].dat)
+
+
+if __name__ == "__main__":
+    unittest.main()
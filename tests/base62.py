@@ -60,6 +60,32 @@ class TestBase62(unittest.TestCase):
             i = incline.base62.base_decode(s)
             self.assertEqual(w, i)
 
+    def test_base_encode_just(self) -> None:
+        self.assertEqual('000000000', incline.base62.base_encode_just(0, 9))
+        self.assertEqual('0001LY7VK',
+                         incline.base62.base_encode_just(1234567890, 9))
+        # wider than width is not truncated
+        self.assertEqual('1LY7VK',
+                         incline.base62.base_encode_just(1234567890, 3))
+
+    def test_base_encode_pairs(self) -> None:
+        """
+        lookup table encoding matches single digit encoding at digit edges
+        """
+        # an equal but distinct string takes the single digit path
+        base = ''.join(list(incline.base62.BASE_LIST))
+        self.assertIsNot(base, incline.base62.BASE_LIST)
+        for n in [1, 61, 62, 63, 3843, 3844, 3845, 62**3 - 1, 62**3, 62**4]:
+            self.assertEqual(incline.base62.base_encode(n, base=base),
+                             incline.base62.base_encode(n))
+
+    def test_base_encode_custom(self) -> None:
+        self.assertEqual('101', incline.base62.base_encode(5, base='01'))
+        self.assertEqual(5, incline.base62.base_decode('101', {
+            '0': 0,
+            '1': 1
+        }))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import os
+import tempfile
+from incline.checkpoint import InclineCheckpoint, InclineCheckpointFile
+
+
+class TestCheckpoint(unittest.TestCase):
+    maxDiff = None
+
+    def test_memory(self) -> None:
+        checkpoint = InclineCheckpoint()
+        self.assertIsNone(checkpoint.load())
+        checkpoint.save({'offset': 1})
+        self.assertEqual(checkpoint.load(), {'offset': 1})
+        checkpoint.clear()
+        self.assertIsNone(checkpoint.load())
+
+    def test_file(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'checkpoint.json')
+            checkpoint = InclineCheckpointFile(path)
+            self.assertIsNone(checkpoint.load())
+            checkpoint.save({'source': 'memory|us-west-2|test', 'offset': 2})
+            self.assertEqual(
+                InclineCheckpointFile(path).load(), {
+                    'source': 'memory|us-west-2|test',
+                    'offset': 2
+                })
+            self.assertEqual(os.listdir(tmp), ['checkpoint.json'])
+            checkpoint.clear()
+            self.assertIsNone(checkpoint.load())
+            checkpoint.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
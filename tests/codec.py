@@ -0,0 +1,73 @@
+import unittest
+from decimal import Decimal
+from incline.codec import (InclineCodec, incline_decode, incline_digest,
+                           incline_encode, incline_serialize, incline_summary,
+                           INCLINE_CODEC_JSON, INCLINE_CODEC_ZLIB)
+from incline.error import InclineDataError
+
+
+class TestInclineCodec(unittest.TestCase):
+    maxDiff = None
+
+    def test_serialize(self) -> None:
+        self.assertEqual(
+            incline_serialize({
+                'b': 1,
+                'a': [Decimal('1.50')]
+            }), b'{"a":[{"__number__":"1.5"}],"b":{"__number__":"1"}}')
+
+    def test_digest(self) -> None:
+        self.assertEqual(incline_digest({
+            'a': 1,
+            'b': 2
+        }), incline_digest({
+            'b': 2,
+            'a': 1
+        }))
+        # numbers by value, whether stored as float or Decimal
+        self.assertEqual(incline_digest({'a': Decimal('1.50')}),
+                         incline_digest({'a': 1.5}))
+        self.assertEqual(incline_digest([Decimal(1)]), incline_digest([1]))
+        self.assertNotEqual(incline_digest({'a': Decimal('1.5')}),
+                            incline_digest({'a': '1.5'}))
+        self.assertEqual(len(incline_digest(None)), 32)
+
+    def test_summary(self) -> None:
+        digest, size = incline_summary({'a': 'b'})
+        self.assertEqual(digest, incline_digest({'a': 'b'}))
+        self.assertEqual(size, len(b'{"a":"b"}'))
+
+    def test_codec(self) -> None:
+        codec = InclineCodec(threshold=64)
+        dat = {'value': Decimal('1.5'), 'text': 'x' * 1000, 'list': [1, 2.5]}
+        val = codec.encode({'kid': 'k', 'dat': dat})
+        self.assertEqual(val['cdc'], INCLINE_CODEC_ZLIB)
+        self.assertIsInstance(val['dat'], bytes)
+        self.assertLess(len(val['dat']), 100)
+        self.assertEqual(incline_decode(val['cdc'], val['dat']), dat)
+        # already encoded
+        self.assertIs(codec.encode(val), val)
+
+    def test_codec_small(self) -> None:
+        codec = InclineCodec(threshold=64)
+        val = {'kid': 'k', 'dat': {'value': 1}}
+        self.assertIs(codec.encode(val), val)
+        val = {'kid': 'k', 'dat': {}}
+        self.assertIs(codec.encode(val), val)
+
+    def test_decode_invalid(self) -> None:
+        with self.assertRaises(InclineDataError):
+            incline_decode('unknown', b'')
+        with self.assertRaises(InclineDataError):
+            incline_decode(INCLINE_CODEC_ZLIB, b'not zlib')
+        with self.assertRaises(InclineDataError):
+            incline_decode(INCLINE_CODEC_JSON, b'{')
+
+    def test_decode_json(self) -> None:
+        dat = {'value': Decimal('1.5'), 'list': [1, 2.5]}
+        self.assertEqual(
+            incline_decode(INCLINE_CODEC_JSON, incline_encode(dat)), dat)
+
+
+if __name__ == "__main__":
+    unittest.main()
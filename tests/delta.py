@@ -0,0 +1,44 @@
+import unittest
+from incline.delta import incline_delta, incline_patch
+
+
+class TestInclineDelta(unittest.TestCase):
+    maxDiff = None
+
+    def test_delta(self) -> None:
+        old = {'a': 1, 'b': {'c': 2, 'd': [1, 2]}, 'e': 'x'}
+        new = {'a': 1, 'b': {'c': 3, 'd': [1, 2]}, 'f': None}
+        patch = incline_delta(old, new)
+        self.assertEqual(patch, {
+            'set': {
+                'f': None
+            },
+            'sub': {
+                'b': {
+                    'set': {
+                        'c': 3
+                    }
+                }
+            },
+            'del': ['e']
+        })
+        self.assertEqual(incline_patch(old, patch), new)
+        # the base is not changed
+        self.assertEqual(old['b'], {'c': 2, 'd': [1, 2]})
+
+    def test_delta_same(self) -> None:
+        val = {'a': 1, 'b': {'c': 2}}
+        self.assertEqual(incline_delta(val, dict(val)), {})
+        self.assertEqual(incline_patch(val, {}), val)
+
+    def test_delta_types(self) -> None:
+        old = {'a': 1, 'b': {'c': 2}, 'd': True}
+        new = {'a': 1.0, 'b': 'c', 'd': 1}
+        patch = incline_delta(old, new)
+        self.assertEqual(patch, {'set': new})
+        self.assertEqual(incline_patch(old, patch), new)
+        self.assertIsInstance(incline_patch(old, patch)['a'], float)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,20 @@
+"""
+Clients routed to memory datastores, for tests that run offline
+"""
+from typing import Any
+from incline.InclineClient import InclineClient
+from incline.router import InclineRouter, InclineRouterOne
+
+TEST_REGION = "us-west-2"
+
+
+def memory_client(name: str,
+                  router: type[InclineRouter] = InclineRouterOne,
+                  **kwargs: Any) -> InclineClient:
+    """
+    Client named name with every route of router in memory.  kwargs are
+    passed to the client.
+    """
+    ramp = InclineClient(name=name, region=TEST_REGION, **kwargs)
+    ramp.rtr = router(name=name, region=TEST_REGION, dbtype='memory')
+    return ramp
@@ -0,0 +1,44 @@
+import unittest
+from decimal import Decimal
+from incline.merkle import InclineMerkle
+
+
+class TestInclineMerkle(unittest.TestCase):
+    maxDiff = None
+
+    def tree(self, count: int) -> InclineMerkle:
+        tree = InclineMerkle(depth=6)
+        for i in range(count):
+            tree.add(f"key-{i}", Decimal(i), f"pxn-{i}")
+        return tree
+
+    def test_equal(self) -> None:
+        a = self.tree(100).build()
+        b = self.tree(100).build()
+        self.assertEqual(a.root, b.root)
+        self.assertEqual(a.diff_keys(b), ([], 1))
+
+    def test_latest(self) -> None:
+        tree = InclineMerkle(depth=2)
+        tree.add('key', Decimal(2), 'new')
+        tree.add('key', Decimal(1), 'old')
+        self.assertEqual(tree.latest('key'), (Decimal(2), 'new'))
+        self.assertIsNone(tree.latest('missing'))
+
+    def test_diff(self) -> None:
+        a = self.tree(100)
+        b = self.tree(100)
+        b.add('key-5', Decimal(500), 'pxn-500')
+        b.add('key-extra', Decimal(1), 'pxn-extra')
+        kids, compared = a.build().diff_keys(b.build())
+        self.assertEqual(sorted(kids), ['key-5', 'key-extra'])
+        # descends only into differing subtrees
+        self.assertLessEqual(compared, 1 + 2 * 2 * a.depth)
+
+    def test_depth(self) -> None:
+        with self.assertRaises(ValueError):
+            InclineMerkle(depth=2).diff(InclineMerkle(depth=3))
+
+
+if __name__ == "__main__":
+    unittest.main()
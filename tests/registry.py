@@ -0,0 +1,61 @@
+import unittest
+from incline.InclineDatastoreDynamo import InclineDatastoreDynamo
+from incline.InclineDatastoreMemory import InclineDatastoreMemory
+from incline.registry import (incline_register, incline_unregister,
+                              incline_registration,
+                              INCLINE_CAPABILITY_BATCH_GET,
+                              INCLINE_CAPABILITY_INDEXES,
+                              INCLINE_CAPABILITY_CHANGES)
+from incline.error import InclineInterface
+
+
+class TestRegistry(unittest.TestCase):
+    maxDiff = None
+
+    def tearDown(self) -> None:
+        incline_unregister('test')
+
+    def test_builtin(self) -> None:
+        self.assertIs(
+            incline_registration('dynamo').factory, InclineDatastoreDynamo)
+        self.assertIs(
+            incline_registration('memory').factory, InclineDatastoreMemory)
+        self.assertTrue(
+            incline_registration('memory').capable(
+                INCLINE_CAPABILITY_BATCH_GET))
+        self.assertTrue(
+            incline_registration('dynamo').capable(INCLINE_CAPABILITY_INDEXES))
+        self.assertTrue(
+            incline_registration('memory').capable(INCLINE_CAPABILITY_INDEXES))
+        self.assertTrue(
+            incline_registration('memory').capable(INCLINE_CAPABILITY_CHANGES))
+        self.assertTrue(
+            incline_registration('dynamo').capable(INCLINE_CAPABILITY_CHANGES))
+
+    def test_register(self) -> None:
+        reg = incline_register('test',
+                               InclineDatastoreMemory,
+                               capabilities=[INCLINE_CAPABILITY_INDEXES])
+        self.assertIs(reg, incline_registration('test'))
+        self.assertTrue(reg.capable(INCLINE_CAPABILITY_INDEXES))
+        self.assertFalse(reg.capable(INCLINE_CAPABILITY_BATCH_GET))
+        con = reg.factory('test-registry', 'us-west-2', None)
+        self.assertEqual(con.name, 'test-registry')
+
+    def test_register_invalid(self) -> None:
+        with self.assertRaises(InclineInterface):
+            incline_register('', InclineDatastoreMemory)
+        with self.assertRaises(InclineInterface):
+            incline_register('test',
+                             InclineDatastoreMemory,
+                             capabilities=['teleport'])
+
+    def test_unregister(self) -> None:
+        incline_register('test', InclineDatastoreMemory)
+        incline_unregister('test')
+        with self.assertRaises(InclineInterface):
+            incline_registration('test')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from incline.throttle import InclineThrottle
+
+
+class FakeClock(object):
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def clock(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestThrottle(unittest.TestCase):
+
+    def test_unlimited(self) -> None:
+        throttle = InclineThrottle(rate=0)
+        for _ in range(1000):
+            self.assertEqual(throttle.acquire(), 0.0)
+
+    def test_burst(self) -> None:
+        fake = FakeClock()
+        throttle = InclineThrottle(rate=10, clock=fake.clock, sleep=fake.sleep)
+        for _ in range(10):
+            self.assertEqual(throttle.acquire(), 0.0)
+        self.assertAlmostEqual(throttle.acquire(), 0.1)
+
+    def test_rate(self) -> None:
+        fake = FakeClock()
+        throttle = InclineThrottle(rate=100,
+                                   burst=1,
+                                   clock=fake.clock,
+                                   sleep=fake.sleep)
+        for _ in range(101):
+            throttle.acquire()
+        self.assertAlmostEqual(fake.now, 1.0)
+
+    def test_refill(self) -> None:
+        fake = FakeClock()
+        throttle = InclineThrottle(rate=10,
+                                   burst=5,
+                                   clock=fake.clock,
+                                   sleep=fake.sleep)
+        throttle.acquire(5)
+        fake.now += 10
+        # refill is capped at the burst
+        throttle.acquire(5)
+        self.assertAlmostEqual(throttle.acquire(), 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()